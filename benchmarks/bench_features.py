@@ -0,0 +1,145 @@
+"""
+Feature-building benchmark: the per-group loop build_features used to run vs the vectorized version.
+
+    python benchmarks/bench_features.py --countries 200 --indicators 40 --years 50
+    python benchmarks/bench_features.py --workers 4     # also time the process-pool shards
+
+A synthetic release of level and *PCH indicators (with zero and missing baselines, missing
+rates and -100% rates) goes through
+`compute_additional_variables_df` and through the legacy implementation kept below as the
+reference; the outputs are checked to be identical before timings are printed. With --workers,
+the long feature frame is also built serially and sharded across processes, and compared.
+"""
+import argparse
+import math
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from macroeconomics.datasets.schema import enforce_schema
+from macroeconomics.features.build_features import _is_yoy_indicator, add_2019_norm_long, compute_additional_variables_df
+from macroeconomics.features.sharded import sharded_norm_long
+
+
+# --- legacy implementation (one sort/copy/set_index/round per country x indicator group) ---------
+def legacy_add_level_baselines(g, baseline_year):
+    g = g.sort_values("year").copy()
+    s = g.set_index("year")["value"]
+    base = s.get(baseline_year, None)
+    g[f"baseline{str(baseline_year)}"] = base
+    if base is None or base == 0:
+        g[f"index{str(baseline_year)}"] = pd.NA
+        g[f"rel{str(baseline_year)}"] = pd.NA
+    else:
+        g[f"index{str(baseline_year)}"] = ((g["value"] / base) * 100.0)
+        g[f"rel{str(baseline_year)}"] = (g["value"] / base) - 1.0
+    g[f"delta{str(baseline_year)}"] = g["value"] - (base if base is not None else pd.NA)
+    return g.round(2)
+
+
+def legacy_chain_from_yoy(g, baseline_year=2019):
+    g = g.sort_values("year").copy()
+    years = g["year"].tolist()
+    rates = g["value"].astype(float).tolist()
+    col_nm = 'index' + str(baseline_year)
+    if baseline_year not in years:
+        g[col_nm] = pd.NA
+        return g.round(2)
+    idx = {}
+    k = years.index(baseline_year)
+    idx[baseline_year] = 100.0
+    for j in range(k + 1, len(years)):
+        r = 0.0 if pd.isna(rates[j]) else float(rates[j])
+        idx[years[j]] = (idx[years[j - 1]] * (1.0 + r / 100.0))
+    for j in range(k - 1, -1, -1):
+        r_next = 0.0 if pd.isna(rates[j + 1]) else float(rates[j + 1])
+        denom = (1.0 + r_next / 100.0)
+        idx[years[j]] = (idx[years[j + 1]] / denom) if denom != 0 else math.nan
+    g[col_nm] = g["year"].map(idx)
+    g[col_nm] = g[col_nm].round(2)
+    return g
+
+
+def legacy_compute_additional_variables_df(df, baseline_year=2019, do_cum=False, keep_rate_pp_delta=False):
+    parts = []
+    for (ctry, ind), g in df.groupby(["country", "indicator"], as_index=False, observed=True):
+        if _is_yoy_indicator(ind):
+            g = legacy_chain_from_yoy(g, baseline_year)
+            if keep_rate_pp_delta:
+                base = g.loc[g["year"] == baseline_year, "value"]
+                base_val = base.iloc[0] if len(base) else pd.NA
+                g[f"delta{str(baseline_year)}"] = g["value"] - base_val
+        else:
+            g = legacy_add_level_baselines(g, baseline_year)
+        parts.append(g)
+    df_wide = pd.concat(parts, ignore_index=True).sort_values(["country", "indicator", "year"])
+    if do_cum:
+        df_wide[f"pct_cum{str(baseline_year)}"] = (df_wide[f"index{str(baseline_year)}"] - 100).round(2)
+    return df_wide
+
+
+def make_release(n_countries, n_indicators, n_years, baseline_year, seed=0):
+    rng = np.random.default_rng(seed)
+    countries = [f"C{i:03d}" for i in range(n_countries)]
+    # half level indicators, half year-on-year percent changes (*PCH)
+    indicators = [f"IND{k:03d}" + ("PCH" if k % 2 else "") for k in range(n_indicators)]
+    years = np.arange(baseline_year - n_years // 2, baseline_year - n_years // 2 + n_years)
+    df = pd.DataFrame({
+        "country": np.repeat(countries, n_indicators * n_years),
+        "indicator": np.tile(np.repeat(indicators, n_years), n_countries),
+        "year": np.tile(years, n_countries * n_indicators),
+        "value": rng.lognormal(5, 1, size=n_countries * n_indicators * n_years).round(3),
+    })
+    yoy = df["indicator"].str.endswith("PCH")
+    df.loc[yoy, "value"] = rng.normal(2, 3, size=int(yoy.sum())).round(3)
+    df.loc[df.index[yoy][::101], "value"] = np.nan       # missing rates count as 0%
+    df.loc[df.index[yoy][::997], "value"] = -100.0       # zero denominators
+    at_base = df.index[df["year"] == baseline_year]
+    df.loc[at_base[::17], "value"] = 0.0                 # zero baselines
+    df = df.drop(at_base[5::23])                         # missing baselines
+    return enforce_schema(df)
+
+
+def comparable(df, baseline_year):
+    # `value` itself is left out: the legacy loop also rounded the raw rates of YoY groups
+    # without a baseline year, which never reached the feature output
+    cols = ["country", "indicator", "year"] + [f"{c}{baseline_year}" for c in ("baseline", "index", "rel", "delta", "pct_cum")]
+    return df[cols].astype({c: "float64" for c in cols[3:]}).reset_index(drop=True)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--countries", type=int, default=200)
+    parser.add_argument("--indicators", type=int, default=40)
+    parser.add_argument("--years", type=int, default=50)
+    parser.add_argument("--baseline", type=int, default=2019)
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+
+    df = make_release(args.countries, args.indicators, args.years, args.baseline)
+    print(f"{len(df):,} rows, {args.countries * args.indicators:,} country x indicator groups")
+    t0 = time.perf_counter()
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", FutureWarning)  # legacy concat of all-NA group columns
+        legacy = legacy_compute_additional_variables_df(df, args.baseline, do_cum=True)
+    t1 = time.perf_counter()
+    new = compute_additional_variables_df(df, args.baseline, do_cum=True)
+    t2 = time.perf_counter()
+    pd.testing.assert_frame_equal(comparable(new, args.baseline), comparable(legacy, args.baseline))
+    print(f"legacy loop  {t1 - t0:8.2f}s")
+    print(f"vectorized   {t2 - t1:8.2f}s   ({(t1 - t0) / (t2 - t1):.0f}x, identical output)")
+    if args.workers > 1:
+        t0 = time.perf_counter()
+        serial = add_2019_norm_long(df, args.baseline)
+        t1 = time.perf_counter()
+        sharded = sharded_norm_long(df, args.baseline, args.workers)
+        t2 = time.perf_counter()
+        assert serial.to_csv(index=False) == sharded.to_csv(index=False)
+        print(f"long frame, 1 process   {t1 - t0:8.2f}s")
+        print(f"long frame, {args.workers} processes {t2 - t1:8.2f}s   (identical output)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+End-to-end fetch benchmark against the local Datamapper mock.
+
+    python benchmarks/bench_fetch.py --countries 200 --indicators 20 --latency 0.05 --modes serial,threads,async
+
+Each mode runs `data_main` in a fresh subprocess (response cache disabled, DATA_DIR in a temp
+folder) so wall time and peak RSS are not polluted by earlier runs. Requests/sec is taken from
+the mock's request counter. The written timeseries CSVs are compared across modes.
+"""
+import argparse
+import hashlib
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+
+def child(mode, indicators, countries, workers, rate):
+    from macroeconomics.datasets.data import data_main
+
+    args = SimpleNamespace(indicators=indicators, countries=countries, debug=False, workers=1,
+                           max_per_host=workers, backend="sync", rate=rate, no_cache=True, offline=False)
+    if mode == "threads":
+        args.workers = workers
+    elif mode == "async":
+        args.backend = "async"
+    t0 = time.perf_counter()
+    data_main(args)
+    wall = time.perf_counter() - t0
+    maxrss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({"wall": wall, "maxrss_mb": maxrss_kb / 1024}))
+
+
+def run_mode(mode, base, mock, config, args):
+    with tempfile.TemporaryDirectory() as data_dir:
+        env = dict(os.environ, MACRO_IMF_BASE=base, MACRO_DATA_DIR=data_dir, LOG_LEVEL="WARNING")
+        before = mock.requests
+        cmd = [sys.executable, __file__, "--child", mode, "--workers", str(args.workers), "--rate", str(args.rate),
+               "--child-indicators", ",".join(config.indicators), "--child-countries", ",".join(config.countries)]
+        out = subprocess.run(cmd, env=env, check=True, capture_output=True, text=True).stdout
+        result = json.loads(out.strip().splitlines()[-1])
+        result["requests"] = mock.requests - before
+        written = sorted(Path(data_dir).glob("imf_weo_timeseries_*.csv"))
+        result["sha256"] = hashlib.sha256(written[0].read_bytes()).hexdigest() if written else None
+        return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--countries", type=int, default=200)
+    parser.add_argument("--indicators", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--modes", default="serial,threads,async")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=1000.0)
+    parser.add_argument("--child")
+    parser.add_argument("--child-indicators")
+    parser.add_argument("--child-countries")
+    args = parser.parse_args()
+
+    if args.child:
+        return child(args.child, args.child_indicators, args.child_countries, args.workers, args.rate)
+
+    from macroeconomics.datasets.mock_datamapper import MockConfig, running_mock
+
+    config = MockConfig(n_countries=args.countries, n_indicators=args.indicators,
+                        latency=args.latency, error_rate=args.error_rate)
+    print(f"{len(config.indicators)} indicators x {len(config.countries)} countries, "
+          f"latency {args.latency * 1000:.0f} ms, error rate {args.error_rate:.0%}")
+    print(f"{'mode':<8} {'seconds':>8} {'requests':>9} {'req/s':>8} {'peak RSS MB':>12}  output")
+    digests = set()
+    with running_mock(config) as (base, mock):
+        for mode in args.modes.split(","):
+            r = run_mode(mode, base, mock, config, args)
+            digests.add(r["sha256"])
+            print(f"{mode:<8} {r['wall']:>8.2f} {r['requests']:>9} {r['requests'] / r['wall']:>8.1f} "
+                  f"{r['maxrss_mb']:>12.1f}  {(r['sha256'] or 'none')[:12]}")
+    if len(digests) > 1:
+        print("WARNING: outputs differ between modes")
+
+
+if __name__ == "__main__":
+    main()
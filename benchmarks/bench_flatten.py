@@ -0,0 +1,93 @@
+"""
+Memory/throughput benchmark: row-dict flattening vs columnar flattening of Datamapper payloads.
+
+    python benchmarks/bench_flatten.py --countries 200 --indicators 40
+
+Synthetic responses are built once per indicator (in batches of 40 countries, as data_main
+requests them); each implementation then flattens all of them into one DataFrame per indicator.
+Peak memory is measured with tracemalloc and includes the resulting frames.
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from macroeconomics.datasets.imf_api import chunked, parse_timeseries_batch, BatchResult
+
+
+def make_payloads(n_countries, n_indicators, years, batch_size=40, seed=0):
+    rng = np.random.default_rng(seed)
+    countries = [f"C{i:03d}" for i in range(n_countries)]
+    payloads = {}
+    for k in range(n_indicators):
+        ind = f"IND{k:03d}"
+        batches = []
+        for batch in chunked(countries, batch_size):
+            values = rng.normal(100, 20, size=(len(batch), len(years))).round(3)
+            data = {c: {str(y): float(v) for y, v in zip(years, row)} for c, row in zip(batch, values)}
+            batches.append((batch, {"values": {ind: data}}))
+        payloads[ind] = batches
+    return payloads
+
+
+def flatten_rows(payloads):
+    """The previous implementation: one dict per observation, then pd.DataFrame(all_rows)."""
+    frames = {}
+    for ind, batches in payloads.items():
+        all_rows = []
+        for batch, js in batches:
+            allowed = set(batch)
+            for ctry, series in js["values"][ind].items():
+                if ctry not in allowed:
+                    continue
+                for year, val in series.items():
+                    all_rows.append({"country": ctry, "indicator": ind, "year": int(year), "value": val})
+        frames[ind] = pd.DataFrame(all_rows)
+    return frames
+
+
+def flatten_columnar(payloads):
+    frames = {}
+    for ind, batches in payloads.items():
+        result = BatchResult()
+        for batch, js in batches:
+            result.merge(BatchResult(columns=parse_timeseries_batch(js, ind, batch)))
+        frames[ind] = result.to_frame()
+    return frames
+
+
+def measure(fn, payloads):
+    gc.collect()
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    frames = fn(payloads)
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    rows = sum(len(f) for f in frames.values())
+    frame_bytes = sum(f.memory_usage(deep=True).sum() for f in frames.values())
+    return elapsed, peak, rows, frame_bytes
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--countries", type=int, default=200)
+    parser.add_argument("--indicators", type=int, default=40)
+    parser.add_argument("--first-year", type=int, default=1980)
+    parser.add_argument("--last-year", type=int, default=2030)
+    args = parser.parse_args()
+
+    years = list(range(args.first_year, args.last_year + 1))
+    payloads = make_payloads(args.countries, args.indicators, years)
+    print(f"{args.indicators} indicators x {args.countries} countries x {len(years)} years")
+    print(f"{'method':<10} {'rows':>10} {'seconds':>9} {'rows/s':>12} {'peak MB':>9} {'frames MB':>10}")
+    for name, fn in (("rows", flatten_rows), ("columnar", flatten_columnar)):
+        elapsed, peak, rows, frame_bytes = measure(fn, payloads)
+        print(f"{name:<10} {rows:>10,} {elapsed:>9.3f} {rows / elapsed:>12,.0f} {peak / 1e6:>9.1f} {frame_bytes / 1e6:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
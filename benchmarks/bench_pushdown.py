@@ -0,0 +1,96 @@
+"""
+Predicate pushdown benchmark: full load + filter vs read_timeseries with predicates.
+
+    python benchmarks/bench_pushdown.py --countries 200 --indicators 1000 --years 50 [--csv]
+
+Builds a synthetic release (countries x indicators x years rows, 10M by default) as Parquet, and
+optionally as CSV plus its per-indicator partitions, in a temp folder. Each query is answered by
+loading everything and filtering in pandas, then by read_timeseries with the predicates pushed
+down. "MB read" is the compressed size of the Parquet row groups that had to be decoded.
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from macroeconomics.datasets.storage import (PartitionedWriter, _row_mask, combine_partitions,
+                                             matching_row_groups, read_timeseries, write_timeseries_parquet)
+
+
+def queries(n_indicators):
+    one = [f"IND{n_indicators // 2:04d}"]
+    return {
+        "plot --countries ESP,FRA": dict(countries=["ESP", "FRA"]),
+        "one indicator": dict(indicators=one),
+        "years 2020-2025": dict(years=(2020, 2025)),
+        "ESP,FRA x 1 ind x 2020+": dict(countries=["ESP", "FRA"], indicators=one, years=(2020, None)),
+    }
+
+
+def make_release(n_countries, n_indicators, n_years, seed=0):
+    countries = ["ESP", "FRA"] + [f"C{i:03d}" for i in range(n_countries - 2)]
+    indicators = [f"IND{k:04d}" for k in range(n_indicators)]
+    years = np.arange(2030 - n_years + 1, 2031, dtype="int16")
+    n = n_countries * n_indicators * n_years
+    return pd.DataFrame({
+        "country": pd.Categorical(np.tile(np.repeat(countries, n_years), n_indicators)),
+        "indicator": pd.Categorical(np.repeat(indicators, n_countries * n_years)),
+        "year": np.tile(years, n_countries * n_indicators),
+        "value": np.random.default_rng(seed).normal(100, 20, size=n).round(3),
+    })
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    out = fn()
+    return time.perf_counter() - t0, out
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--countries", type=int, default=200)
+    parser.add_argument("--indicators", type=int, default=1000)
+    parser.add_argument("--years", type=int, default=50)
+    parser.add_argument("--csv", action="store_true", help="Also benchmark the CSV / partitioned path (slow to build)")
+    args = parser.parse_args()
+
+    import pyarrow.parquet as pq
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        t, df = timed(lambda: make_release(args.countries, args.indicators, args.years))
+        print(f"synthetic release: {len(df):,} rows built in {t:.1f}s")
+        parquet_path = write_timeseries_parquet(df, tmp / "release.parquet")
+        pf = pq.ParquetFile(parquet_path)
+        meta = pf.metadata
+        sizes = [sum(meta.row_group(i).column(j).total_compressed_size for j in range(meta.num_columns))
+                 for i in range(meta.num_row_groups)]
+        print(f"parquet: {parquet_path.stat().st_size / 2**20:.0f} MB, {meta.num_row_groups} row groups")
+        if args.csv:
+            writer = PartitionedWriter(tmp / "release")
+            for ind, part in df.groupby("indicator", observed=True):
+                writer.write(ind, part)
+            writer.finish()
+            csv_path = combine_partitions(tmp / "release", tmp / "release.csv")
+        del df
+
+        print(f"{'query':<26} {'format':<8} {'full s':>8} {'pushdown s':>11} {'rows':>10} {'row groups':>11} {'MB read':>8}")
+        for name, preds in queries(args.indicators).items():
+            full_t, full = timed(lambda: (lambda d: d[_row_mask(d, **preds)])(pd.read_parquet(parquet_path)))
+            push_t, pushed = timed(lambda: read_timeseries(parquet_path, **preds))
+            assert len(full) == len(pushed)
+            groups = matching_row_groups(pf, **preds)
+            print(f"{name:<26} {'parquet':<8} {full_t:>8.2f} {push_t:>11.2f} {len(pushed):>10,} "
+                  f"{len(groups):>5}/{meta.num_row_groups:<5} {sum(sizes[i] for i in groups) / 2**20:>8.1f}")
+            if args.csv:
+                full_t, full = timed(lambda: (lambda d: d[_row_mask(d, **preds)])(pd.read_csv(csv_path)))
+                push_t, pushed = timed(lambda: read_timeseries(csv_path, **preds))
+                assert len(full) == len(pushed)
+                print(f"{'':<26} {'csv':<8} {full_t:>8.2f} {push_t:>11.2f} {len(pushed):>10,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+update_graph latency benchmark: boolean masks over the whole frame vs the SeriesIndex lookup.
+
+    python benchmarks/bench_query.py --sizes 10000,100000,1000000,5000000 --repeat 50
+
+For each dataset size, a synthetic release in the compact schema (COUNTRIES_ISO3-like countries
+x a growing number of indicators x 51 years) answers the callback's typical query, two countries
+of one indicator over a 20-year window, with the masks update_graph used to build and with the
+index built once at startup. Reported times are medians per call, in milliseconds; both paths
+are checked to return the same rows.
+"""
+import argparse
+import statistics
+import time
+
+import numpy as np
+import pandas as pd
+
+from macroeconomics.datasets.query import SeriesIndex
+from macroeconomics.datasets.schema import enforce_schema
+
+N_COUNTRIES = 60
+YEARS = np.arange(1980, 2031)
+
+
+def make_release(n_rows, seed=0):
+    n_indicators = max(1, n_rows // (N_COUNTRIES * len(YEARS)))
+    countries = ["ESP", "FRA"] + [f"C{i:02d}" for i in range(N_COUNTRIES - 2)]
+    indicators = [f"IND{k:05d}" for k in range(n_indicators)]
+    df = pd.DataFrame({
+        "country": np.tile(np.repeat(countries, len(YEARS)), n_indicators),
+        "indicator": np.repeat(indicators, N_COUNTRIES * len(YEARS)),
+        "year": np.tile(YEARS, N_COUNTRIES * n_indicators),
+        "value": np.random.default_rng(seed).normal(size=n_indicators * N_COUNTRIES * len(YEARS)),
+    })
+    df["country_name"] = "Country " + df["country"]
+    return enforce_schema(df), indicators[len(indicators) // 2]
+
+
+def masked(df, countries, indicator, y0, y1):
+    return df[(df["country"].isin(countries)) & (df["indicator"] == indicator) & (df["year"].between(y0, y1))].copy()
+
+
+def median_ms(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="10000,100000,1000000,5000000")
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args()
+
+    countries, years = ["ESP", "FRA"], (2010, 2029)
+    print(f"{'rows':>10} {'masks ms':>9} {'index ms':>9} {'build s':>8}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        df, indicator = make_release(size)
+        t0 = time.perf_counter()
+        index = SeriesIndex(df)
+        build = time.perf_counter() - t0
+        a = masked(df, countries, indicator, *years)
+        b = index.frame(indicator, countries, years)
+        pd.testing.assert_frame_equal(a.reset_index(drop=True)[["country", "year", "value"]].astype({"country": str}),
+                                      b[["country", "year", "value"]].astype({"country": str}))
+        m = median_ms(lambda: masked(df, countries, indicator, *years), args.repeat)
+        q = median_ms(lambda: index.frame(indicator, countries, years), args.repeat)
+        print(f"{len(df):>10,} {m:>9.2f} {q:>9.2f} {build:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
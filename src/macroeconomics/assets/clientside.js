@@ -0,0 +1,52 @@
+// Client-side filtering for the time-series tab (MACRO_CLIENTSIDE=1 or `dash --clientside`).
+// The server sends the selected indicator's series once, in the "series-store" dcc.Store
+// (timeseries_store in viz/charts/timeseries.py); country and year-range changes rebuild the
+// traces here the way makePlotly does, without a round trip.
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    macro: {
+        filter_timeseries: function (store, countries, yearRange) {
+            if (!store || !countries || !countries.length || !yearRange) {
+                return {};
+            }
+            const [y0, y1] = yearRange;
+            const latest = store.latest_year;
+            // history up to the latest actual year is solid, projections from it on are dotted
+            const styles = [["solid", (yr) => yr <= latest], ["dot", (yr) => yr >= latest]];
+            const selected = new Set(countries);
+            const data = [];
+            let n = 0;
+            for (const [code, s] of Object.entries(store.series)) {
+                if (!selected.has(code)) {
+                    continue;
+                }
+                const color = store.colors[n % store.colors.length];
+                let shown = false;
+                for (const [dash, keep] of styles) {
+                    const x = [];
+                    const y = [];
+                    s.x.forEach((yr, i) => {
+                        if (yr >= y0 && yr <= y1 && keep(yr)) {
+                            x.push(yr);
+                            y.push(s.y[i]);
+                        }
+                    });
+                    if (!x.length) {
+                        continue;
+                    }
+                    data.push({
+                        type: "scatter", mode: "lines", x: x, y: y, xaxis: "x", yaxis: "y",
+                        name: s.name, legendgroup: s.name, showlegend: !shown,
+                        line: {color: color, dash: dash},
+                        customdata: y.map((v) => [s.name, v]),
+                        hovertemplate: store.hovertemplate,
+                    });
+                    shown = true;
+                }
+                if (shown) {
+                    n += 1;
+                }
+            }
+            return {data: data, layout: store.layout};
+        },
+    },
+});
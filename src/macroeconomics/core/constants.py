@@ -1,14 +1,53 @@
 from __future__ import annotations
+import os
 from pathlib import Path
 from importlib.resources import files
 
 # Project root directory (repo/src/macroeconomics/common.py -> parents[2] == repo/)
 ROOT_DIR: Path = Path(__file__).resolve().parents[3]
 # Standard output directories under project root
-DATA_DIR: Path = ROOT_DIR / "data"
+DATA_DIR: Path = Path(os.getenv("MACRO_DATA_DIR", ROOT_DIR / "data"))
 FIGURE_DIR: Path = ROOT_DIR / "figures"
 LOG_DIR: Path = ROOT_DIR / "logs"
 MODIFIED_NAME = "_with_features"
+# IMF Datamapper API root (override e.g. to point at the local mock server)
+IMF_API_BASE: str = os.getenv("MACRO_IMF_BASE", "https://www.imf.org/external/datamapper/api/v1/")
+# IMF fetch engine: thread pool size and cap on concurrent requests per host
+FETCH_WORKERS: int = 8
+FETCH_MAX_PER_HOST: int = 4
+# Parallel fetches run at most this many indicators ahead of the one being written (bounds peak memory)
+FETCH_WINDOW: int = 4
+# Async backend: token-bucket rate (requests/s), burst size and retry/backoff policy
+FETCH_RATE_LIMIT: float = 10.0
+FETCH_BURST: int = 10
+FETCH_MAX_RETRIES: int = 5
+FETCH_BACKOFF_BASE: float = 0.5
+FETCH_BACKOFF_CAP: float = 30.0
+# Adaptive batching: longest request URL, and where working batch sizes are remembered
+MAX_URL_LENGTH: int = 2000
+BATCH_SIZES_FILE: Path = DATA_DIR / "fetch_batch_sizes.json"
+# On-disk response cache: location, size bound (LRU eviction) and per-endpoint TTL in seconds
+HTTP_CACHE_DIR: Path = DATA_DIR / "http_cache"
+HTTP_CACHE_MAX_BYTES: int = 512 * 1024 * 1024
+HTTP_CACHE_TTL: dict[str, float] = {
+    "countries": 30 * 86400,
+    "indicators": 30 * 86400,
+    "timeseries": 7 * 86400,
+    "default": 86400,
+}
+# Release manifest kept in the data folder (index of release files, see datasets/releases.py)
+RELEASE_MANIFEST_NAME = "releases.json"
+# Vintage store: every ingested WEO release, stored as changes against the previous one
+VINTAGE_DB: Path = DATA_DIR / "vintages.sqlite"
+# Threads used to run independent nodes of the derived-feature DAG (features/registry.py)
+FEATURE_THREADS: int = 4
+# Virtual derived indicators (e.g. NGDPD_index2008) kept in memory once computed
+VIRTUAL_CACHE_SIZE: int = 32
+# Dashboard figure cache: backend ("memory", "sqlite" shared by gunicorn workers, or "off"),
+# shared store location and size bound (least recently used figures are evicted beyond it)
+FIGURE_CACHE_BACKEND: str = os.getenv("MACRO_FIGURE_CACHE", "memory")
+FIGURE_CACHE_DB: Path = DATA_DIR / "figure_cache.sqlite"
+FIGURE_CACHE_MAX_BYTES: int = 256 * 1024 * 1024
 # Dashboard indicators (treat as constants)
 INDICATORS: tuple[str, ...] = (
     "LP", "NGDPD", "PPPPC", "NGDPDPC", "PCPIEPCH", "LUR", "NGDP_RPCH"
@@ -24,12 +63,33 @@ EUROPE_ISO3: frozenset[str] = frozenset((
 
 # Non-European extras for dashboards
 EXTRAS_ISO3: frozenset[str] = frozenset((
-    "USA","PHL","CHN","KOR","CHE","CHL","JPN","IND","THA","UZB","VNM",
+    "USA","PHL","CHN","KOR","CHE","CHL","JPN","IND","THA","UZB","VNM","CAN",
 ))
 
 # Single source of truth for dashboard countries
 COUNTRIES_ISO3: tuple[str, ...] = tuple(sorted(EUROPE_ISO3 | EXTRAS_ISO3))
 
+# Regional aggregates shown as pseudo-countries: code -> (label, member ISO3 codes)
+AGGREGATE_GROUPS: dict[str, tuple[str, tuple[str, ...]]] = {
+    "EU27": ("European Union", (
+        "AUT","BEL","BGR","CYP","CZE","DEU","DNK","ESP","EST","FIN","FRA","GRC","HRV","HUN",
+        "IRL","ITA","LTU","LUX","LVA","MLT","NLD","POL","PRT","ROU","SVK","SVN","SWE",
+    )),
+    "EA20": ("Euro area", (
+        "AUT","BEL","CYP","DEU","ESP","EST","FIN","FRA","GRC","HRV","IRL","ITA","LTU","LUX",
+        "LVA","MLT","NLD","PRT","SVK","SVN",
+    )),
+    "G7": ("G7", ("CAN","DEU","FRA","GBR","ITA","JPN","USA")),
+}
+# How each indicator is aggregated: "sum" of the members, or a mean weighted by "NGDPD" (nominal
+# GDP), "PPP" (PPPPC x LP, GDP at PPP) or "LP" (population). Other indicators are not aggregated.
+AGGREGATE_METHODS: dict[str, str] = {
+    "LP": "sum", "NGDPD": "sum", "NGDPDPC": "LP", "PPPPC": "LP",
+    "PCPIEPCH": "PPP", "NGDP_RPCH": "PPP", "LUR": "LP",
+}
+# Sums need every declared member; weighted means need at least this share of them (value and weight)
+AGGREGATE_MIN_COVERAGE: float = 0.9
+
 # Reliable upstreams for GeoJSON maps (primary + fallback)
 NATURAL_EARTH_URL: str = (
     "https://raw.githubusercontent.com/nvkelso/natural-earth-vector/master/geojson/"
@@ -2,8 +2,12 @@ import re
 import pandas as pd
 from pathlib import Path
 from typing import Iterable
-from macroeconomics.core.constants import COUNTRIES_ISO3,INDICATORS,DATA_DIR, FIGURE_DIR, LOG_DIR,ASSETS_DIR
+from macroeconomics.core.constants import COUNTRIES_ISO3,INDICATORS,DATA_DIR, FIGURE_DIR, LOG_DIR,ASSETS_DIR, AGGREGATE_GROUPS
 from macroeconomics.logging_config import logger
+from macroeconomics.datasets.releases import latest_release_files
+from macroeconomics.datasets.schema import enforce_schema
+from macroeconomics.datasets.storage import parquet_available, read_timeseries
+from macroeconomics.features.aggregates import load_aggregates
 
 def ensure_dirs(paths: Iterable[Path] | None = None) -> None:
     """
@@ -17,7 +21,7 @@ def notInDictionary(codes, dict):
     '''Ensure the country codes are in the dictionary'''
     missing_countries = set(codes) - set(dict.keys())
     if missing_countries:
-        logger.warning("These country codes are missing from the dictionary:", missing_countries)
+        logger.warning(f"These country codes are missing from the dictionary: {sorted(missing_countries)}")
         
 def get_suffix(units_dict):
     suffix_dict = {}
@@ -37,6 +41,7 @@ def get_suffix(units_dict):
 def do_patterns(do_features: bool = False) -> dict[str, str]:
     patterns = {
         "time_series": r"imf_weo_timeseries_(\d{4})_(april|october)\.csv",
+        "time_series_parquet": r"imf_weo_timeseries_(\d{4})_(april|october)\.parquet",
         "countries":   r"imf_weo_countries_(\d{4})_(april|october)\.csv",
         "indicators":  r"imf_weo_indicators_(\d{4})_(april|october)\.csv",
     }
@@ -44,55 +49,57 @@ def do_patterns(do_features: bool = False) -> dict[str, str]:
         return patterns
 
     # Only mutate keys that produce feature-augmented files
-    mutate = {"time_series", "indicators"}
+    mutate = {"time_series", "time_series_parquet", "indicators"}
     return {
-        k: re.sub(r"\.csv$", "_with_features.csv", v) if k in mutate else v
+        k: re.sub(r"\.(csv|parquet)$", r"_with_features.\1", v) if k in mutate else v
         for k, v in patterns.items()
     }
 
-def find_latest_files_and_year(data_folder, do_features=False, prompt_on_mismatch=False):
-    '''Ensure the input file is the latest IMF information'''
-    data_folder = Path(data_folder)
-
-    patterns = do_patterns(do_features)
-
-    latest_files = {}
-    years = {}
-
-    for key, pattern in patterns.items():
-        matched_files = []
-        for file_path in data_folder.iterdir():
-            if file_path.is_file():
-                match = re.match(pattern, file_path.name)
-                if match:
-                    year = match.group(1)
-                    mod_time = file_path.stat().st_mtime
-                    matched_files.append((file_path, mod_time, year))
-        if matched_files:
-            latest_file = max(matched_files, key=lambda x: x[1])
-            latest_files[key] = latest_file[0]
-            years[key] = latest_file[2]
+def preferred_timeseries_file(latest_files):
+    """The Parquet copy of the timeseries when it exists, is readable and is not older than the CSV."""
+    csv_path = latest_files.get("time_series")
+    parquet_path = latest_files.get("time_series_parquet")
+    if parquet_path is None or not parquet_available():
+        return csv_path
+    if csv_path is None:
+        return parquet_path
+    if parquet_path.stem == csv_path.stem and parquet_path.stat().st_mtime >= csv_path.stat().st_mtime:
+        return parquet_path
+    return csv_path
 
-    # Check if years differ between files and send a warning if so
-    unique_years = set(years.values())
-    if len(unique_years) > 1:
+def find_latest_files_and_year(data_folder, do_features=False, prompt_on_mismatch=False):
+    '''
+    Ensure the input file is the latest IMF information: the newest release by tag, looked up in
+    the folder's release manifest (rebuilt by scanning the folder when it is missing or stale).
+    '''
+    latest_files, latest_year = latest_release_files(data_folder, do_features=do_features)
+    missing = set(do_patterns(do_features)) - set(latest_files) - {"time_series_parquet"}
+    if latest_files and missing:
+        logger.warning(f"Release {latest_year} has no {sorted(missing)} files in {data_folder}")
         if prompt_on_mismatch:
-            logger.warning(f"Different data years found in files: {years}")
             cont = input("Continue with these files? (y/n): ")
             if cont.lower() != 'y':
-                raise RuntimeError("Execution stopped by user due to mismatched file years.")
-    latest_year = max_year = max(int(y) for y in years.values()) if years else None
+                raise RuntimeError("Execution stopped by user due to incomplete release files.")
     return latest_files, latest_year
 
-def get_shared_data_components(do_features=False, country_codes=None, indicator_codes=None):
-    """Get the same data loading logic as plot.py and dash_app.py"""
-    
-    country_codes = country_codes or COUNTRIES_ISO3
+def get_shared_data_components(do_features=False, country_codes=None, indicator_codes=None, years=None, float32=False,
+                               aggregates=None):
+    """
+    Get the same data loading logic as plot.py and dash_app.py.
+    Countries (defaulting to COUNTRIES_ISO3), explicitly requested indicators and a (start, end)
+    year range are pushed down to the timeseries reader, so only the matching rows are loaded.
+    The timeseries frame follows the compact schema (categorical codes/names, int16 year);
+    `float32=True` also stores values as float32. `aggregates` (True for every group in
+    AGGREGATE_GROUPS, or a list of codes) adds regional aggregates as pseudo-countries.
+    """
+    # Only an explicit indicator list narrows the timeseries; features keep every loaded indicator
+    indicator_filter = list(indicator_codes) if indicator_codes else None
+    country_codes = COUNTRIES_ISO3 if country_codes is None else country_codes
     indicator_codes = indicator_codes or INDICATORS
     
     # Use same file loading
     latest_files, latest_year = find_latest_files_and_year(data_folder=DATA_DIR, do_features=do_features)
-    TIMESERIES_FILE = latest_files.get("time_series")
+    TIMESERIES_FILE = preferred_timeseries_file(latest_files)
     COUNTRIES_FILE = latest_files.get("countries")
     INDICATORS_FILE = latest_files.get("indicators")
 
@@ -101,12 +108,16 @@ def get_shared_data_components(do_features=False, country_codes=None, indicator_
     logger.info(f"Countries file: {COUNTRIES_FILE}")
     logger.info(f"Indicators file: {INDICATORS_FILE}")
     # Load same dictionaries
-    #Protect in case the csv gets to be extremely big
-    filtered_chunks = []
-    for chunk in pd.read_csv(TIMESERIES_FILE, chunksize=10000):
-        filtered_chunk = chunk[chunk['country'].isin(country_codes)]
-        filtered_chunks.append(filtered_chunk)
-    df_timeseries = pd.concat(filtered_chunks)
+    df_timeseries = read_timeseries(TIMESERIES_FILE, countries=country_codes, indicators=indicator_filter, years=years, float32=float32)
+    aggregate_codes = list(AGGREGATE_GROUPS) if aggregates is True else list(aggregates or [])
+    if aggregate_codes:
+        df_agg = load_aggregates(TIMESERIES_FILE)
+        df_agg = df_agg[df_agg["country"].isin(aggregate_codes)]
+        if indicator_filter:
+            df_agg = df_agg[df_agg["indicator"].isin(indicator_filter)]
+        if years is not None:
+            df_agg = df_agg[df_agg["year"].between(years[0] or -32768, years[1] or 32767)]
+        df_timeseries = pd.concat([d for d in (df_timeseries, df_agg) if len(d)] or [df_agg], ignore_index=True)
     df_countries = pd.read_csv(latest_files.get("countries"))
     df_indicators = pd.read_csv(latest_files.get("indicators"))
     df_countries_fil = df_countries[df_countries['id'].isin(country_codes)]
@@ -118,12 +129,14 @@ def get_shared_data_components(do_features=False, country_codes=None, indicator_
     df_indicators.columns = df_indicators.columns.str.strip()
     df_indicators["id"] = df_indicators["id"].astype(str)
     country_dict = pd.Series(df_countries_fil['label'].values, index=df_countries_fil['id']).to_dict()
+    country_dict |= {code: AGGREGATE_GROUPS[code][0] for code in aggregate_codes}
     indicators_dict = pd.Series(df_indicators_fil['label'].values, index=df_indicators_fil['id']).to_dict()
     units_dict = pd.Series( df_indicators_fil["unit"].values, index=df_indicators_fil["id"]).to_dict()
     notInDictionary(country_codes, country_dict)
     notInDictionary(indicator_codes,indicators_dict)
 
     df_timeseries['country_name'] = df_timeseries['country'].map(country_dict)
+    df_timeseries = enforce_schema(df_timeseries, float32=float32)
 
     # Create the same indicator options as dash_app.py
     country_options = [{"label": country_dict.get(cid, cid), "value": cid} for cid in sorted(country_dict)]
@@ -143,6 +156,6 @@ def get_shared_data_components(do_features=False, country_codes=None, indicator_
         'country_options':country_options,
         'indicator_options': indicator_options, 
         'default_indicator': default_indicator,
-        'suffix': suffix  
+        'suffix': suffix,
 
     }
@@ -2,15 +2,21 @@
 from pathlib import Path
 import pandas as pd
 import os
-from dash import Dash, dcc, html, Input, Output
-from macroeconomics.core.functions import get_shared_data_components
-from macroeconomics.viz.charts.timeseries import makePlotly
-from macroeconomics.viz.maps.europe_interactive_map import make_europe_map
+from dash import ClientsideFunction, Dash, dcc, html, Input, Output
+from flask import jsonify
+from macroeconomics.core.functions import get_shared_data_components, preferred_timeseries_file
+from macroeconomics.datasets.query import SeriesIndex
+from macroeconomics.viz.charts.timeseries import makePlotly, timeseries_store
+from macroeconomics.viz.maps.europe_interactive_map import map_context, render_europe_map
 from macroeconomics.core.constants import DATA_DIR, INDICATORS
+from macroeconomics.features.build_features import parse_baselines
+from macroeconomics.features.virtual import VirtualIndicators
+from macroeconomics.viz.figure_cache import make_figure_cache, release_id
 from macroeconomics.logging_config import logger
 
-def create_timeseries_layout(country_options, indicator_options, default_countries, default_indicators, YEAR_MIN, YEAR_MAX, marks):
-    return html.Div(
+def create_timeseries_layout(country_options, indicator_options, default_countries, default_indicators, YEAR_MIN, YEAR_MAX, marks,
+                             clientside=False):
+    layout = html.Div(
         style={"maxWidth": "1100px", "margin": "0 auto", "fontFamily": "Arial, sans-serif"},
         children=[
             html.Div(
@@ -63,6 +69,10 @@ def create_timeseries_layout(country_options, indicator_options, default_countri
             dcc.Graph(id="macro-graph", style={"height": "72vh"}),
         ],
     )
+    if clientside:
+        # series of the selected indicator, filtered in the browser (assets/clientside.js)
+        layout.children.append(dcc.Store(id="series-store"))
+    return layout
 def create_map_layout(indicator_options, default_indicators, years):
     """New map tab layout"""
     return html.Div([
@@ -102,11 +112,15 @@ def create_map_layout(indicator_options, default_indicators, years):
 
 def create_app(args=None):
     do_features = os.getenv("MACRO_DO_FEATURES", "0") == "1"
-    baseline = int(os.getenv("MACRO_BASELINE", "2019"))
+    baseline = os.getenv("MACRO_BASELINE", "2019")
+    float32 = os.getenv("MACRO_FLOAT32", "0") == "1"  # opt-in: halve the value column
+    aggregates = os.getenv("MACRO_AGGREGATES", "1") == "1"  # EU27/EA20/G7 as pseudo-countries
+    clientside = os.getenv("MACRO_CLIENTSIDE", "0") == "1"  # countries/years filtered in the browser
     if args is not None:
         do_features = getattr(args, "do_features", do_features)
         baseline = getattr(args, "baseline", baseline)
-    data = get_shared_data_components(do_features)  # returns a dict
+        clientside = getattr(args, "clientside", False) or clientside
+    data = get_shared_data_components(do_features, float32=float32, aggregates=aggregates)  # returns a dict
     df_timeseries = data["time_series"]
     df_countries = data["countries"]
     df_indicators = data["df_indicators"]
@@ -117,6 +131,21 @@ def create_app(args=None):
     country_options = data["country_options"]
     indicator_options = data["indicator_options"]
     unit_suffix_dict = data["suffix"]
+    series_index = SeriesIndex(df_timeseries)  # built once, serves every update_graph call
+    map_state = {}
+    # Rendered figures are cached per release (older releases are purged) and app configuration (part
+    # of the key only); with MACRO_FIGURE_CACHE=sqlite the store is shared by every gunicorn worker
+    figure_cache = make_figure_cache(
+        release_id(preferred_timeseries_file(data["latest_files"])),
+        namespace=f"features={int(do_features)}|float32={int(float32)}|aggregates={int(aggregates)}|baseline={baseline}")
+    map_indicator_options = indicator_options
+    virtual = None
+    if not do_features:
+        # Derived series for the baseline year(s) are offered too, computed on first selection
+        virtual = VirtualIndicators(df_timeseries, df_indicators)
+        df_indicators, indicators_dict, unit_suffix_dict = virtual.extend(
+            virtual.codes(parse_baselines(baseline)), df_indicators, indicators_dict, unit_suffix_dict)
+        indicator_options = [{"label": indicators_dict.get(iid, iid), "value": iid} for iid in sorted(indicators_dict)]
     # Infer available years from wide timeseries columns that look like integers
     years = sorted(y for y in df_timeseries["year"].dropna().unique())
     YEAR_MIN, YEAR_MAX = int(years[0]), int(years[-1])
@@ -128,6 +157,11 @@ def create_app(args=None):
     app.server.config.update(
         SECRET_KEY=os.getenv("SECRET_KEY", "dev-secret")
     )
+    app.figure_cache = figure_cache
+
+    @app.server.route("/figure-cache/stats")
+    def figure_cache_stats():
+        return jsonify(figure_cache.stats() if figure_cache is not None else {"backend": "off"})
     app.layout = html.Div(
         style={"maxWidth": "1200px", "margin": "0 auto", "fontFamily": "Arial, sans-serif"},
         children=[
@@ -153,36 +187,75 @@ def create_app(args=None):
         if active_tab == "tab-timeseries":
             return create_timeseries_layout(
                 country_options, indicator_options, default_countries, 
-                default_indicators, YEAR_MIN, YEAR_MAX, marks
+                default_indicators, YEAR_MIN, YEAR_MAX, marks, clientside=clientside
             )
         elif active_tab == "tab-map":
-            return create_map_layout(indicator_options, default_indicators, years)
-    #timeseries callback
-    @app.callback(
-        Output("macro-graph", "figure"),
-        Input("countries", "value"),
-        Input("indicator", "value"),
-        Input("year-range", "value"),
-
-    )
-
-    def update_graph(countries, indicator, year_range):
-        if not countries or not indicator or not year_range:
-            return {}
-        y0, y1 = int(year_range[0]), int(year_range[1])
-        # Filter tidy data
-        df = df_timeseries[
-            (df_timeseries["country"].isin(countries)) &
-            (df_timeseries["indicator"] == indicator) &
-            (df_timeseries["year"].between(y0, y1))
-        ].copy()
+            return create_map_layout(map_indicator_options, default_indicators, years)
+    def graph_frame(countries, indicator, years=None):
+        if virtual is not None and indicator in virtual:
+            df = virtual.frame(indicator, countries=countries, years=years)
+        else:
+            # Slice lookups in the prebuilt index: cost follows the rows returned, not the dataset
+            df = series_index.frame(indicator, countries, years=years)
         # Guarantee country_name exists (in case)
         if "country_name" not in df.columns:
             df["country_name"] = df["country"].map(country_dict)
+        return df
+
+    def build_graph(countries, indicator, y0, y1):
+        df = graph_frame(countries, indicator, years=(y0, y1))
         # Use makePlotly with expected signature
         fig = makePlotly(df, indicator, indicators_dict, unit_suffix_dict, df_indicators, latest_year, save_html=False, suffix=None)
         return fig
 
+    if clientside:
+        # The server only answers indicator changes, with every country's series for the store;
+        # country and year-range changes are handled by filter_timeseries in the browser
+        all_countries = [o["value"] for o in country_options]
+
+        def build_store(indicator):
+            df = graph_frame(all_countries, indicator)
+            return timeseries_store(df, indicator, indicators_dict, unit_suffix_dict, df_indicators, latest_year)
+
+        @app.callback(
+            Output("series-store", "data"),
+            Input("indicator", "value"),
+        )
+        def update_store(indicator):
+            if not indicator:
+                return None
+            if figure_cache is None:
+                return build_store(indicator)
+            return figure_cache.get_or_build("timeseries-store", {"indicator": indicator},
+                                             lambda: build_store(indicator))
+
+        app.clientside_callback(
+            ClientsideFunction(namespace="macro", function_name="filter_timeseries"),
+            Output("macro-graph", "figure"),
+            Input("series-store", "data"),
+            Input("countries", "value"),
+            Input("year-range", "value"),
+        )
+    else:
+        #timeseries callback
+        @app.callback(
+            Output("macro-graph", "figure"),
+            Input("countries", "value"),
+            Input("indicator", "value"),
+            Input("year-range", "value"),
+
+        )
+
+        def update_graph(countries, indicator, year_range):
+            if not countries or not indicator or not year_range:
+                return {}
+            y0, y1 = int(year_range[0]), int(year_range[1])
+            if figure_cache is None:
+                return build_graph(countries, indicator, y0, y1)
+            # the figure does not depend on the order countries were picked in
+            inputs = {"countries": sorted(set(countries)), "indicator": indicator, "years": [y0, y1]}
+            return figure_cache.get_or_build("timeseries", inputs, lambda: build_graph(countries, indicator, y0, y1))
+
     # Map callback
     @app.callback(
         Output("europe-map", "figure"),
@@ -194,18 +267,14 @@ def create_app(args=None):
 
         if not indicator:
             return {}
-        
-        # Filter data for the specific year and indicator for map
-        map_data = df_timeseries[
-            (df_timeseries["indicator"] == indicator) &
-            (df_timeseries["year"] == year)
-        ].copy()
-        
-        # Call your existing map function with filtered data
-        fig = make_europe_map(do_features,
-                              save_html=False,
-                              do_buttons=False,        
-                              custom_indicator=indicator,
-                              custom_year=year)
-        return fig
+        # Data and clipped geometry are prepared once, on the first map request, then reused
+        if figure_cache is None:
+            return build_map(indicator, year)
+        return figure_cache.get_or_build("map", {"indicator": indicator, "year": year},
+                                         lambda: build_map(indicator, year))
+
+    def build_map(indicator, year):
+        if "ctx" not in map_state:
+            map_state["ctx"] = map_context(data)
+        return render_europe_map(map_state["ctx"], custom_indicator=indicator, custom_year=year)
     return app
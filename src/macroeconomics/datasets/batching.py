@@ -0,0 +1,84 @@
+"""
+Adaptive country batching for Datamapper timeseries requests.
+
+Batches are packed against a maximum URL length instead of a fixed count, and the batch size
+that last worked for each indicator is remembered across runs in a small JSON file, together
+with the country codes that fail even on their own (those are requested alone next time, so a
+bad ID is not mistaken for a batch that is too large).
+"""
+from __future__ import annotations
+
+import json
+import math
+from pathlib import Path
+
+from macroeconomics.logging_config import logger
+from macroeconomics.core.constants import MAX_URL_LENGTH, BATCH_SIZES_FILE
+
+
+def plan_batches(country_ids, url_prefix: str, years_q: str = "", max_batch: int = 50,
+                 max_url_length: int = MAX_URL_LENGTH) -> list[list[str]]:
+    """
+    Greedily pack `country_ids` (in order) into batches of at most `max_batch` codes whose URL
+    `url_prefix + ",".join(batch) + years_q` stays within `max_url_length`.
+    A single code is always allowed, even if its URL is longer.
+    """
+    fixed = len(url_prefix) + len(years_q)
+    batches, batch, length = [], [], fixed
+    for code in country_ids:
+        extra = len(code) + (1 if batch else 0)
+        if batch and (len(batch) >= max_batch or length + extra > max_url_length):
+            batches.append(batch)
+            batch, length, extra = [], fixed, len(code)
+        batch.append(code)
+        length += extra
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+class BatchSizeMemory:
+    """Per-indicator batch sizes known to work, and codes that fail alone, persisted between runs."""
+    GROWTH = 1.25  # after a run without size failures, try slightly larger batches next time
+
+    def __init__(self, path: Path = BATCH_SIZES_FILE):
+        self.path = Path(path)
+        self.sizes: dict[str, int] = {}
+        self.bad: dict[str, list[str]] = {}
+        if self.path.exists():
+            try:
+                data = json.loads(self.path.read_text())
+                if "sizes" not in data:  # older files hold only {indicator: size}
+                    data = {"sizes": data}
+                self.sizes = {k: int(v) for k, v in data["sizes"].items()}
+                self.bad = {k: [str(c) for c in v] for k, v in data.get("bad", {}).items()}
+            except (ValueError, OSError, AttributeError) as e:
+                logger.warning(f"Ignoring unreadable batch size file {self.path}: {e}")
+
+    def size_for(self, indicator_id: str, cap: int) -> int:
+        return max(1, min(cap, self.sizes.get(indicator_id, cap)))
+
+    def bad_codes(self, indicator_id: str) -> list[str]:
+        return self.bad.get(indicator_id, [])
+
+    def update(self, indicator_id: str, ok_sizes, split: bool, cap: int, bad=()) -> None:
+        """
+        Record the outcome of one indicator's fetch. `split` means a batch of several codes failed
+        while its halves worked, i.e. it was too large; codes in `bad` fail even on their own and
+        say nothing about the size, so they are only remembered.
+        """
+        if bad:
+            self.bad[indicator_id] = sorted(set(bad))
+        else:
+            self.bad.pop(indicator_id, None)
+        if not ok_sizes:
+            return
+        if split:
+            self.sizes[indicator_id] = max(ok_sizes)
+        else:
+            tried = max(self.size_for(indicator_id, cap), max(ok_sizes))
+            self.sizes[indicator_id] = min(cap, max(tried, math.ceil(tried * self.GROWTH)))
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.write_text(json.dumps({"sizes": self.sizes, "bad": self.bad}, indent=2, sort_keys=True))
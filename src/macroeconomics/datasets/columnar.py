@@ -0,0 +1,85 @@
+"""
+Columnar accumulation of Datamapper timeseries.
+
+Instead of one dict per (country, year, value), observations are appended to typed arrays:
+uint16 country codes into a category table, int16 years and float64 values. Frames built from
+them carry a categorical `country` (categories sorted, so sorting stays lexical), int16 `year`
+and float64 `value`.
+
+Values are coerced to float64 on append: written CSVs show integers as "67.0" where the row-dict
+frames wrote "67", and non-numeric placeholders (e.g. "n/a") are written empty. The numbers
+themselves are unchanged.
+"""
+from __future__ import annotations
+
+import math
+from array import array
+
+import numpy as np
+import pandas as pd
+
+TIMESERIES_COLUMNS = ["country", "indicator", "year", "value"]
+
+
+def _to_float(val) -> float:
+    if val is None:
+        return math.nan
+    try:
+        return float(val)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+class TimeseriesColumns:
+    """Typed column buffers for one indicator."""
+    __slots__ = ("indicator_id", "_categories", "_codes", "_years", "_values")
+
+    def __init__(self, indicator_id: str):
+        self.indicator_id = indicator_id
+        self._categories: dict[str, int] = {}
+        self._codes = array("H")
+        self._years = array("h")
+        self._values = array("d")
+
+    def __len__(self) -> int:
+        return len(self._years)
+
+    def append_series(self, country: str, series: dict) -> None:
+        """Append one country's {year: value} mapping; keys that are not years are ignored."""
+        code = self._categories.setdefault(country, len(self._categories))
+        for year, val in series.items():
+            try:
+                yint = int(year)
+            except Exception:
+                continue
+            self._codes.append(code)
+            self._years.append(yint)
+            self._values.append(_to_float(val))
+
+    def extend(self, other: "TimeseriesColumns") -> None:
+        if not len(other):
+            return
+        remap = np.array(
+            [self._categories.setdefault(c, len(self._categories)) for c in other._categories],
+            dtype=np.uint16,
+        )
+        codes = remap[np.frombuffer(other._codes, dtype=np.uint16)]
+        self._codes.frombytes(codes.tobytes())
+        self._years.extend(other._years)
+        self._values.extend(other._values)
+
+    def to_frame(self) -> pd.DataFrame:
+        if not len(self):
+            return pd.DataFrame()
+        categories = list(self._categories)
+        country = pd.Categorical.from_codes(
+            np.frombuffer(self._codes, dtype=np.uint16).astype(np.int32), categories=categories
+        ).reorder_categories(sorted(categories))
+        n = len(self)
+        indicator = pd.Categorical.from_codes(np.zeros(n, dtype=np.int8), categories=[self.indicator_id])
+        return pd.DataFrame({
+            "country": country,
+            "indicator": indicator,
+            "year": np.frombuffer(self._years, dtype=np.int16).copy(),
+            "value": np.frombuffer(self._values, dtype=np.float64).copy(),
+        }, columns=TIMESERIES_COLUMNS)
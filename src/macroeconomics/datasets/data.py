@@ -4,8 +4,13 @@ import pandas as pd
 from datetime import datetime
 from urllib.parse import quote
 from macroeconomics.logging_config import logger
-from macroeconomics.core.constants import DATA_DIR, COUNTRIES_ISO3, INDICATORS
-from macroeconomics.datasets.imf_api import BASE, get_countries_df, get_indicators_df, fetch_timeseries_chunked
+from macroeconomics.core.constants import DATA_DIR, COUNTRIES_ISO3, INDICATORS, FETCH_MAX_PER_HOST, FETCH_RATE_LIMIT
+from macroeconomics.datasets.imf_api import BASE, get_countries_df, get_indicators_df, fetch_timeseries_chunked, iter_timeseries_parallel, configure_cache
+from macroeconomics.datasets.http_cache import OfflineCacheMiss, ResponseCache
+from macroeconomics.datasets.batching import BatchSizeMemory
+from macroeconomics.datasets.storage import PartitionedWriter, combine_partitions, parquet_available, partitions_to_parquet, read_partitioned
+from macroeconomics.datasets.vintages import VintageStore
+from macroeconomics.datasets.releases import register_release_files
 
 BASE = "https://www.imf.org/external/datamapper/api/v1/"
 def get_selected_indicators(args, valid_set):
@@ -35,14 +40,32 @@ def data_main(args):
 
     release_tag = latest_weo_release_tag()
 
+    offline = getattr(args, "offline", False)
+    cache = None
+    if getattr(args, "no_cache", False):
+        if offline:
+            logger.error("--offline replays from the response cache; it cannot be combined with --no-cache")
+            return
+    else:
+        cache = ResponseCache(offline=offline)
+        logger.info(f"Using response cache at {cache.root}{' (offline)' if offline else ''}")
+    configure_cache(cache)
+
     # Metadata
-    countries = get_countries_df()
-    indicators = get_indicators_df()
+    try:
+        countries = get_countries_df()
+        indicators = get_indicators_df()
+    except OfflineCacheMiss as e:
+        logger.error(f"--offline: country/indicator metadata is not in the response cache ({e}); "
+                     f"run `data` once online to fill it")
+        return
 
     suffix = '_debug' if args.debug else ''
 
-    countries.to_csv(DATA_DIR/f"imf_weo_countries_{release_tag}.csv", index=False)
-    indicators.to_csv(DATA_DIR/f"imf_weo_indicators_{release_tag}.csv", index=False)
+    countriesnm = DATA_DIR/f"imf_weo_countries_{release_tag}.csv"
+    indicatorsnm = DATA_DIR/f"imf_weo_indicators_{release_tag}.csv"
+    countries.to_csv(countriesnm, index=False)
+    indicators.to_csv(indicatorsnm, index=False)
 
     # Choose indicators (remove stray/invalid IDs)
 
@@ -65,10 +88,31 @@ def data_main(args):
     years = list(range(1990, y + 6))
 
     logger.info(f"Chosen indicators: {chosen_indicators}")
-    frames = []
-    for ind in selected_indicators:
+    workers = int(getattr(args, "workers", 1) or 1)
+    max_per_host = int(getattr(args, "max_per_host", None) or FETCH_MAX_PER_HOST)
+    memory = BatchSizeMemory()
+    missing = []
+    if getattr(args, "backend", "sync") == "async":
+        from macroeconomics.datasets.imf_async import iter_timeseries_async
+        rate = float(getattr(args, "rate", None) or FETCH_RATE_LIMIT)
+        logger.info(f"Fetching with the async backend at {rate} requests/s, at most {max_per_host} per host")
+        results = iter_timeseries_async(selected_indicators, country_codes, missing=missing, years=years, chunk_size=40,
+                                        rate=rate, max_per_host=max_per_host, memory=memory)
+    elif workers > 1:
+        logger.info(f"Fetching with {workers} workers, at most {max_per_host} requests per host")
+        results = iter_timeseries_parallel(selected_indicators, country_codes, years=years, chunk_size=40,
+                                           workers=workers, max_per_host=max_per_host, memory=memory, missing=missing)
+    else:
+        results = ((ind, fetch_timeseries_chunked(ind, country_codes, years=years, chunk_size=40, memory=memory,
+                                                  missing=missing))
+                   for ind in selected_indicators)
+
+    # Persist each indicator as soon as it arrives (one partition per indicator), so memory
+    # does not grow with the number of indicators
+    timeseriesnm = DATA_DIR / f"imf_weo_timeseries_{release_tag}{suffix}.csv"
+    writer = PartitionedWriter(timeseriesnm.with_suffix(""))
+    for ind, df in results:
         logger.info(f"processing: {ind}")
-        df = fetch_timeseries_chunked(ind, country_codes, years=years, chunk_size=40)
         if df is None or df.empty:
             logger.warning(f"Empty for {ind}, skipped")
             continue
@@ -78,16 +122,35 @@ def data_main(args):
         else:
             # Force to expected value in case upstream mislabeled
             df["indicator"] = ind
-        frames.append(df)
-
-    # Concatenate and write once
-    if frames:
-        out = pd.concat(frames, ignore_index=True)
-        out.drop_duplicates(subset=["indicator","country","year"], inplace=True)
-        out.sort_values(["indicator","country","year"], inplace=True)
-        timeseriesnm = DATA_DIR / f"imf_weo_timeseries_{release_tag}{suffix}.csv"
-        out.to_csv(timeseriesnm, index=False)
-        logger.info(f"Saved {len(out):,} rows to {timeseriesnm}")
+        writer.write(ind, df)
+        del df
+
+    # Stream the partitions into the single release CSV
+    if writer.partitions:
+        writer.finish()
+        combine_partitions(writer.root, timeseriesnm)
+        logger.info(f"Saved {writer.rows:,} rows to {timeseriesnm} ({len(writer.partitions)} partitions in {writer.root})")
+        release_files = {"time_series": timeseriesnm, "countries": countriesnm, "indicators": indicatorsnm}
+        if parquet_available():
+            parquetnm = partitions_to_parquet(writer.root, timeseriesnm.with_suffix(".parquet"))
+            logger.info(f"Saved columnar copy to {parquetnm}")
+            release_files["time_series_parquet"] = parquetnm
+        if not args.debug:
+            register_release_files(DATA_DIR, release_tag, release_files,
+                                   rows={"time_series": writer.rows, "time_series_parquet": writer.rows,
+                                         "countries": len(countries), "indicators": len(indicators)})
+        # Only full releases are vintages; a partial fetch would read as dropped observations
+        if not (args.debug or getattr(args, "indicators", None) or args.countries):
+            store = VintageStore()
+            store.add_release(release_tag, read_partitioned(writer.root))
+            store.close()
     else:
         logger.error("No data retrieved! check indicators/countries/year ranges.")
 
+    if missing:
+        for ind, codes in missing:
+            logger.warning(f"Missing countries for {ind}: {','.join(codes)}")
+        logger.warning(f"{len(missing)} indicators have countries that could not be fetched (failed or not cached)")
+    if cache is not None:
+        cache.log_stats()
+
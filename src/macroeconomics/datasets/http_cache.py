@@ -0,0 +1,222 @@
+"""
+Persistent cache for Datamapper responses.
+
+Response bodies are stored content-addressed (sha256 of the body) under HTTP_CACHE_DIR, and a
+small SQLite index maps each URL to its body, validators (ETag / Last-Modified) and timestamps.
+Entries younger than the endpoint TTL are served directly, stale ones are revalidated with a
+conditional request, and the least recently used entries are evicted once the cache exceeds
+`max_bytes`. In offline mode only the cache is consulted.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+import requests
+
+from macroeconomics.logging_config import logger
+from macroeconomics.core.constants import HTTP_CACHE_DIR, HTTP_CACHE_MAX_BYTES, HTTP_CACHE_TTL
+
+
+class OfflineCacheMiss(requests.HTTPError):
+    """No cached response for a URL in offline mode (an HTTPError so batch loops skip it like a failed request)."""
+
+
+@dataclass
+class CacheEntry:
+    url: str
+    digest: str
+    endpoint: str
+    etag: str | None
+    last_modified: str | None
+    fetched_at: float
+    size: int
+
+
+def endpoint_of(url: str) -> str:
+    """First path segment after the API version, e.g. 'timeseries' or 'countries'."""
+    path = url.split("?", 1)[0].rstrip("/")
+    parts = path.split("/")
+    if "v1" in parts:
+        i = parts.index("v1")
+        if i + 1 < len(parts):
+            return parts[i + 1]
+    return parts[-1]
+
+
+class ResponseCache:
+    def __init__(self, root: Path = HTTP_CACHE_DIR, max_bytes: int = HTTP_CACHE_MAX_BYTES,
+                 ttl: dict[str, float] | None = None, offline: bool = False, clock=time.time):
+        self.root = Path(root)
+        self.max_bytes = int(max_bytes)
+        self.ttl = dict(HTTP_CACHE_TTL if ttl is None else ttl)
+        self.offline = offline
+        self.stats = {"hits": 0, "revalidated": 0, "misses": 0, "evicted": 0}
+        self._clock = clock
+        self._lock = threading.Lock()
+        (self.root / "objects").mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(self.root / "index.sqlite", check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " url TEXT PRIMARY KEY, digest TEXT NOT NULL, endpoint TEXT NOT NULL,"
+            " etag TEXT, last_modified TEXT, fetched_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL, size INTEGER NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries(accessed_at)")
+        self._db.commit()
+
+    # -- storage -------------------------------------------------------
+    def _blob_path(self, digest: str) -> Path:
+        return self.root / "objects" / digest[:2] / digest
+
+    def lookup(self, url: str) -> CacheEntry | None:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT url, digest, endpoint, etag, last_modified, fetched_at, size FROM entries WHERE url = ?",
+                (url,),
+            ).fetchone()
+        if row is None:
+            return None
+        entry = CacheEntry(*row)
+        if not self._blob_path(entry.digest).exists():
+            return None
+        return entry
+
+    def load(self, entry: CacheEntry):
+        with self._lock:
+            self._db.execute("UPDATE entries SET accessed_at = ? WHERE url = ?", (self._clock(), entry.url))
+            self._db.commit()
+        return json.loads(self._blob_path(entry.digest).read_bytes())
+
+    def is_fresh(self, entry: CacheEntry) -> bool:
+        ttl = self.ttl.get(entry.endpoint, self.ttl.get("default", 0))
+        return self._clock() - entry.fetched_at < ttl
+
+    @staticmethod
+    def conditional_headers(entry: CacheEntry | None) -> dict[str, str]:
+        headers = {}
+        if entry is not None:
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+        return headers
+
+    def store(self, url: str, body: bytes, headers) -> None:
+        digest = hashlib.sha256(body).hexdigest()
+        blob = self._blob_path(digest)
+        if not blob.exists():
+            blob.parent.mkdir(parents=True, exist_ok=True)
+            # a private temp file per writer: threads storing the same body must not share one
+            with tempfile.NamedTemporaryFile(dir=blob.parent, prefix=f"{digest}.", suffix=".tmp", delete=False) as tmp:
+                tmp.write(body)
+            os.replace(tmp.name, blob)
+        now = self._clock()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, digest, endpoint_of(url), headers.get("ETag"), headers.get("Last-Modified"), now, now, len(body)),
+            )
+            self._db.commit()
+        self.evict()
+
+    def refresh(self, entry: CacheEntry, headers) -> None:
+        """Mark an entry as fresh again after a 304, updating validators when the server sent new ones."""
+        with self._lock:
+            self._db.execute(
+                "UPDATE entries SET fetched_at = ?, accessed_at = ?, etag = COALESCE(?, etag),"
+                " last_modified = COALESCE(?, last_modified) WHERE url = ?",
+                (self._clock(), self._clock(), headers.get("ETag"), headers.get("Last-Modified"), entry.url),
+            )
+            self._db.commit()
+
+    def total_bytes(self) -> int:
+        # Blobs shared by several URLs are counted once
+        with self._lock:
+            row = self._db.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM (SELECT digest, MAX(size) AS size FROM entries GROUP BY digest)"
+            ).fetchone()
+        return int(row[0])
+
+    def evict(self) -> None:
+        """Drop least recently used entries until the cache fits in max_bytes."""
+        total = self.total_bytes()
+        if total <= self.max_bytes:
+            return
+        with self._lock:
+            rows = self._db.execute("SELECT url, digest, size FROM entries ORDER BY accessed_at").fetchall()
+            for url, digest, size in rows:
+                if total <= self.max_bytes:
+                    break
+                self._db.execute("DELETE FROM entries WHERE url = ?", (url,))
+                still_used = self._db.execute("SELECT 1 FROM entries WHERE digest = ? LIMIT 1", (digest,)).fetchone()
+                if not still_used:
+                    self._blob_path(digest).unlink(missing_ok=True)
+                    total -= size
+                self.stats["evicted"] += 1
+            self._db.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    # -- request flow --------------------------------------------------
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self.stats[key] += 1
+
+    def probe(self, url: str) -> tuple[CacheEntry | None, bool]:
+        """
+        Return (entry, hit). `hit` means the entry can be served without a request; otherwise
+        `entry` (possibly None) is the stale copy to revalidate. Raises OfflineCacheMiss offline.
+        """
+        entry = self.lookup(url)
+        if self.offline:
+            if entry is None:
+                raise OfflineCacheMiss(f"Offline and not cached: {url}")
+            self._count("hits")
+            return entry, True
+        if entry is not None and self.is_fresh(entry):
+            self._count("hits")
+            return entry, True
+        return entry, False
+
+    def revalidated(self, entry: CacheEntry, headers):
+        """Handle a 304 for `entry` and return its cached payload."""
+        self._count("revalidated")
+        self.refresh(entry, headers)
+        return self.load(entry)
+
+    def downloaded(self, url: str, body: bytes, headers):
+        """Store a fresh 200 body and return its payload."""
+        self._count("misses")
+        self.store(url, body, headers)
+        return json.loads(body)
+
+    def get_json(self, url: str, fetch):
+        """
+        Serve `url` from the cache, revalidating or fetching through `fetch(headers) -> requests.Response`
+        when the entry is stale or missing.
+        """
+        entry, hit = self.probe(url)
+        if hit:
+            return self.load(entry)
+        r = fetch(self.conditional_headers(entry))
+        if entry is not None and r.status_code == 304:
+            return self.revalidated(entry, r.headers)
+        r.raise_for_status()
+        return self.downloaded(url, r.content, r.headers)
+
+    def log_stats(self) -> None:
+        s = self.stats
+        logger.info(
+            f"Response cache: {s['hits']} hits, {s['revalidated']} revalidated, {s['misses']} downloaded, "
+            f"{s['evicted']} evicted ({self.total_bytes() / 1e6:.1f} MB in {self.root})"
+        )
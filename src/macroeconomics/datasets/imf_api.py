@@ -1,13 +1,75 @@
+import threading
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor
 import requests
 import pandas as pd
-from urllib.parse import quote
+from requests.adapters import HTTPAdapter
+from urllib.parse import quote, urlsplit
 from macroeconomics.logging_config import logger
+from macroeconomics.core.constants import FETCH_WORKERS, FETCH_MAX_PER_HOST, FETCH_WINDOW, MAX_URL_LENGTH, IMF_API_BASE
+from macroeconomics.datasets.batching import plan_batches
+from macroeconomics.datasets.columnar import TimeseriesColumns
 
-BASE = "https://www.imf.org/external/datamapper/api/v1/"
+BASE = IMF_API_BASE
 
-def dm_get_json(path, timeout=60):
+_session = None
+_session_lock = threading.Lock()
+_cache = None  # optional http_cache.ResponseCache in front of dm_get_json
+
+def configure_cache(cache):
+    """Route dm_get_json through `cache` (a ResponseCache), or bypass caching with None."""
+    global _cache
+    _cache = cache
+
+def get_cache():
+    return _cache
+
+def make_session(pool_size=FETCH_WORKERS):
+    """Session with a keep-alive connection pool large enough for `pool_size` threads."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+def get_session():
+    """Module-wide pooled session, so consecutive calls reuse the same connections."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = make_session()
+    return _session
+
+class HostLimiter:
+    """Caps the number of in-flight requests per host across threads."""
+    def __init__(self, max_per_host=FETCH_MAX_PER_HOST):
+        self.max_per_host = max(1, int(max_per_host))
+        self._semaphores = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def slot(self, url):
+        host = urlsplit(url).netloc
+        with self._lock:
+            sem = self._semaphores.setdefault(host, threading.BoundedSemaphore(self.max_per_host))
+        with sem:
+            yield
+
+def dm_get_json(path, timeout=60, session=None, limiter=None):
     url = BASE + path
-    r = requests.get(url, timeout=timeout)
+    session = session or get_session()
+
+    def fetch(headers=None):
+        if limiter is None:
+            return session.get(url, timeout=timeout, headers=headers)
+        with limiter.slot(url):
+            return session.get(url, timeout=timeout, headers=headers)
+
+    if _cache is not None:
+        return _cache.get_json(url, fetch)
+    r = fetch()
     r.raise_for_status()
     return r.json()
 
@@ -17,70 +79,202 @@ def chunked(iterable, n):
     for i in range(0, len(iterable), n):
         yield iterable[i:i+n]
 
-def fetch_timeseries_chunked(indicator_id, country_ids, years=None, chunk_size=50, timeout=60):
+def periods_query(years):
+    if not years:
+        return ""
+    if isinstance(years, (list, tuple)):
+        return "?periods=" + ",".join(str(y) for y in years)
+    return "?periods=" + str(years)
+
+def timeseries_path(indicator_id, batch, years_q=""):
+    return f"timeseries/{quote(indicator_id)}/{','.join(batch)}{years_q}"
+
+def parse_timeseries_batch(js, indicator_id, batch, out=None):
+    """
+    Flatten one Datamapper timeseries response for the countries in `batch` into typed
+    columns (appending to `out` when given). Returns the TimeseriesColumns.
+    """
+    out = out if out is not None else TimeseriesColumns(indicator_id)
+    # Prefer values[indicator_id] when present; fall back to js['data'] only if it matches shape.
+    values = js.get("values", {})
+    data = values.get(indicator_id)
+
+    # If 'values' does not carry this indicator, try 'data' only if it looks like country->year dicts.
+    if data is None:
+        data = js.get("data")
+        # Validate shape conservatively: expect dict of countries mapping to dict of year->value
+        if not isinstance(data, dict) or not data:
+            return out
+        # Peek one item to check inner mapping looks like years
+        sample_series = next(iter(data.values()))
+        if not isinstance(sample_series, dict) or not sample_series:
+            return out
+        # Check keys look like years (numeric strings)
+        sample_key = next(iter(sample_series.keys()))
+        if not (isinstance(sample_key, str) and (sample_key.isdigit() or sample_key.replace("-", "").isdigit())):
+            return out
+
+    if not data:
+        return out
+
+    # Flatten
+    allowed = set(batch)
+    for ctry, series in data.items():
+        if ctry not in allowed:
+            continue
+        if not isinstance(series, dict):
+            continue
+        out.append_series(ctry, series)
+    return out
+
+def timeseries_url_prefix(indicator_id, base=None):
+    return (base or BASE) + f"timeseries/{quote(indicator_id)}/"
+
+@dataclass
+class BatchResult:
+    columns: TimeseriesColumns = None             # parsed observations, None when nothing was fetched
+    bad: list = field(default_factory=list)       # codes that fail even on their own
+    uncached: list = field(default_factory=list)  # codes skipped offline because nothing was cached
+    ok_sizes: list = field(default_factory=list)  # sizes of the requests that succeeded
+    split: bool = False                           # a multi-code batch failed while its halves worked
+
+    def merge(self, other):
+        if other.columns is not None:
+            if self.columns is None:
+                self.columns = TimeseriesColumns(other.columns.indicator_id)
+            self.columns.extend(other.columns)
+        self.bad.extend(other.bad)
+        self.uncached.extend(other.uncached)
+        self.ok_sizes.extend(other.ok_sizes)
+        self.split = self.split or other.split
+        return self
+
+    def to_frame(self):
+        return self.columns.to_frame() if self.columns is not None else pd.DataFrame()
+
+def fetch_timeseries_batch(indicator_id, batch, years_q="", timeout=60, session=None, limiter=None):
+    """
+    Fetch and flatten a single country batch. A failing batch is bisected until the country
+    codes that fail on their own are isolated; the rest of the batch is still returned.
+    """
+    from macroeconomics.datasets.http_cache import OfflineCacheMiss
+
+    path = timeseries_path(indicator_id, batch, years_q)
+    try:
+        js = dm_get_json(path, timeout=timeout, session=session, limiter=limiter)
+    except OfflineCacheMiss as e:
+        logger.warning(f"Batch not cached ({len(batch)} IDs): {e}")
+        return BatchResult(uncached=list(batch))
+    except requests.HTTPError as e:
+        if len(batch) == 1:
+            logger.info(f"Country failed on its own ({indicator_id}/{batch[0]}): {e}")
+            return BatchResult(bad=list(batch))
+        logger.info(f"Batch failed ({len(batch)} IDs), splitting: {e}")
+        mid = len(batch) // 2
+        result = BatchResult()
+        result.merge(fetch_timeseries_batch(indicator_id, batch[:mid], years_q, timeout, session, limiter))
+        result.merge(fetch_timeseries_batch(indicator_id, batch[mid:], years_q, timeout, session, limiter))
+        return mark_size_failure(result)
+    return BatchResult(columns=parse_timeseries_batch(js, indicator_id, batch), ok_sizes=[len(batch)])
+
+def mark_size_failure(result):
+    """
+    Result of a bisected batch: the batch only counts as too large when none of its codes fails
+    on its own; otherwise a bad code, not the batch size, made it fail.
+    """
+    if not result.bad:
+        result.split = True
+    return result
+
+def plan_indicator_batches(indicator_id, country_ids, years_q, chunk_size, memory=None,
+                           max_url_length=MAX_URL_LENGTH, base=None):
+    size = memory.size_for(indicator_id, chunk_size) if memory is not None else chunk_size
+    # codes that failed on their own last time are requested alone, after the others
+    known_bad = set(memory.bad_codes(indicator_id)) if memory is not None else set()
+    batches = plan_batches([c for c in country_ids if c not in known_bad], timeseries_url_prefix(indicator_id, base),
+                           years_q, max_batch=size, max_url_length=max_url_length)
+    return batches + [[c] for c in country_ids if c in known_bad]
+
+def _finish_indicator(indicator_id, result, memory, chunk_size, missing=None):
+    if result.bad:
+        logger.warning(f"{indicator_id}: no data for {','.join(result.bad)} (requests fail even one by one)")
+    if missing is not None and (result.bad or result.uncached):
+        missing.append((indicator_id, result.bad + result.uncached))
+    if memory is not None:
+        memory.update(indicator_id, result.ok_sizes, result.split, chunk_size, bad=result.bad)
+        memory.save()
+    return result.to_frame()
+
+def fetch_timeseries_chunked(indicator_id, country_ids, years=None, chunk_size=50, timeout=60, memory=None,
+                             missing=None):
     """
     Fetch indicator timeseries for many countries by chunking the country list.
+    Batches hold at most `chunk_size` codes (or the size remembered in `memory`, a BatchSizeMemory)
+    and are packed to stay under MAX_URL_LENGTH. Codes that could not be fetched (failing on
+    their own, or not cached offline) are appended to `missing` as (indicator, codes).
     Returns a tidy DataFrame with columns: country, indicator, year, value.
     """
-    all_rows = []
-    years_q = ""
-    if years:
-        if isinstance(years, (list, tuple)):
-            years_q = "?periods=" + ",".join(str(y) for y in years)
-        else:
-            years_q = "?periods=" + str(years)
-
-    for batch in chunked(country_ids, chunk_size):
-        countries_seg = ",".join(batch)
-        path = f"timeseries/{quote(indicator_id)}/{countries_seg}{years_q}"
-        try:
-            js = dm_get_json(path, timeout=timeout)
-        except requests.HTTPError as e:
-            logger.info(f"Batch failed ({len(batch)} IDs): {e}")
-            continue  # skip this batch, try next
-
-        # Prefer values[indicator_id] when present; fall back to js['data'] only if it matches shape.
-        values = js.get("values", {})
-        data = values.get(indicator_id)
-
-        # If 'values' does not carry this indicator, try 'data' only if it looks like country->year dicts.
-        if data is None:
-            data = js.get("data")
-            # Validate shape conservatively: expect dict of countries mapping to dict of year->value
-            if not isinstance(data, dict) or not data:
-                continue
-            # Peek one item to check inner mapping looks like years
-            sample_series = next(iter(data.values()))
-            if not isinstance(sample_series, dict) or not sample_series:
-                continue
-            # Check keys look like years (numeric strings)
-            sample_key = next(iter(sample_series.keys()))
-            if not (isinstance(sample_key, str) and (sample_key.isdigit() or sample_key.replace("-", "").isdigit())):
-                continue
-
-        if not data:
-            continue
+    years_q = periods_query(years)
+    result = BatchResult()
+    for batch in plan_indicator_batches(indicator_id, country_ids, years_q, chunk_size, memory):
+        result.merge(fetch_timeseries_batch(indicator_id, batch, years_q, timeout=timeout))
+    return _finish_indicator(indicator_id, result, memory, chunk_size, missing)
+
+def iter_timeseries_batches(indicator_id, country_ids, years=None, chunk_size=50, timeout=60, memory=None,
+                            missing=None):
+    """
+    Streaming variant of fetch_timeseries_chunked: yields one typed DataFrame per batch as soon
+    as it has been parsed, so callers can hand it downstream without holding the whole indicator.
+    """
+    years_q = periods_query(years)
+    summary = BatchResult()
+    for batch in plan_indicator_batches(indicator_id, country_ids, years_q, chunk_size, memory):
+        result = fetch_timeseries_batch(indicator_id, batch, years_q, timeout=timeout)
+        frame = result.to_frame()
+        result.columns = None
+        summary.merge(result)
+        if not frame.empty:
+            yield frame
+    _finish_indicator(indicator_id, summary, memory, chunk_size, missing)
+
+def iter_timeseries_parallel(indicator_ids, country_ids, years=None, chunk_size=50, timeout=60,
+                             workers=FETCH_WORKERS, max_per_host=FETCH_MAX_PER_HOST, memory=None,
+                             window=FETCH_WINDOW, missing=None):
+    """
+    Fetch every indicator x country-batch request on a thread pool sharing one pooled session.
+    Yields (indicator_id, DataFrame) in the order of `indicator_ids`; each frame is assembled in
+    batch order, so the result is identical to calling fetch_timeseries_chunked per indicator.
+    Batches are submitted for at most `window` indicators ahead of the one being yielded, so
+    finished results do not pile up while the caller writes them out.
+    """
+    years_q = periods_query(years)
+    session = make_session(pool_size=workers)
+    limiter = HostLimiter(max_per_host)
+    remaining = iter(indicator_ids)
+    try:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="imf-fetch") as pool:
+            def submit(ind):
+                return ind, [pool.submit(fetch_timeseries_batch, ind, batch, years_q, timeout, session, limiter)
+                             for batch in plan_indicator_batches(ind, country_ids, years_q, chunk_size, memory)]
+
+            pending = deque(submit(ind) for _, ind in zip(range(max(1, window)), remaining))
+            try:
+                while pending:
+                    ind, ind_futures = pending.popleft()
+                    result = BatchResult()
+                    for fut in ind_futures:
+                        result.merge(fut.result())
+                    following = next(remaining, None)
+                    if following is not None:
+                        pending.append(submit(following))
+                    yield ind, _finish_indicator(ind, result, memory, chunk_size, missing)
+            finally:
+                for _, ind_futures in pending:  # the caller stopped early
+                    for fut in ind_futures:
+                        fut.cancel()
+    finally:
+        session.close()  # also when the caller stops early or a batch raises
 
-        # Flatten
-        allowed = set(batch)
-        for ctry, series in data.items():
-            if ctry not in allowed:
-                continue
-            if not isinstance(series, dict):
-                continue
-            for year, val in series.items():
-                try:
-                    yint = int(year)
-                except Exception:
-                    continue
-                all_rows.append({
-                    "country": ctry,
-                    "indicator": indicator_id,
-                    "year": yint,
-                    "value": val
-                })
-
-    return pd.DataFrame(all_rows)
 def get_countries_df():
     js = dm_get_json("countries")
     rows = [{"id": k, **v} for k, v in js.get("countries", {}).items()]
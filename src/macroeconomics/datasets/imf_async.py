@@ -0,0 +1,214 @@
+"""
+asyncio backend for Datamapper timeseries requests.
+
+Indicator x country-batch requests are scheduled on one event loop, for a window of indicators
+ahead of the one being handed back, so memory does not grow with the release. A token bucket
+bounds the request rate, 429/5xx answers are retried with jittered exponential backoff,
+and batches that still fail after the last retry are reported instead of dropped silently.
+Requires the optional `aiohttp` dependency (`pip install macroeconomics[async]`).
+"""
+from __future__ import annotations
+
+import asyncio
+import random
+import time
+from collections import deque
+
+from macroeconomics.logging_config import logger
+from macroeconomics.core.constants import (
+    FETCH_MAX_PER_HOST, FETCH_WINDOW, FETCH_RATE_LIMIT, FETCH_BURST, FETCH_MAX_RETRIES, FETCH_BACKOFF_BASE, FETCH_BACKOFF_CAP,
+)
+from macroeconomics.datasets import imf_api
+from macroeconomics.datasets.imf_api import (
+    BatchResult, mark_size_failure, periods_query, plan_indicator_batches, timeseries_path, parse_timeseries_batch,
+)
+
+RETRY_STATUSES = frozenset((429, 500, 502, 503, 504))
+
+
+class TokenBucket:
+    """Allows `rate` acquisitions per second on average, with bursts of up to `capacity`."""
+    def __init__(self, rate: float, capacity: float | None = None, clock=time.monotonic):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self.tokens = self.capacity
+        self._clock = clock
+        self._updated = clock()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= 1.0:
+                    self.tokens -= 1.0
+                    return
+                await asyncio.sleep((1.0 - self.tokens) / self.rate)
+
+
+def backoff_delay(attempt: int, base: float = FETCH_BACKOFF_BASE, cap: float = FETCH_BACKOFF_CAP, rng=random) -> float:
+    """Full-jitter exponential backoff: uniform in [0, min(cap, base * 2**attempt)]."""
+    return rng.uniform(0.0, min(cap, base * (2 ** attempt)))
+
+
+def _retry_after(headers) -> float | None:
+    value = headers.get("Retry-After")
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class BatchFailed(Exception):
+    """Raised when a request is still failing after the last retry."""
+
+
+class NotCached(BatchFailed):
+    """Offline mode and the response cache has no copy of the request."""
+
+
+async def get_json(session, url, bucket: TokenBucket, timeout=60, max_retries=FETCH_MAX_RETRIES,
+                   backoff_base=FETCH_BACKOFF_BASE, cache=None):
+    import aiohttp
+    from macroeconomics.datasets.http_cache import OfflineCacheMiss
+
+    entry = None
+    if cache is not None:
+        try:
+            entry, hit = cache.probe(url)
+        except OfflineCacheMiss as e:
+            raise NotCached(str(e)) from e
+        if hit:
+            return cache.load(entry)
+    headers = cache.conditional_headers(entry) if cache is not None else None
+
+    last_error = None
+    for attempt in range(max_retries + 1):
+        await bucket.acquire()
+        wait = None
+        try:
+            async with session.get(url, headers=headers, timeout=aiohttp.ClientTimeout(total=timeout)) as resp:
+                if resp.status == 304 and entry is not None:
+                    return cache.revalidated(entry, resp.headers)
+                if resp.status in RETRY_STATUSES:
+                    last_error = f"HTTP {resp.status}"
+                    wait = _retry_after(resp.headers)
+                elif resp.status >= 400:
+                    raise BatchFailed(f"HTTP {resp.status} for {url}")
+                elif cache is not None:
+                    return cache.downloaded(url, await resp.read(), resp.headers)
+                else:
+                    return await resp.json(content_type=None)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            last_error = repr(e)
+        if attempt < max_retries:
+            delay = max(wait or 0.0, backoff_delay(attempt, base=backoff_base))
+            logger.debug(f"Retry {attempt + 1}/{max_retries} in {delay:.2f}s after {last_error}: {url}")
+            await asyncio.sleep(delay)
+    raise BatchFailed(f"{last_error} after {max_retries} retries for {url}")
+
+
+async def aiter_timeseries(indicator_ids, country_ids, years=None, chunk_size=50, timeout=60,
+                           rate=FETCH_RATE_LIMIT, burst=FETCH_BURST, max_per_host=FETCH_MAX_PER_HOST,
+                           max_retries=FETCH_MAX_RETRIES, backoff_base=FETCH_BACKOFF_BASE, base=None,
+                           cache=None, memory=None, window=FETCH_WINDOW):
+    """
+    Fetch the indicator x batch combinations concurrently, through `cache` (defaults to the
+    response cache configured in imf_api, if any). Batches that keep failing after retries are
+    bisected down to the country codes that fail on their own.
+    Yields (indicator, DataFrame, missing codes) in the order of `indicator_ids`, with requests in
+    flight for at most `window` indicators. Frames are assembled in batch order, as
+    fetch_timeseries_chunked does.
+    """
+    import aiohttp
+
+    base = base or imf_api.BASE
+    cache = cache if cache is not None else imf_api.get_cache()
+    years_q = periods_query(years)
+    bucket = TokenBucket(rate, burst)
+    connector = aiohttp.TCPConnector(limit_per_host=max_per_host)
+
+    async def one(session, ind, batch):
+        url = base + timeseries_path(ind, batch, years_q)
+        try:
+            js = await get_json(session, url, bucket, timeout=timeout, max_retries=max_retries,
+                                backoff_base=backoff_base, cache=cache)
+        except NotCached as e:
+            logger.warning(f"Batch not cached ({len(batch)} IDs): {e}")
+            return BatchResult(uncached=list(batch))
+        except BatchFailed as e:
+            if len(batch) == 1:
+                logger.warning(f"Country failed on its own ({ind}/{batch[0]}): {e}")
+                return BatchResult(bad=list(batch))
+            logger.info(f"Batch failed ({len(batch)} IDs), splitting: {e}")
+            mid = len(batch) // 2
+            left, right = await asyncio.gather(one(session, ind, batch[:mid]), one(session, ind, batch[mid:]))
+            return mark_size_failure(BatchResult().merge(left).merge(right))
+        return BatchResult(columns=parse_timeseries_batch(js, ind, batch), ok_sizes=[len(batch)])
+
+    async def indicator(session, ind):
+        batches = plan_indicator_batches(ind, country_ids, years_q, chunk_size, memory, base=base)
+        result = BatchResult()
+        for part in await asyncio.gather(*(one(session, ind, batch) for batch in batches)):
+            result.merge(part)
+        return result
+
+    async with aiohttp.ClientSession(connector=connector) as session:
+        remaining = iter(indicator_ids)
+        pending = deque((ind, asyncio.ensure_future(indicator(session, ind)))
+                        for _, ind in zip(range(max(1, window)), remaining))
+        try:
+            while pending:
+                ind, task = pending.popleft()
+                result = await task
+                following = next(remaining, None)
+                if following is not None:
+                    pending.append((following, asyncio.ensure_future(indicator(session, following))))
+                if memory is not None:
+                    memory.update(ind, result.ok_sizes, result.split, chunk_size, bad=result.bad)
+                    memory.save()
+                yield ind, result.to_frame(), result.bad + result.uncached
+        finally:
+            for _, task in pending:  # the caller stopped early
+                task.cancel()
+
+
+def _require_aiohttp():
+    try:
+        import aiohttp  # noqa: F401
+    except ImportError as e:
+        raise RuntimeError("The async backend needs aiohttp: pip install 'macroeconomics[async]'") from e
+
+
+def iter_timeseries_async(indicator_ids, country_ids, missing=None, **kwargs):
+    """
+    Synchronous generator for data_main: yields (indicator, DataFrame) as each indicator completes.
+    (indicator, codes) pairs that could not be fetched are appended to `missing`.
+    """
+    _require_aiohttp()
+    loop = asyncio.new_event_loop()
+    stream = aiter_timeseries(indicator_ids, country_ids, **kwargs)
+    try:
+        while True:
+            try:
+                ind, frame, codes = loop.run_until_complete(stream.__anext__())
+            except StopAsyncIteration:
+                break
+            if codes and missing is not None:
+                missing.append((ind, codes))
+            yield ind, frame
+    finally:
+        loop.run_until_complete(stream.aclose())
+        loop.close()
+
+
+def run_timeseries_async(indicator_ids, country_ids, **kwargs):
+    """All indicators at once: returns ({indicator: DataFrame}, missing (indicator, codes) pairs)."""
+    missing = []
+    frames = dict(iter_timeseries_async(indicator_ids, country_ids, missing=missing, **kwargs))
+    return frames, missing
@@ -0,0 +1,185 @@
+"""
+Local stand-in for the IMF Datamapper API (`/external/datamapper/api/v1/`).
+
+Serves `countries`, `indicators` and `timeseries/{indicator}/{countries}?periods=` with synthetic,
+deterministic payloads at a configurable scale, and can inject latency and errors. Point the
+fetch path at it with MACRO_IMF_BASE:
+
+    python -m macroeconomics.datasets.mock_datamapper --port 8765 --countries 200 --latency 0.05
+    MACRO_IMF_BASE=http://127.0.0.1:8765/external/datamapper/api/v1/ macroe data --workers 8
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from macroeconomics.core.constants import COUNTRIES_ISO3, INDICATORS
+
+API_PREFIX = "/external/datamapper/api/v1/"
+
+
+@dataclass
+class MockConfig:
+    n_countries: int = len(COUNTRIES_ISO3)   # real dashboard countries first, then synthetic codes
+    n_indicators: int = len(INDICATORS)      # real dashboard indicators first, then synthetic IDs
+    first_year: int = 1980
+    last_year: int = 2030
+    latency: float = 0.0                     # seconds added to every response
+    jitter: float = 0.0                      # extra uniform random latency in [0, jitter]
+    error_rate: float = 0.0                  # probability of answering 503 / 429
+    seed: int = 0
+    countries: list[str] = field(init=False)
+    indicators: list[str] = field(init=False)
+
+    def __post_init__(self):
+        synthetic = (f"X{i:02d}" if i < 100 else f"Y{i - 100:02d}" for i in range(200))
+        self.countries = (list(COUNTRIES_ISO3) + [c for c in synthetic if c not in COUNTRIES_ISO3])[:self.n_countries]
+        self.indicators = (list(INDICATORS) + [f"SYN{i:03d}" for i in range(self.n_indicators)])[:self.n_indicators]
+
+
+class MockDatamapper:
+    """Payload generator plus request counters; shared by the HTTP handler threads."""
+    def __init__(self, config: MockConfig):
+        self.config = config
+        self.requests = 0
+        self.errors = 0
+        self._rng = random.Random(config.seed)
+        self._lock = threading.Lock()
+        self._countries = set(config.countries)
+        self._indicators = set(config.indicators)
+
+    def countries_payload(self):
+        return {"countries": {c: {"label": f"Country {c}"} for c in self.config.countries}}
+
+    def indicators_payload(self):
+        return {"indicators": {
+            ind: {
+                "label": f"Indicator {ind}",
+                "description": f"Synthetic series {ind}",
+                "source": "Mock Datamapper",
+                "unit": "Percent change" if ind.endswith("PCH") else "Billions of U.S. dollars",
+                "dataset": "WEO",
+            }
+            for ind in self.config.indicators
+        }}
+
+    def series(self, indicator, country, years):
+        rng = random.Random(f"{self.config.seed}:{indicator}:{country}")
+        if indicator.endswith("PCH"):
+            return {str(y): round(rng.gauss(2.0, 3.0), 3) for y in years}
+        level, growth = rng.uniform(1, 5000), rng.uniform(-0.01, 0.05)
+        return {str(y): round(level * (1 + growth) ** (y - self.config.first_year), 3) for y in years}
+
+    def timeseries_payload(self, indicator, countries, years):
+        if indicator not in self._indicators:
+            return {"values": {}}
+        years = [y for y in years if self.config.first_year <= y <= self.config.last_year]
+        data = {c: self.series(indicator, c, years) for c in countries if c in self._countries}
+        return {"values": {indicator: data}}
+
+    def injected_status(self):
+        """Count the request and return 429/503 when an error should be injected, else None."""
+        with self._lock:
+            self.requests += 1
+            if self._rng.random() >= self.config.error_rate:
+                return None
+            self.errors += 1
+            return self._rng.choice((429, 503))
+
+    def delay(self):
+        extra = self.config.latency
+        if self.config.jitter:
+            with self._lock:
+                extra += self._rng.uniform(0, self.config.jitter)
+        if extra:
+            time.sleep(extra)
+
+
+def make_handler(mock: MockDatamapper):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+
+        def _send(self, status, payload=None, headers=None):
+            body = json.dumps(payload).encode() if payload is not None else b""
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            mock.delay()
+            status = mock.injected_status()
+            if status is not None:
+                return self._send(status, {"error": "injected"}, {"Retry-After": "0"})
+            parts = urlsplit(self.path)
+            if not parts.path.startswith(API_PREFIX):
+                return self._send(404, {"error": "not found"})
+            segments = [unquote(s) for s in parts.path[len(API_PREFIX):].split("/") if s]
+            if segments == ["countries"]:
+                return self._send(200, mock.countries_payload())
+            if segments == ["indicators"]:
+                return self._send(200, mock.indicators_payload())
+            if len(segments) == 3 and segments[0] == "timeseries":
+                periods = parse_qs(parts.query).get("periods", [""])[0]
+                if periods:
+                    years = [int(y) for y in periods.split(",") if y.strip().isdigit()]
+                else:
+                    years = list(range(mock.config.first_year, mock.config.last_year + 1))
+                return self._send(200, mock.timeseries_payload(segments[1], segments[2].split(","), years))
+            return self._send(404, {"error": "not found"})
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+@contextmanager
+def running_mock(config: MockConfig | None = None, host="127.0.0.1", port=0):
+    """Run the mock in a background thread; yields (base_url, MockDatamapper)."""
+    mock = MockDatamapper(config or MockConfig())
+    httpd = ThreadingHTTPServer((host, port), make_handler(mock))
+    httpd.daemon_threads = True
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://{host}:{httpd.server_address[1]}{API_PREFIX}", mock
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local IMF Datamapper stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--countries", type=int, default=len(COUNTRIES_ISO3))
+    parser.add_argument("--indicators", type=int, default=len(INDICATORS))
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    config = MockConfig(n_countries=args.countries, n_indicators=args.indicators, latency=args.latency,
+                        jitter=args.jitter, error_rate=args.error_rate, seed=args.seed)
+    with running_mock(config, args.host, args.port) as (base, mock):
+        print(f"Mock Datamapper serving {len(config.countries)} countries x {len(config.indicators)} indicators at {base}")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            print(f"{mock.requests} requests served ({mock.errors} injected errors)")
+
+
+if __name__ == "__main__":
+    main()
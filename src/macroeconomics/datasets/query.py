@@ -0,0 +1,74 @@
+"""
+Indexed lookups into a tidy timeseries frame for interactive callbacks.
+
+`SeriesIndex` is built once: the frame is sorted by (indicator, country, year) into flat numpy
+arrays, and a dict maps every (indicator, country) pair to its slice. A query resolves each
+requested country with one dict lookup and two binary searches on its year-sorted slice, so its
+cost depends on the rows it returns, not on how many rows the dataset holds; no boolean masks
+over the whole frame are built.
+"""
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+
+class SeriesIndex:
+    def __init__(self, df: pd.DataFrame):
+        df = df.sort_values(["indicator", "country", "year"])
+        indicator = df["indicator"].astype(str).to_numpy()
+        country = df["country"].astype(str).to_numpy()
+        self.years = df["year"].to_numpy()
+        self.values = df["value"].to_numpy()
+        self.year_dtype = df["year"].dtype
+        self.value_dtype = df["value"].dtype
+        new = np.r_[True, (indicator[1:] != indicator[:-1]) | (country[1:] != country[:-1])]
+        starts = np.flatnonzero(new)
+        stops = np.r_[starts[1:], len(df)]
+        self.slices = {(indicator[s], country[s]): (int(s), int(e)) for s, e in zip(starts, stops)}
+        self.country_names = {}
+        if "country_name" in df.columns:
+            firsts = df.drop_duplicates("country")
+            self.country_names = {c: n for c, n in zip(firsts["country"].astype(str), firsts["country_name"])
+                                   if pd.notna(n)}
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def __contains__(self, key) -> bool:
+        return key in self.slices
+
+    def positions(self, indicator, countries, years=None) -> tuple[np.ndarray, list[str], list[np.ndarray]]:
+        """Row positions of the selection (countries in sorted order), plus the country and positions of each run."""
+        pieces, labels = [], []
+        for c in sorted(set(countries)):
+            span = self.slices.get((indicator, c))
+            if span is None:
+                continue
+            start, stop = span
+            if years is not None:
+                y = self.years[start:stop]
+                lo, hi = years
+                stop = start + int(np.searchsorted(y, hi, side="right")) if hi is not None else stop
+                start = start + int(np.searchsorted(y, lo, side="left")) if lo is not None else start
+            if stop > start:
+                pieces.append(np.arange(start, stop))
+                labels.append(c)
+        return (np.concatenate(pieces) if pieces else np.empty(0, dtype=np.intp)), labels, pieces
+
+    def frame(self, indicator, countries, years=None) -> pd.DataFrame:
+        """Rows of one indicator for `countries` within an inclusive (start, end) year range."""
+        idx, labels, pieces = self.positions(indicator, countries, years)
+        codes = np.repeat(np.arange(len(labels)), [len(p) for p in pieces])
+        out = pd.DataFrame({
+            "country": pd.Categorical.from_codes(codes, categories=labels),
+            "indicator": pd.Categorical.from_codes(np.zeros(len(idx), dtype=np.int8), categories=[indicator]),
+            "year": self.years[idx].astype(self.year_dtype, copy=False),
+            "value": self.values[idx].astype(self.value_dtype, copy=False),
+        })
+        if self.country_names:
+            names = [self.country_names.get(c) for c in labels]
+            order = sorted(set(n for n in names if n is not None))
+            name_codes = np.array([order.index(n) if n is not None else -1 for n in names], dtype=np.int32)
+            out["country_name"] = pd.Categorical.from_codes(name_codes[codes], categories=order)
+        return out
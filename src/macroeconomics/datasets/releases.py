@@ -0,0 +1,157 @@
+"""
+Release manifest: a JSON index of the WEO release files in a data folder.
+
+data_main and features_main register the files they write (path, rows, bytes, sha256) under the
+release tag, and the tag of the newest release is kept at the top level, so finding the latest
+release is a dictionary lookup instead of a regex + stat() over every file in the folder. The
+parsed manifest is cached per process and only re-read when its mtime changes. When the manifest
+is missing, or lists a file that no longer exists, it is rebuilt by scanning the folder once.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+import time
+from pathlib import Path
+
+from macroeconomics.logging_config import logger
+from macroeconomics.core.constants import RELEASE_MANIFEST_NAME
+
+# WEO release tag, e.g. 2025_april
+RELEASE_RE = re.compile(r"(\d{4})_(april|october)$")
+# imf_weo_{timeseries|countries|indicators}_{YYYY}_{april|october}[_with_features].{csv|parquet}
+RELEASE_FILE_RE = re.compile(
+    r"imf_weo_(timeseries|countries|indicators)_(\d{4}_(?:april|october))(_with_features)?\.(csv|parquet)"
+)
+_KINDS = {("timeseries", "csv"): "time_series", ("timeseries", "parquet"): "time_series_parquet",
+          ("countries", "csv"): "countries", ("indicators", "csv"): "indicators"}
+# countries are not recomputed by features_main; a features set uses the release's plain file
+_SHARED = ("countries",)
+
+_cache: dict[Path, tuple[int, dict]] = {}
+
+
+def release_order(release: str) -> int:
+    """Chronological sort key of a release tag such as '2025_april'."""
+    m = RELEASE_RE.match(release)
+    if not m:
+        raise ValueError(f"Not a WEO release tag: {release!r}")
+    return int(m.group(1)) * 2 + (m.group(2) == "october")
+
+
+def classify(name: str):
+    """(tag, file key, is_features) for a release file name, else None."""
+    m = RELEASE_FILE_RE.fullmatch(name)
+    if not m:
+        return None
+    kind, tag, features, ext = m.groups()
+    key = _KINDS.get((kind, ext))
+    return (tag, key, bool(features)) if key else None
+
+
+def count_rows(path: Path) -> int:
+    if path.suffix == ".parquet":
+        import pyarrow.parquet as pq
+        return pq.ParquetFile(path).metadata.num_rows
+    with open(path, "rb") as f:
+        return max(sum(buf.count(b"\n") for buf in iter(lambda: f.read(1 << 20), b"")) - 1, 0)
+
+
+def file_entry(path: Path, rows: int | None = None) -> dict:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for buf in iter(lambda: f.read(1 << 20), b""):
+            digest.update(buf)
+    return {"path": path.name, "rows": count_rows(path) if rows is None else int(rows),
+            "bytes": path.stat().st_size, "sha256": digest.hexdigest()}
+
+
+def manifest_path(data_dir: Path) -> Path:
+    return Path(data_dir) / RELEASE_MANIFEST_NAME
+
+
+def _latest(releases: dict) -> str | None:
+    full = [t for t, r in releases.items() if "time_series" in r.get("files", {})]
+    return max(full, key=release_order) if full else None
+
+
+def save_manifest(data_dir: Path, manifest: dict) -> None:
+    manifest["latest"] = _latest(manifest["releases"])
+    manifest["updated_at"] = time.time()
+    path = manifest_path(data_dir)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(manifest, indent=2, sort_keys=True))
+    tmp.replace(path)
+
+
+def rebuild_manifest(data_dir: Path) -> dict:
+    """Scan the folder once and index every release file found."""
+    data_dir = Path(data_dir)
+    releases: dict[str, dict] = {}
+    for p in sorted(data_dir.iterdir()):
+        found = classify(p.name) if p.is_file() else None
+        if found is None:
+            continue
+        tag, key, features = found
+        section = releases.setdefault(tag, {"files": {}, "features": {}})
+        section["features" if features else "files"][key] = file_entry(p)
+    manifest = {"version": 1, "releases": releases}
+    save_manifest(data_dir, manifest)
+    logger.info(f"Rebuilt release manifest for {data_dir}: {len(releases)} releases, latest {manifest['latest']}")
+    return manifest
+
+
+def load_manifest(data_dir: Path) -> dict:
+    """The folder's manifest (rebuilt when missing), re-read only when the file changed."""
+    path = manifest_path(data_dir)
+    try:
+        mtime = path.stat().st_mtime_ns
+    except FileNotFoundError:
+        manifest = rebuild_manifest(data_dir)
+        _cache[path] = (path.stat().st_mtime_ns, manifest)
+        return manifest
+    cached = _cache.get(path)
+    if cached is None or cached[0] != mtime:
+        cached = (mtime, json.loads(path.read_text()))
+        _cache[path] = cached
+    return cached[1]
+
+
+def register_release_files(data_dir: Path, tag: str, files: dict[str, Path], features: bool = False,
+                           rows: dict[str, int] | None = None) -> dict:
+    """Record files just written for release `tag` (keys as in do_patterns) and update `latest`."""
+    data_dir = Path(data_dir)
+    manifest = load_manifest(data_dir)
+    section = manifest["releases"].setdefault(tag, {"files": {}, "features": {}})
+    target = section["features" if features else "files"]
+    for key, path in files.items():
+        target[key] = file_entry(Path(path), (rows or {}).get(key))
+    save_manifest(data_dir, manifest)
+    return manifest
+
+
+def latest_release_files(data_dir: Path, do_features: bool = False) -> tuple[dict[str, Path], int | None]:
+    """Files of the newest release (with its feature files when `do_features`) and its year."""
+    data_dir = Path(data_dir)
+    for attempt in range(2):
+        manifest = load_manifest(data_dir)
+        releases = manifest["releases"]
+        if do_features:
+            tags = [t for t, r in releases.items() if "time_series" in r.get("features", {})]
+            tag = max(tags, key=release_order) if tags else None
+        else:
+            tag = manifest.get("latest")
+        if tag is None:
+            return {}, None
+        release = releases[tag]
+        entries = dict(release["files"])
+        if do_features:
+            entries = {k: v for k, v in entries.items() if k in _SHARED} | release["features"]
+        files = {key: data_dir / e["path"] for key, e in entries.items()}
+        if all(p.exists() for p in files.values()):
+            return files, int(tag.split("_")[0])
+        if attempt == 0:
+            logger.warning(f"Release manifest lists missing files for {tag}; rescanning {data_dir}")
+            rebuild_manifest(data_dir)
+    return files, int(tag.split("_")[0])
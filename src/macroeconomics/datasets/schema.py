@@ -0,0 +1,81 @@
+"""
+Compact in-memory schema for timeseries frames.
+
+Every loader hands back the same dtypes: `country`, `indicator` and `country_name` as categoricals
+with lexically sorted categories (so sorting and plot order match plain strings), `year` as int16
+and `value` as float64, or float32 when asked for. `macroe inspect --memory` reports what this
+saves per column compared with the object/int64 frame the loaders used to return.
+"""
+from __future__ import annotations
+
+import pandas as pd
+
+from macroeconomics.logging_config import logger
+
+CATEGORICAL_COLUMNS = ("country", "indicator", "country_name")
+YEAR_DTYPE = "int16"
+
+
+def sort_categories(df: pd.DataFrame) -> pd.DataFrame:
+    """Give categorical columns lexically sorted categories, so sorting/plot order match plain strings."""
+    for col in df.columns:
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].cat.remove_unused_categories()
+            cats = df[col].cat.categories
+            if not cats.is_monotonic_increasing:
+                df[col] = df[col].cat.reorder_categories(sorted(cats))
+    return df
+
+
+def enforce_schema(df: pd.DataFrame, float32: bool = False) -> pd.DataFrame:
+    """Cast a tidy timeseries frame to the compact schema (columns that are absent are skipped)."""
+    casts = {}
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            casts[col] = "category"
+    if "year" in df.columns and df["year"].dtype != YEAR_DTYPE:
+        casts["year"] = YEAR_DTYPE
+    value_dtype = "float32" if float32 else "float64"
+    if "value" in df.columns and df["value"].dtype != value_dtype:
+        casts["value"] = value_dtype
+    if casts:
+        df = df.astype(casts)
+    return sort_categories(df)
+
+
+def legacy_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """The same frame with the dtypes loaders returned before the compact schema (object/int64/float64)."""
+    casts = {col: object for col in CATEGORICAL_COLUMNS if col in df.columns}
+    casts.update({col: dt for col, dt in (("year", "int64"), ("value", "float64")) if col in df.columns})
+    return df.astype(casts)
+
+
+def memory_report(before: pd.DataFrame, after: pd.DataFrame) -> pd.DataFrame:
+    """Per-column dtype and deep memory footprint (MB) of two versions of the same frame."""
+    mb = 1024 ** 2
+    b, a = before.memory_usage(deep=True, index=False), after.memory_usage(deep=True, index=False)
+    report = pd.DataFrame({
+        "dtype_before": before.dtypes.astype(str),
+        "MB_before": b / mb,
+        "dtype_after": after.dtypes.astype(str),
+        "MB_after": a / mb,
+    })
+    report.loc["total"] = ["", b.sum() / mb, "", a.sum() / mb]
+    report["saved"] = 1 - report["MB_after"] / report["MB_before"]
+    return report
+
+
+def inspect_main(args):
+    from macroeconomics.core.functions import get_shared_data_components, preferred_timeseries_file
+
+    if not getattr(args, "memory", False):
+        logger.info("Nothing to inspect; pass --memory")
+        return
+    float32 = getattr(args, "float32", False)
+    data = get_shared_data_components(getattr(args, "do_features", False), float32=float32)
+    after = data["time_series"]
+    report = memory_report(legacy_dtypes(after), after)
+    print(f"Timeseries frame: {len(after):,} rows from {preferred_timeseries_file(data['latest_files'])}"
+          f" (value as {'float32' if float32 else 'float64'})")
+    print(report.to_string(float_format=lambda v: f"{v:,.2f}",
+                           formatters={"saved": "{:.0%}".format}))
@@ -0,0 +1,256 @@
+"""
+On-disk layouts for timeseries releases.
+
+PartitionedWriter persists one CSV partition per indicator as soon as that indicator has been
+fetched (deduplicated and sorted within the partition), and a manifest.json lists the partitions
+so that together they read as one table. Because partitions are keyed by indicator and written
+in indicator order, concatenating them gives exactly the single sorted CSV that data_main used
+to produce, which combine_partitions does without loading more than one line at a time.
+
+Parquet copies of a release (written when the optional `pyarrow` dependency is installed) store
+`country` and `indicator` dictionary-encoded, int16 years and float64 values, sorted by
+indicator/country/year. Loaders prefer them over the CSVs, and read_timeseries pushes country,
+indicator and year predicates down to them so that only overlapping row groups are read.
+"""
+from __future__ import annotations
+
+import json
+import shutil
+from pathlib import Path
+
+import pandas as pd
+
+from macroeconomics.logging_config import logger
+from macroeconomics.datasets.schema import enforce_schema
+
+KEY_COLUMNS = ["indicator", "country", "year"]
+MANIFEST_NAME = "manifest.json"
+DICTIONARY_COLUMNS = ["country", "indicator"]
+PARQUET_ROW_GROUP_SIZE = 100_000
+CSV_CHUNK_ROWS = 200_000
+
+
+def partition_name(indicator: str) -> str:
+    return f"indicator={indicator}.csv"
+
+
+class PartitionedWriter:
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.partitions: dict[str, dict] = {}
+        self.root.mkdir(parents=True, exist_ok=True)
+        # A run rewrites the whole table: drop partitions left over from a previous run
+        for old in self.root.glob("indicator=*.csv"):
+            old.unlink()
+        (self.root / MANIFEST_NAME).unlink(missing_ok=True)
+
+    def write(self, indicator: str, df: pd.DataFrame) -> int:
+        """Deduplicate, sort and persist one indicator's rows. Returns the number of rows written."""
+        df = df.drop_duplicates(subset=KEY_COLUMNS).sort_values(KEY_COLUMNS)
+        name = partition_name(indicator)
+        df.to_csv(self.root / name, index=False)
+        self.partitions[indicator] = {"indicator": indicator, "path": name, "rows": len(df)}
+        return len(df)
+
+    @property
+    def rows(self) -> int:
+        return sum(p["rows"] for p in self.partitions.values())
+
+    def finish(self, columns=("country", "indicator", "year", "value")) -> dict:
+        manifest = {
+            "columns": list(columns),
+            "partition_by": "indicator",
+            "sorted_by": KEY_COLUMNS,
+            "rows": self.rows,
+            "partitions": [self.partitions[k] for k in sorted(self.partitions)],
+        }
+        (self.root / MANIFEST_NAME).write_text(json.dumps(manifest, indent=2))
+        return manifest
+
+
+def read_manifest(root: Path) -> dict:
+    return json.loads((Path(root) / MANIFEST_NAME).read_text())
+
+
+def read_partitioned(root: Path, indicators=None) -> pd.DataFrame:
+    """Read the partitioned table (optionally only some indicators) as one DataFrame."""
+    root = Path(root)
+    manifest = read_manifest(root)
+    wanted = set(indicators) if indicators else None
+    frames = [pd.read_csv(root / p["path"]) for p in manifest["partitions"]
+              if wanted is None or p["indicator"] in wanted]
+    if not frames:
+        return pd.DataFrame(columns=manifest["columns"])
+    return pd.concat(frames, ignore_index=True)
+
+
+def combine_partitions(root: Path, out_path: Path) -> Path:
+    """Stream every partition, in manifest order, into a single CSV with one header."""
+    root, out_path = Path(root), Path(out_path)
+    manifest = read_manifest(root)
+    tmp = out_path.with_name(out_path.name + ".tmp")
+    with open(tmp, "w", newline="") as out:
+        for i, part in enumerate(manifest["partitions"]):
+            with open(root / part["path"], newline="") as f:
+                header = f.readline()
+                if i == 0:
+                    out.write(header)
+                shutil.copyfileobj(f, out)
+    tmp.replace(out_path)
+    logger.debug(f"Combined {len(manifest['partitions'])} partitions into {out_path}")
+    return out_path
+
+
+def parquet_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _arrow_schema():
+    import pyarrow as pa
+    return pa.schema([
+        ("country", pa.string()),
+        ("indicator", pa.string()),
+        ("year", pa.int16()),
+        ("value", pa.float64()),
+    ])
+
+
+def _to_arrow(df: pd.DataFrame):
+    import pyarrow as pa
+    df = df[["country", "indicator", "year", "value"]].astype(
+        {"country": str, "indicator": str, "year": "int16", "value": "float64"}
+    )
+    return pa.Table.from_pandas(df, schema=_arrow_schema(), preserve_index=False)
+
+
+def write_timeseries_parquet(df: pd.DataFrame, path: Path, row_group_size: int = PARQUET_ROW_GROUP_SIZE) -> Path:
+    """Write a tidy timeseries frame as Parquet, sorted by indicator/country/year."""
+    import pyarrow.parquet as pq
+
+    path = Path(path)
+    table = _to_arrow(df.sort_values(KEY_COLUMNS))
+    tmp = path.with_name(path.name + ".tmp")
+    pq.write_table(table, tmp, row_group_size=row_group_size, use_dictionary=DICTIONARY_COLUMNS,
+                   write_statistics=True)
+    tmp.replace(path)
+    return path
+
+
+def partitions_to_parquet(root: Path, out_path: Path, row_group_size: int = PARQUET_ROW_GROUP_SIZE) -> Path:
+    """Stream every partition, in manifest order, into one Parquet file (one partition in memory at a time)."""
+    import pyarrow.parquet as pq
+
+    root, out_path = Path(root), Path(out_path)
+    manifest = read_manifest(root)
+    tmp = out_path.with_name(out_path.name + ".tmp")
+    with pq.ParquetWriter(tmp, _arrow_schema(), use_dictionary=DICTIONARY_COLUMNS, write_statistics=True) as writer:
+        for part in manifest["partitions"]:
+            writer.write_table(_to_arrow(pd.read_csv(root / part["path"])), row_group_size=row_group_size)
+    tmp.replace(out_path)
+    return out_path
+
+
+def _overlaps(stats, column, predicate) -> bool:
+    """Whether a row group's min/max for `column` can hold rows matching `predicate`."""
+    if predicate is None or stats is None or not stats.has_min_max:
+        return True
+    lo, hi = stats.min, stats.max
+    if column == "year":
+        start, end = predicate
+        return (start is None or hi >= start) and (end is None or lo <= end)
+    return any(lo <= v <= hi for v in predicate)
+
+
+def matching_row_groups(parquet_file, countries=None, indicators=None, years=None) -> list[int]:
+    """Row groups whose column statistics overlap every predicate; the others are never read."""
+    predicates = {"country": countries, "indicator": indicators, "year": years}
+    names = parquet_file.schema_arrow.names
+    keep = []
+    for i in range(parquet_file.metadata.num_row_groups):
+        rg = parquet_file.metadata.row_group(i)
+        if all(_overlaps(rg.column(names.index(col)).statistics, col, pred)
+               for col, pred in predicates.items() if col in names):
+            keep.append(i)
+    return keep
+
+
+def _row_mask(df: pd.DataFrame, countries=None, indicators=None, years=None):
+    mask = pd.Series(True, index=df.index)
+    if countries is not None:
+        mask &= df["country"].isin(countries)
+    if indicators is not None:
+        mask &= df["indicator"].isin(indicators)
+    if years is not None:
+        start, end = years
+        if start is not None:
+            mask &= df["year"] >= start
+        if end is not None:
+            mask &= df["year"] <= end
+    return mask
+
+
+def _read_parquet(path: Path, countries, indicators, years) -> pd.DataFrame:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+
+    pf = pq.ParquetFile(path, read_dictionary=DICTIONARY_COLUMNS)
+    groups = matching_row_groups(pf, countries, indicators, years)
+    logger.debug(f"{path.name}: reading {len(groups)}/{pf.metadata.num_row_groups} row groups")
+    table = pf.read_row_groups(groups) if groups else pf.schema_arrow.empty_table()
+    # Row groups only bound the predicates; drop the non-matching rows before converting to pandas
+    conds = []
+    if countries is not None:
+        conds.append(pc.is_in(table["country"], value_set=pa.array(list(countries), pa.string())))
+    if indicators is not None:
+        conds.append(pc.is_in(table["indicator"], value_set=pa.array(list(indicators), pa.string())))
+    if years is not None:
+        start, end = years
+        if start is not None:
+            conds.append(pc.greater_equal(table["year"], start))
+        if end is not None:
+            conds.append(pc.less_equal(table["year"], end))
+    if conds:
+        mask = conds[0]
+        for cond in conds[1:]:
+            mask = pc.and_(mask, cond)
+        table = table.filter(mask)
+    return table.to_pandas()
+
+
+def _csv_sources(path: Path, indicators) -> list[Path]:
+    """With an indicator predicate, read only the matching partitions when the partitioned copy exists."""
+    root = path.with_suffix("")
+    if indicators is None or not (root / MANIFEST_NAME).exists():
+        return [path]
+    wanted = set(indicators)
+    return [root / p["path"] for p in read_manifest(root)["partitions"] if p["indicator"] in wanted]
+
+
+def read_timeseries(path: Path, countries=None, indicators=None, years=None, float32: bool = False) -> pd.DataFrame:
+    """
+    Load a release's timeseries, keeping only the rows that match every given predicate:
+    `countries` and `indicators` are collections of codes, `years` an inclusive (start, end)
+    range where either end may be None.
+
+    Parquet files are pruned by row-group statistics before anything is decoded (dictionary
+    columns come back as categoricals); for CSVs an indicator predicate selects partitions
+    when the partitioned copy of the release is present, the rest is filtered chunk by chunk.
+    Either way the frame comes back in the compact schema (see datasets/schema.py).
+    """
+    path = Path(path)
+    if path.suffix == ".parquet":
+        return enforce_schema(_read_parquet(path, countries, indicators, years), float32=float32)
+    #Protect in case the csv gets to be extremely big
+    filtered_chunks = []
+    for source in _csv_sources(path, indicators):
+        for chunk in pd.read_csv(source, chunksize=CSV_CHUNK_ROWS):
+            filtered_chunks.append(chunk[_row_mask(chunk, countries, indicators, years)])
+    if not filtered_chunks:
+        return enforce_schema(pd.DataFrame(columns=["country", "indicator", "year", "value"]), float32=float32)
+    return enforce_schema(pd.concat(filtered_chunks), float32=float32)
@@ -0,0 +1,179 @@
+"""
+Vintage-aware store of WEO releases.
+
+Every release (`2024_october`, `2025_april`, ...) is kept in one SQLite table keyed by
+(indicator, country, year, release), but a release only stores the cells whose value changed
+since the previous release: new observations, revisions, and a NULL tombstone for observations
+it dropped. "Value as of release R" is then the newest row at or before R for each cell, and
+the full vintage history of a cell is a handful of rows read through the primary key, without
+loading any release file.
+"""
+from __future__ import annotations
+
+import sqlite3
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from macroeconomics.logging_config import logger
+from macroeconomics.core.constants import DATA_DIR, VINTAGE_DB
+from macroeconomics.datasets.releases import classify, release_order
+from macroeconomics.datasets.schema import enforce_schema
+from macroeconomics.datasets.storage import KEY_COLUMNS
+
+def _in_clause(column, values, params):
+    params.extend(values)
+    return f"{column} IN ({','.join('?' * len(values))})"
+
+
+class VintageStore:
+    def __init__(self, path: Path = VINTAGE_DB):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(self.path)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS releases ("
+            " release TEXT PRIMARY KEY, seq INTEGER UNIQUE NOT NULL, rows INTEGER NOT NULL,"
+            " changed INTEGER NOT NULL, added_at REAL NOT NULL)"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS observations ("
+            " indicator TEXT NOT NULL, country TEXT NOT NULL, year INTEGER NOT NULL,"
+            " seq INTEGER NOT NULL, value REAL,"
+            " PRIMARY KEY (indicator, country, year, seq)) WITHOUT ROWID"
+        )
+        self._db.commit()
+
+    def close(self):
+        self._db.close()
+
+    def releases(self) -> list[str]:
+        return [r for (r,) in self._db.execute("SELECT release FROM releases ORDER BY seq")]
+
+    def latest_release(self) -> str | None:
+        rel = self.releases()
+        return rel[-1] if rel else None
+
+    def add_release(self, release: str, df: pd.DataFrame) -> int:
+        """
+        Store a release from its tidy frame, keeping only what changed since the previous release.
+        Releases must be added in chronological order; re-adding the latest one replaces it.
+        Returns the number of rows stored.
+        """
+        seq = release_order(release)
+        latest = self.latest_release()
+        if latest is not None and release != latest and seq < release_order(latest):
+            raise ValueError(f"Release {release} is older than the latest stored release {latest}")
+        if release == latest:
+            self._db.execute("DELETE FROM observations WHERE seq = ?", (seq,))
+            self._db.execute("DELETE FROM releases WHERE release = ?", (release,))
+        previous = self.latest_release()
+        prev = self.as_of(previous) if previous else pd.DataFrame(columns=KEY_COLUMNS + ["value"])
+
+        new = (df[KEY_COLUMNS + ["value"]].dropna(subset=["value"]).drop_duplicates(subset=KEY_COLUMNS)
+               .astype({"indicator": str, "country": str, "year": int, "value": float}))
+        prev = prev.astype({"indicator": str, "country": str, "year": int, "value": float})
+        merged = new.merge(prev, on=KEY_COLUMNS, how="outer", suffixes=("", "_prev"), indicator=True)
+        added = merged["_merge"] == "left_only"
+        revised = (merged["_merge"] == "both") & (merged["value"] != merged["value_prev"])
+        dropped = merged["_merge"] == "right_only"
+        changes = merged[added | revised | dropped]
+        values = changes["value"].astype(object).where(~dropped[changes.index], None)
+
+        rows = zip(changes["indicator"], changes["country"], changes["year"].astype(int).tolist(),
+                   [seq] * len(changes), values.tolist())
+        self._db.executemany("INSERT INTO observations VALUES (?, ?, ?, ?, ?)", rows)
+        self._db.execute("INSERT INTO releases VALUES (?, ?, ?, ?, ?)",
+                         (release, seq, len(new), len(changes), time.time()))
+        self._db.commit()
+        logger.info(f"Vintage {release}: {len(new):,} observations, stored {len(changes):,} "
+                    f"({int(added.sum()):,} new, {int(revised.sum()):,} revised, {int(dropped.sum()):,} dropped)")
+        return len(changes)
+
+    def as_of(self, release: str | None = None, indicators=None, countries=None, years=None) -> pd.DataFrame:
+        """The release as published at `release` (default: latest), optionally filtered."""
+        release = release or self.latest_release()
+        if release is None:
+            return pd.DataFrame(columns=KEY_COLUMNS + ["value"])
+        params = [release_order(release)]
+        where = ["seq <= ?"]
+        if indicators is not None:
+            where.append(_in_clause("indicator", list(indicators), params))
+        if countries is not None:
+            where.append(_in_clause("country", list(countries), params))
+        if years is not None:
+            start, end = years
+            if start is not None:
+                where.append("year >= ?")
+                params.append(int(start))
+            if end is not None:
+                where.append("year <= ?")
+                params.append(int(end))
+        # SQLite returns the bare `value` from the row holding MAX(seq) of each group
+        sql = (f"SELECT indicator, country, year, value FROM ("
+               f" SELECT indicator, country, year, value, MAX(seq) FROM observations"
+               f" WHERE {' AND '.join(where)} GROUP BY indicator, country, year)"
+               f" WHERE value IS NOT NULL")
+        df = pd.read_sql_query(sql, self._db, params=params)
+        return enforce_schema(df[["country", "indicator", "year", "value"]])
+
+    def history(self, indicator: str, country: str, year: int) -> pd.DataFrame:
+        """Value of one cell in every stored release since it first appeared (NaN once dropped)."""
+        changes = pd.read_sql_query(
+            "SELECT seq, value FROM observations WHERE indicator = ? AND country = ? AND year = ? ORDER BY seq",
+            self._db, params=(indicator, country, int(year)),
+        )
+        releases = pd.read_sql_query("SELECT release, seq FROM releases ORDER BY seq", self._db)
+        if changes.empty:
+            return pd.DataFrame({"release": pd.Series(dtype=str), "value": pd.Series(dtype=float)})
+        out = releases.merge(changes, on="seq", how="left")
+        out = out[out["seq"] >= changes["seq"].iloc[0]]
+        # Releases without a row for the cell carry the last stored value (NaN after a tombstone)
+        run = out["seq"].isin(changes["seq"]).cumsum()
+        out["value"] = out["value"].astype(float).groupby(run).transform("first")
+        return out[["release", "value"]].reset_index(drop=True)
+
+    def stats(self) -> dict:
+        released, stored = self._db.execute("SELECT COALESCE(SUM(rows), 0), COALESCE(SUM(changed), 0) FROM releases").fetchone()
+        return {"releases": len(self.releases()), "observations": released, "stored": stored,
+                "ratio": stored / released if released else np.nan}
+
+
+def release_files(data_dir: Path = DATA_DIR) -> dict[str, Path]:
+    """Release tag -> timeseries CSV for every full release in `data_dir` (no debug/feature files)."""
+    found = {}
+    for p in Path(data_dir).iterdir():
+        info = classify(p.name)
+        if info and info[1] == "time_series" and not info[2]:
+            found[info[0]] = p
+    return dict(sorted(found.items(), key=lambda kv: release_order(kv[0])))
+
+
+def vintages_main(args):
+    store = VintageStore(VINTAGE_DB)
+    if getattr(args, "ingest", False):
+        known = set(store.releases())
+        for release, path in release_files(DATA_DIR).items():
+            if release in known:
+                continue
+            latest = store.latest_release()
+            if latest is not None and release_order(release) < release_order(latest):
+                logger.warning(f"Skipping {path.name}: older than the stored release {latest}")
+                continue
+            store.add_release(release, pd.read_csv(path))
+    if getattr(args, "history", None):
+        indicator, country, year = args.history.split(",")
+        print(store.history(indicator, country, int(year)).to_string(index=False))
+    if getattr(args, "as_of", None):
+        df = store.as_of(args.as_of,
+                         indicators=args.indicators.split(",") if args.indicators else None,
+                         countries=args.countries.split(",") if args.countries else None)
+        out = Path(args.out) if args.out else DATA_DIR / f"vintage_as_of_{args.as_of}.csv"
+        df.sort_values(KEY_COLUMNS).to_csv(out, index=False)
+        logger.info(f"Saved {len(df):,} rows as of {args.as_of} to {out}")
+    s = store.stats()
+    logger.info(f"Vintage store {store.path}: {s['releases']} releases, {s['observations']:,} observations, "
+                f"{s['stored']:,} stored rows ({s['ratio']:.0%})")
+    store.close()
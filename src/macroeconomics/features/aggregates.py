@@ -0,0 +1,106 @@
+"""
+GDP-weighted regional aggregates (EU, euro area, G7, ...) as pseudo-countries.
+
+Groups come from AGGREGATE_GROUPS and the way each indicator combines from AGGREGATE_METHODS:
+a sum of the members (populations, USD GDP) or a mean weighted by nominal GDP, GDP at PPP
+(PPPPC x LP) or population. Everything is one merge + groupby over (aggregate, indicator, year),
+for all years and indicators at once. Coverage is counted against the group's declared members,
+not the members present in the data: a sum is only reported for years in which every member
+reports it, and a weighted mean only when at least AGGREGATE_MIN_COVERAGE of the members have
+both a value and a weight. Members missing from the data are logged. Results are cached next to
+the release file (`{stem}.aggregates-{digest}.csv`, the digest covering the definitions) and
+reused until the release file changes.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+from pathlib import Path
+
+import pandas as pd
+
+from macroeconomics.logging_config import logger
+from macroeconomics.core.constants import AGGREGATE_GROUPS, AGGREGATE_METHODS, AGGREGATE_MIN_COVERAGE
+from macroeconomics.datasets.schema import enforce_schema
+
+_COLUMNS = ["country", "indicator", "year", "value"]
+
+
+def aggregate_members(codes=None, groups=None) -> set[str]:
+    groups = AGGREGATE_GROUPS if groups is None else groups
+    return {m for code in (groups if codes is None else codes) for m in groups[code][1]}
+
+
+def _weights(ts: pd.DataFrame) -> pd.DataFrame:
+    """Long (country, year, method, weight) rows for every weighting scheme."""
+    w = ts[ts["indicator"].isin(["NGDPD", "LP", "PPPPC"])].pivot_table(
+        index=["country", "year"], columns="indicator", values="value", aggfunc="first")
+    w = w.reindex(columns=["NGDPD", "LP", "PPPPC"])
+    schemes = pd.DataFrame({"NGDPD": w["NGDPD"], "LP": w["LP"], "PPP": w["PPPPC"] * w["LP"]})
+    schemes.columns.name = "method"
+    return schemes.stack().rename("weight").reset_index()
+
+
+def compute_aggregates(time_series: pd.DataFrame, groups=None, methods=None,
+                       min_coverage: float = AGGREGATE_MIN_COVERAGE) -> pd.DataFrame:
+    """Tidy rows (country = aggregate code, indicator, year, value) for every group and indicator."""
+    groups = AGGREGATE_GROUPS if groups is None else groups
+    methods = AGGREGATE_METHODS if methods is None else methods
+    ts = time_series[_COLUMNS].astype({"country": str, "indicator": str})
+    present = set(ts["country"])
+    for code, (_, members) in groups.items():
+        absent = sorted(set(members) - present)
+        if absent:
+            logger.warning(f"{code}: no data for members {','.join(absent)}; its sums are not reported, "
+                           f"weighted means only with at least {min_coverage:.0%} of the members")
+    membership = pd.DataFrame([(code, m) for code, (_, members) in groups.items() for m in members],
+                              columns=["aggregate", "country"])
+    data = ts[ts["indicator"].isin(list(methods))].merge(membership, on="country")
+    data["method"] = data["indicator"].map(methods)
+    data = data.merge(_weights(ts), on=["country", "year", "method"], how="left")
+    data.loc[data["method"] == "sum", "weight"] = 1.0
+    valid = data["value"].notna() & data["weight"].notna() & (data["weight"] > 0)
+    data["w"] = data["weight"].where(valid)
+    data["wv"] = (data["value"] * data["weight"]).where(valid)
+    data["n"] = valid.astype(int)
+
+    keys = ["aggregate", "indicator", "year"]
+    out = data.groupby(keys).agg(wv=("wv", "sum"), w=("w", "sum"), n=("n", "sum"), method=("method", "first"))
+    # coverage against the declared members, whether or not they appear in the data
+    declared = pd.Series({code: len(set(members)) for code, (_, members) in groups.items()})
+    coverage = out["n"] / declared.reindex(out.index.get_level_values("aggregate")).to_numpy()
+    is_sum = out["method"] == "sum"
+    out["value"] = (out["wv"] / out["w"]).where(~is_sum & (out["n"] > 0) & (coverage >= min_coverage))
+    out.loc[is_sum, "value"] = out["wv"].where(coverage >= 1)
+    gaps = out["value"].isna() & (out["n"] > 0)
+    if gaps.any():
+        logger.info(f"Aggregates: {int(gaps.sum()):,} (aggregate, indicator, year) cells not reported for "
+                    f"incomplete member coverage")
+    out = out.reset_index().rename(columns={"aggregate": "country"}).dropna(subset=["value"])
+    return enforce_schema(out[_COLUMNS].reset_index(drop=True))
+
+
+def _digest(groups, methods) -> str:
+    spec = json.dumps({"groups": groups, "methods": methods, "min_coverage": AGGREGATE_MIN_COVERAGE}, sort_keys=True)
+    return hashlib.sha256(spec.encode()).hexdigest()[:10]
+
+
+def aggregates_cache_path(timeseries_path: Path, groups=None, methods=None) -> Path:
+    groups = AGGREGATE_GROUPS if groups is None else groups
+    methods = AGGREGATE_METHODS if methods is None else methods
+    path = Path(timeseries_path)
+    return path.with_name(f"{path.stem}.aggregates-{_digest(groups, methods)}.csv")
+
+
+def load_aggregates(timeseries_path: Path, groups=None, methods=None) -> pd.DataFrame:
+    """Every aggregate of the release, from the cache file when it is not older than the release."""
+    from macroeconomics.datasets.storage import read_timeseries
+
+    cache = aggregates_cache_path(timeseries_path, groups, methods)
+    if cache.exists() and cache.stat().st_mtime >= Path(timeseries_path).stat().st_mtime:
+        return enforce_schema(pd.read_csv(cache))
+    members = read_timeseries(timeseries_path, countries=sorted(aggregate_members(groups=groups)))
+    df = compute_aggregates(members, groups, methods)
+    df.to_csv(cache, index=False)
+    logger.info(f"Computed {df['country'].nunique()} regional aggregates ({len(df):,} rows), cached to {cache}")
+    return df
@@ -1,81 +1,127 @@
 from macroeconomics.logging_config import logger
 from macroeconomics.core.constants import DATA_DIR, COUNTRIES_ISO3, INDICATORS, ROOT_DIR, MODIFIED_NAME
 from macroeconomics.core.functions import get_shared_data_components
+from macroeconomics.datasets.releases import classify, register_release_files
+from macroeconomics.datasets.storage import parquet_available, write_timeseries_parquet
 # src/macroeconomics/features/build_features.py
 
-import math
+import re
+
+import numpy as np
 import pandas as pd
 
 def _is_yoy_indicator(ind: str) -> bool:
     # IMF YoY percent-change often ends with 'PCH' (e.g., PCPIEPCH)
     return ind.endswith("PCH")
 
-def _add_level_baselines(g, baseline_year):
-    g = g.sort_values("year").copy()
-    s = g.set_index("year")["value"]
-    base = s.get(baseline_year, None)
-    g[f"baseline{str(baseline_year)}"] = base
-    if base is None or base == 0:
-        g[f"index{str(baseline_year)}"] = pd.NA
-        g[f"rel{str(baseline_year)}"] = pd.NA
-    else:
-        g[f"index{str(baseline_year)}"] = ((g["value"] / base) * 100.0)
-        g[f"rel{str(baseline_year)}"] = (g["value"] / base) - 1.0
-    g[f"delta{str(baseline_year)}"] = g["value"] - (base if base is not None else pd.NA)
-    return g.round(2)
-
-def _chain_from_yoy(g, baseline_year = 2019):
-    # g has: country, indicator, year, value (value is YoY %, e.g., 6.6 means +6.6%)
-    g = g.sort_values("year").copy()
-    years = g["year"].tolist()
-    rates = g["value"].astype(float).tolist()
-    col_nm ='index'+str(baseline_year)
-    if baseline_year not in years:
-        g[col_nm] = pd.NA
-        return g.round(2)
-    idx = {}
-    k = years.index(baseline_year)
-    idx[baseline_year] = 100.0
-    # Forward: t = k+1..end uses YoY of that year
-    for j in range(k + 1, len(years)):
-        r = 0.0 if pd.isna(rates[j]) else float(rates[j])
-        idx[years[j]] = (idx[years[j - 1]] * (1.0 + r / 100.0))
-        
-    # Backward: t = k-1..0 divides by next year's factor
-    for j in range(k - 1, -1, -1):
-        r_next = 0.0 if pd.isna(rates[j + 1]) else float(rates[j + 1])
-        denom = (1.0 + r_next / 100.0)
-        idx[years[j]] = (idx[years[j + 1]] / denom) if denom != 0 else math.nan
-    g[col_nm] = g["year"].map(idx)
-    g[col_nm] = g[col_nm].round(2)
-    return g
+# Derived series are named {indicator}_{kind}{year}, e.g. NGDPD_index2019 or PCPIEPCH_pct_cum2008
+DERIVED_RE = re.compile(r"(?P<base>.+?)_(?P<kind>index|pct_cum|delta)(?P<year>\d{4})")
+# label suffix and unit of each kind of derived series (None keeps the indicator's unit)
+_DERIVED_LABELS = {
+    "index": ("({y}=100)", "{y}=100"),
+    "pct_cum": ("(percent vs. {y})", "Change since {y} (pp)"),
+    "delta": ("(difference vs. {y})", None),
+}
+
+def parse_baselines(value) -> list[int]:
+    """Baseline years from --baseline: an int or a comma-separated string such as '2008,2019,2020'."""
+    if isinstance(value, str):
+        return [int(v) for v in value.split(",") if v.strip()]
+    if np.ndim(value) == 0:
+        return [int(value)]
+    return [int(v) for v in value]
+
+def _add_level_baselines(df, baseline_years):
+    # Vectorized over every (country, indicator) group and every baseline: each group's value at
+    # the baseline years is merged in as one column per baseline, and the features are computed
+    # on the observations x baselines block. Groups without a baseline (or a zero one) get NaN.
+    years = parse_baselines(baseline_years)
+    base = (df.loc[df["year"].isin(years), ["country", "indicator", "year", "value"]]
+            .drop_duplicates(subset=["country", "indicator", "year"])
+            .pivot(index=["country", "indicator"], columns="year", values="value")
+            .reindex(columns=years))
+    base.columns = [f"baseline{y}" for y in years]
+    g = df.merge(base, left_on=["country", "indicator"], right_index=True, how="left")
+    b = g[base.columns].to_numpy(dtype=float)
+    v = g["value"].to_numpy(dtype=float)[:, None]
+    valid = ~np.isnan(b) & (b != 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        index = np.where(valid, (v / b) * 100.0, np.nan)
+        rel = np.where(valid, (v / b) - 1.0, np.nan)
+    delta = v - b
+    for j, y in enumerate(years):
+        g[f"index{y}"] = index[:, j]
+        g[f"rel{y}"] = rel[:, j]
+        g[f"delta{y}"] = delta[:, j]
+    return g.reset_index(drop=True).round(2)
+
+def chain_link_yoy_multi(df, baseline_years, rate_col="value"):
+    """
+    Chain-linked indices (one column `index{year}` per baseline year, = 100 there) from
+    year-on-year percent changes in `rate_col` (6.6 means +6.6%), for every (country, indicator)
+    group and every baseline in one pass; works for any *PCH series. Missing rates count as 0%.
+    Going back from a baseline, a -100% rate (zero denominator) makes that year and all earlier
+    ones NaN. Groups without the baseline year get NaN. Returns rounded indices aligned with `df`.
+    """
+    years = parse_baselines(baseline_years)
+    names = [f"index{y}" for y in years]
+    g = df.sort_values(["country", "indicator", "year"])
+    keys = [g["country"], g["indicator"]]
+    rev_keys = [k.iloc[::-1] for k in keys]
+    factor = 1.0 + g[rate_col].astype(float).fillna(0.0).to_numpy() / 100.0
+    factors = pd.DataFrame(np.repeat(factor[:, None], len(years), axis=1), index=g.index, columns=names)
+    is_base = pd.DataFrame({n: (g["year"] == y).to_numpy() for n, y in zip(names, years)}, index=g.index)
+    from_base = is_base.astype(int).groupby(keys, observed=True).cumsum() > 0
+    has_base = is_base.groupby(keys, observed=True).transform("any")
+
+    # Forward: 100 at the baseline, then multiplied by each later year's factor
+    forward = factors.where(from_base, 1.0).mask(is_base, 100.0).groupby(keys, observed=True).cumprod()
+    # Backward: year t is 100 / (factor[t+1] * ... * factor[baseline])
+    rev = factors.where(~from_base | is_base, 1.0).iloc[::-1]
+    denom = rev.groupby(rev_keys, observed=True).cumprod().iloc[::-1]
+    denom = denom.groupby(keys, observed=True).shift(-1)
+    backward = (100.0 / denom).where(denom != 0)
+
+    index = forward.where(from_base, backward).where(has_base)
+    return index.round(2).reindex(df.index)
+
+def chain_link_yoy(df, baseline_year=2019, rate_col="value"):
+    """Chain-linked index for a single baseline year (see chain_link_yoy_multi)."""
+    return chain_link_yoy_multi(df, [baseline_year], rate_col)[f"index{baseline_year}"]
 
 
 
 def compute_additional_variables_df(df, baseline_year = 2019, do_cum = False, keep_rate_pp_delta = False):
+    # baseline_year may be one year or several; every baseline gets its own set of columns
+    years = parse_baselines(baseline_year)
+    is_yoy = df["indicator"].astype(str).map(_is_yoy_indicator).astype(bool)
     parts = []
-    for (ctry, ind), g in df.groupby(["country", "indicator"], as_index=False):
-        if _is_yoy_indicator(ind):
-            g = _chain_from_yoy(g, baseline_year)
-            if keep_rate_pp_delta:
-                base = g.loc[g["year"] == baseline_year, "value"]
-                base_val = base.iloc[0] if len(base) else pd.NA
-                g[f"delta{str(baseline_year)}"] = g["value"] - base_val
-        else:
-            g = _add_level_baselines(g, baseline_year)
+    if (~is_yoy).any():
+        parts.append(_add_level_baselines(df[~is_yoy], years))
+    if is_yoy.any():
+        g = df[is_yoy].copy()
+        g = pd.concat([g, chain_link_yoy_multi(g, years)], axis=1)
+        if keep_rate_pp_delta:
+            keys = [g["country"], g["indicator"]]
+            for y in years:
+                base_val = g["value"].where(g["year"] == y).groupby(keys, observed=True).transform("first")
+                g[f"delta{y}"] = g["value"] - base_val
         parts.append(g)
     df_wide =  pd.concat(parts, ignore_index=True).sort_values(["country", "indicator", "year"])
     if do_cum: 
-        df_wide[f"pct_cum{str(baseline_year)}"] = (df_wide[f"index{str(baseline_year)}"] -100).round(2)
+        for y in years:
+            df_wide[f"pct_cum{y}"] = (df_wide[f"index{y}"] -100).round(2)
     return df_wide
 def add_2019_norm_long(df, baseline_year=2019, do_cum=True, include_all=False):
-    keep_rate_delta = False
-    wide = compute_additional_variables_df(df, baseline_year=baseline_year, do_cum=True, keep_rate_pp_delta=include_all) 
+    years = parse_baselines(baseline_year)
+    wide = compute_additional_variables_df(df, baseline_year=years, do_cum=True, keep_rate_pp_delta=include_all) 
 
     out = [df]
-    pos_columns = [f'index{str(baseline_year)}']
-    if do_cum: pos_columns.extend([f"pct_cum{str(baseline_year)}"])
-    if include_all: pos_columns.extend([f'delta{str(baseline_year)}'])
+    pos_columns = []
+    for y in years:
+        pos_columns.append(f'index{y}')
+        if do_cum: pos_columns.append(f"pct_cum{y}")
+        if include_all: pos_columns.append(f'delta{y}')
     for col in pos_columns:
        if col in wide.columns: 
             tmp = wide.dropna(subset=[col]).copy()
@@ -84,8 +130,31 @@ def add_2019_norm_long(df, baseline_year=2019, do_cum=True, include_all=False):
             out.append(tmp[['country','indicator','year','value']])
     return pd.concat(out, ignore_index=True).sort_values(['country','indicator','year'])
 
+def derived_metadata(df_indicators, kind, year):
+    """Metadata rows (id, label, unit, dataset) of the `{id}_{kind}{year}` series derived from each indicator."""
+    label, unit = _DERIVED_LABELS[kind]
+    return df_indicators.assign(
+        id=df_indicators["id"].astype(str) + f"_{kind}{year}",
+        label=df_indicators["label"].astype(str) + " " + label.format(y=year),
+        unit=unit.format(y=year) if unit else df_indicators["unit"],
+        dataset=df_indicators["dataset"].astype(str)+ " recalculated"
+    )
+
+def baseline_metadata(df_indicators, baseline_years):
+    """Indicator metadata rows (`dup_id`/`dup_pct`) for the derived series of every baseline."""
+    rows = [df_indicators]
+    for y in parse_baselines(baseline_years):
+        dup_id = derived_metadata(df_indicators, "index", y)
+        dup_pct = derived_metadata(df_indicators, "pct_cum", y)
+        rows.extend([dup_id, dup_pct])
+    return pd.concat(rows, ignore_index=True)
+
 def features_main(args):
-    print(args.baseline)
+    from macroeconomics.features.incremental import incremental_features, save_group_hashes
+    from macroeconomics.features.registry import run_features
+
+    baselines = parse_baselines(args.baseline)
+    logger.info(f"Baseline years: {baselines}")
     data = get_shared_data_components()
     latest_files = data["latest_files"]
     time_series_path = latest_files["time_series"]
@@ -94,29 +163,33 @@ def features_main(args):
     new_indicators_path = indicators_path.with_stem(indicators_path.stem + MODIFIED_NAME) 
     time_series = data["time_series"].drop(columns = ["country_name"])
     df_indicators = data["df_indicators"]
-    df_long = add_2019_norm_long(time_series)
-
-
-    dup_id = df_indicators.assign(
-        id=df_indicators["id"].astype(str) + f"_index{args.baseline}",
-        label=df_indicators["label"].astype(str) + f" ({args.baseline}=100)",
-        unit=f"{args.baseline}=100",
-        dataset=df_indicators["dataset"].astype(str)+ " recalculated"
-    )
-    dup_pct = df_indicators.assign(
-        id=df_indicators["id"].astype(str) + f"_pct_cum{args.baseline}",
-        label=df_indicators["label"].astype(str) + f" (percent vs. {args.baseline})",
-        unit=f"Change since {args.baseline} (pp)",
-        dataset=df_indicators["dataset"].astype(str)+ " recalculated"
-    )
-    df_indicators_with_features = pd.concat([df_indicators, dup_id, dup_pct], ignore_index=True)
-    pos_columns = [f'index{str(args.baseline)}']
-    pos_columns.extend([f"pct_cum{str(args.baseline)}"])
-
+    # All baselines in one pass, written together to the same _with_features files; groups whose
+    # input is unchanged since the previous feature output are reused instead of recomputed
+    df_long, group_hashes, _ = incremental_features(time_series, baselines, DATA_DIR,
+                                                    full=getattr(args, "full", False),
+                                                    workers=getattr(args, "workers", 1) or 1)
+    df_indicators_with_features = baseline_metadata(df_indicators, baselines)
+    # Registry features (per-capita, growth gaps, rolling averages, ...), with their metadata rows
+    derived = getattr(args, "derived", None)
+    if derived != "none":
+        wanted = derived.split(",") if derived else None
+        df_derived, derived_meta = run_features(time_series, df_indicators, features=wanted)
+        df_long = pd.concat([df_long, df_derived], ignore_index=True).sort_values(["country", "indicator", "year"])
+        df_indicators_with_features = pd.concat([df_indicators_with_features, derived_meta], ignore_index=True)
 
     logger.info(f"Saving modified timeseries df to: {new_timeseries_path}")
     logger.info(f"Saving modified indicators df to: {new_timeseries_path}")
 
     df_long.to_csv(new_timeseries_path, index=False)
     df_indicators_with_features.to_csv(new_indicators_path,index=False)
+    feature_files = {"time_series": new_timeseries_path, "indicators": new_indicators_path}
+    if parquet_available():
+        write_timeseries_parquet(df_long, new_timeseries_path.with_suffix(".parquet"))
+        logger.info(f"Saved columnar copy to {new_timeseries_path.with_suffix('.parquet')}")
+        feature_files["time_series_parquet"] = new_timeseries_path.with_suffix(".parquet")
+    release_tag, _, _ = classify(time_series_path.name)
+    register_release_files(DATA_DIR, release_tag, feature_files, features=True,
+                           rows={"time_series": len(df_long), "time_series_parquet": len(df_long),
+                                 "indicators": len(df_indicators_with_features)})
+    save_group_hashes(new_timeseries_path, group_hashes, baselines)
 
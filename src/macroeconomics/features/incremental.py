@@ -0,0 +1,113 @@
+"""
+Incremental feature rebuild.
+
+Next to every feature output features_main keeps a small JSON file
+(`imf_weo_timeseries_{tag}_with_features.groups.json`) with the baseline years used and one hash
+per (country, indicator) input group, computed over that group's (year, value) rows. On the next
+run, groups whose hash is unchanged are copied from the newest previous feature output instead of
+being recomputed; only new or revised groups go through `add_2019_norm_long`. A different set of
+baseline years, or no previous output, means a full rebuild.
+"""
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import pandas as pd
+
+from macroeconomics.logging_config import logger
+from macroeconomics.core.functions import preferred_timeseries_file
+from macroeconomics.datasets.releases import load_manifest, release_order
+from macroeconomics.datasets.storage import read_timeseries
+from macroeconomics.features.build_features import DERIVED_RE, add_2019_norm_long, parse_baselines
+from macroeconomics.features.sharded import sharded_norm_long
+
+GROUP_HASHES_SUFFIX = ".groups.json"
+
+
+def group_hashes_path(features_path: Path) -> Path:
+    return Path(features_path).with_suffix(GROUP_HASHES_SUFFIX)
+
+
+def group_hashes(df: pd.DataFrame) -> pd.Series:
+    """Hex digest per (country, indicator) group of its (year, value) rows, independent of row order."""
+    rows = pd.util.hash_pandas_object(df[["year", "value"]].astype({"year": "int64", "value": "float64"}),
+                                      index=False)
+    keys = [df["country"].astype(str), df["indicator"].astype(str)]
+    # uint64 sums wrap around; the row count guards against rows cancelling each other out
+    summed = rows.groupby(keys).sum()
+    counts = rows.groupby(keys).size()
+    return summed.map("{:016x}".format) + counts.map("-{}".format)
+
+
+def _key(country, indicator) -> str:
+    return f"{country}/{indicator}"
+
+
+def save_group_hashes(features_path: Path, hashes: pd.Series, baselines) -> Path:
+    path = group_hashes_path(features_path)
+    state = {"version": 1, "baselines": parse_baselines(baselines),
+             "groups": {_key(c, i): h for (c, i), h in hashes.items()}}
+    path.write_text(json.dumps(state, sort_keys=True))
+    return path
+
+
+def previous_features(data_dir: Path):
+    """(timeseries file, saved group state) of the newest feature output that has group hashes, or (None, None)."""
+    releases = load_manifest(data_dir)["releases"]
+    for tag in sorted(releases, key=release_order, reverse=True):
+        entries = releases[tag].get("features", {})
+        if "time_series" not in entries:
+            continue
+        files = {k: Path(data_dir) / e["path"] for k, e in entries.items() if k.startswith("time_series")}
+        files = {k: p for k, p in files.items() if p.exists()}
+        if "time_series" not in files or not group_hashes_path(files["time_series"]).exists():
+            continue
+        state = json.loads(group_hashes_path(files["time_series"]).read_text())
+        return preferred_timeseries_file(files), state
+    return None, None
+
+
+def source_indicator(indicators: pd.Series) -> pd.Series:
+    """The input indicator each feature row was derived from (itself for the original rows)."""
+    codes = pd.Series(indicators.astype(str).unique())
+    sources = codes.map(lambda c: m["base"] if (m := DERIVED_RE.fullmatch(c)) else c)
+    return indicators.astype(str).map(dict(zip(codes, sources)))
+
+
+def incremental_features(time_series: pd.DataFrame, baselines, data_dir: Path, full: bool = False, workers: int = 1):
+    """
+    Long feature frame for `time_series` (as `add_2019_norm_long` builds it), reusing the rows
+    of unchanged groups from the previous feature output. Returns (frame, group hashes, stats)
+    where stats counts the `recomputed` and `reused` groups. With `workers` > 1 the recomputed
+    groups are sharded across a process pool (see features/sharded.py).
+    """
+    baselines = parse_baselines(baselines)
+    hashes = group_hashes(time_series)
+    previous, state = (None, None) if full else previous_features(data_dir)
+    if state is not None and state.get("baselines") != baselines:
+        logger.info(f"Previous features used baselines {state.get('baselines')}; rebuilding every group")
+        state = None
+    old = (state or {}).get("groups", {})
+    unchanged = pd.Series([old.get(_key(c, i)) == h for (c, i), h in hashes.items()],
+                          index=hashes.index, dtype=bool)
+
+    keys = pd.MultiIndex.from_arrays([time_series["country"].astype(str), time_series["indicator"].astype(str)])
+    changed_rows = ~unchanged.reindex(keys).to_numpy()
+    parts = []
+    if changed_rows.any():
+        changed = time_series[changed_rows]
+        if workers > 1:
+            parts.append(sharded_norm_long(changed, baselines, workers))
+        else:
+            parts.append(add_2019_norm_long(changed, baseline_year=baselines))
+    if unchanged.any():
+        logger.info(f"Reusing unchanged groups from {previous}")
+        prev = read_timeseries(previous, countries=unchanged.index.get_level_values(0).unique())
+        prev_keys = pd.MultiIndex.from_arrays([prev["country"].astype(str), source_indicator(prev["indicator"])])
+        parts.append(prev[prev_keys.isin(unchanged.index[unchanged])])
+    df_long = pd.concat(parts, ignore_index=True) if parts else add_2019_norm_long(time_series, baselines)
+    df_long = df_long.sort_values(["country", "indicator", "year"])
+    stats = {"recomputed": int((~unchanged).sum()), "reused": int(unchanged.sum())}
+    logger.info(f"Feature groups: {stats['recomputed']} recomputed, {stats['reused']} reused")
+    return df_long, hashes, stats
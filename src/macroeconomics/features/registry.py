@@ -0,0 +1,192 @@
+"""
+Registry of derived indicators built from other indicators.
+
+Each feature declares the indicators it reads (release indicators or other registered features)
+and a vectorized function. The function receives a wide frame indexed by (country, year) over
+the full year range of every country, with one column per input, and returns a Series on the same
+index. `run_features` resolves the dependency DAG (graphlib), runs the nodes whose inputs are
+ready in parallel on a thread pool, and returns both the long timeseries rows and the matching
+indicator metadata rows, so a new feature is a single decorated function:
+
+    @feature("NGDPD_PER_CAPITA", inputs=("NGDPD", "LP"), label="GDP per capita", unit="U.S. dollars")
+    def _ngdpd_per_capita(w):
+        return w["NGDPD"] / w["LP"] * 1000
+"""
+from __future__ import annotations
+
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from graphlib import TopologicalSorter
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+
+from macroeconomics.logging_config import logger
+from macroeconomics.core.constants import FEATURE_THREADS
+
+
+@dataclass(frozen=True)
+class FeatureSpec:
+    id: str
+    inputs: tuple[str, ...]                           # indicator or feature ids read by `func`
+    func: Callable[[pd.DataFrame], pd.Series]         # wide (country, year) frame -> Series
+    label: str
+    unit: str
+    description: str = ""
+
+
+REGISTRY: dict[str, FeatureSpec] = {}
+
+
+def feature(id, inputs, label, unit, description="", registry=None):
+    """Decorator registering a vectorized feature function under `id`."""
+    def register(func):
+        target = REGISTRY if registry is None else registry
+        if id in target:
+            raise ValueError(f"Feature {id} is already registered")
+        target[id] = FeatureSpec(id, tuple(inputs), func, label, unit, description)
+        return func
+    return register
+
+
+def _by_country(w: pd.DataFrame):
+    return w.groupby(level="country", observed=True, sort=False)
+
+
+# --- built-in features ----------------------------------------------------------------------------
+@feature("NGDPD_PER_CAPITA", inputs=("NGDPD", "LP"), label="GDP per capita, computed from NGDPD / LP",
+         unit="U.S. dollars per person", description="Nominal GDP (billions USD) over population (millions)")
+def _ngdpd_per_capita(w):
+    return w["NGDPD"] / w["LP"].where(w["LP"] != 0) * 1000
+
+
+@feature("NGDPD_GROWTH", inputs=("NGDPD",), label="Nominal GDP growth in U.S. dollars",
+         unit="Percent change")
+def _ngdpd_growth(w):
+    return _by_country(w)["NGDPD"].pct_change(fill_method=None) * 100
+
+
+@feature("NGDPD_REAL_GAP", inputs=("NGDPD_GROWTH", "NGDP_RPCH"),
+         label="Nominal (USD) minus real GDP growth", unit="Percentage points (pp)",
+         description="Price and exchange-rate component of nominal USD GDP growth")
+def _ngdpd_real_gap(w):
+    return w["NGDPD_GROWTH"] - w["NGDP_RPCH"]
+
+
+@feature("NGDP_RPCH_MA5", inputs=("NGDP_RPCH",), label="Real GDP growth, 5-year rolling average",
+         unit="Percent change")
+def _ngdp_rpch_ma5(w):
+    return _by_country(w)["NGDP_RPCH"].rolling(5, min_periods=5).mean().droplevel(0)
+
+
+@feature("NGDPD_CAGR5", inputs=("NGDPD",), label="Nominal GDP, 5-year compound annual growth",
+         unit="Percent per year")
+def _ngdpd_cagr5(w):
+    ratio = w["NGDPD"] / _by_country(w)["NGDPD"].shift(5)
+    return (ratio.where(ratio > 0) ** (1 / 5) - 1) * 100
+
+
+# --- engine ---------------------------------------------------------------------------------------
+def _plan(registry, available, wanted):
+    """Dependency graph of the wanted features that can be built from the `available` indicators."""
+    graph, skipped = {}, []
+
+    def visit(fid, stack=()):
+        if fid in graph or fid in skipped:
+            return fid in graph
+        if fid in stack:
+            raise ValueError(f"Feature dependency cycle: {' -> '.join(stack + (fid,))}")
+        spec = registry[fid]
+        ok = True
+        for dep in spec.inputs:
+            if dep in registry:
+                ok &= visit(dep, stack + (fid,))
+            elif dep not in available:
+                ok = False
+        if ok:
+            graph[fid] = [d for d in spec.inputs if d in registry]
+        else:
+            skipped.append(fid)
+        return ok
+
+    for fid in wanted:
+        if fid not in registry:
+            raise KeyError(f"Unknown feature {fid}; registered: {sorted(registry)}")
+        visit(fid)
+    if skipped:
+        logger.warning(f"Skipping features whose inputs are not loaded: {skipped}")
+    return graph
+
+
+def _wide(time_series, indicators):
+    """(country, year) x indicator frame covering every year between the first and last one."""
+    ts = time_series[time_series["indicator"].isin(indicators)]
+    wide = ts.pivot_table(index=["country", "year"], columns="indicator", values="value",
+                          aggfunc="first", observed=True)
+    wide.columns = wide.columns.astype(str)
+    years = np.arange(int(time_series["year"].min()), int(time_series["year"].max()) + 1, dtype="int16")
+    countries = sorted(time_series["country"].astype(str).unique())
+    full = pd.MultiIndex.from_product([countries, years], names=["country", "year"])
+    wide.index = wide.index.set_levels(wide.index.levels[0].astype(str), level="country")
+    return wide.reindex(full).reindex(columns=list(indicators))
+
+
+def feature_metadata(specs, df_indicators):
+    """Indicator metadata rows for the features, in the columns of the release's indicators file."""
+    known = df_indicators.set_index(df_indicators["id"].astype(str))
+    rows = []
+    for spec in specs:
+        first = next((known.loc[d] for d in spec.inputs if d in known.index), None)
+        rows.append({
+            "id": spec.id,
+            "label": spec.label,
+            "description": spec.description or f"Derived from {', '.join(spec.inputs)}",
+            "source": first["source"] if first is not None and "source" in first else "",
+            "unit": spec.unit,
+            "dataset": (str(first["dataset"]) if first is not None and "dataset" in first else "WEO") + " recalculated",
+        })
+    return pd.DataFrame(rows).reindex(columns=df_indicators.columns)
+
+
+def run_features(time_series, df_indicators, features=None, registry=None, workers=FEATURE_THREADS):
+    """
+    Build the registered `features` (default: all) from a tidy timeseries frame. Returns
+    (long rows: country, indicator, year, value; metadata rows for the indicators file).
+    """
+    registry = REGISTRY if registry is None else registry
+    available = set(time_series["indicator"].astype(str).unique())
+    graph = _plan(registry, available, list(registry) if features is None else list(features))
+    if not graph:
+        return time_series.iloc[:0][["country", "indicator", "year", "value"]], feature_metadata([], df_indicators)
+    base_inputs = sorted({d for fid in graph for d in registry[fid].inputs if d not in registry})
+    wide = _wide(time_series, base_inputs)
+    results: dict[str, pd.Series] = {}
+
+    def compute(fid):
+        spec = registry[fid]
+        inputs = pd.concat([wide[d] if d in wide else results[d].rename(d) for d in spec.inputs], axis=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            out = spec.func(inputs)
+        return out.replace([np.inf, -np.inf], np.nan).reindex(wide.index)
+
+    sorter = TopologicalSorter(graph)
+    sorter.prepare()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="features") as pool:
+        running = {}
+        while sorter.is_active():
+            for fid in sorter.get_ready():
+                running[pool.submit(compute, fid)] = fid
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for fut in done:
+                fid = running.pop(fut)
+                results[fid] = fut.result()
+                sorter.done(fid)
+
+    built = [fid for fid in registry if fid in results]  # registry order, not completion order
+    long = pd.concat([results[fid].rename("value").reset_index().assign(indicator=fid) for fid in built],
+                     ignore_index=True)
+    long = long.dropna(subset=["value"])[["country", "indicator", "year", "value"]]
+    long["value"] = long["value"].round(2)
+    logger.info(f"Built {len(built)} registry features ({len(long):,} rows): {built}")
+    return long.reset_index(drop=True), feature_metadata([registry[f] for f in built], df_indicators)
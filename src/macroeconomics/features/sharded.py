@@ -0,0 +1,93 @@
+"""
+Process-pool feature computation for full-universe releases (`macroe features --workers N`).
+
+The (country, indicator) groups are split into contiguous shards of about the same number of
+rows. Each shard is written to a scratch directory as plain .npy column chunks (country and
+indicator codes, year, value) plus the shared label lists, and a worker process memory-maps
+them, runs `add_2019_norm_long` on its groups and writes its output back the same way, so only
+paths cross the process boundary instead of pickled DataFrames. Groups are independent, so the
+merged result (shards read back in order, then sorted like the serial path) is identical to a
+single-process run.
+"""
+from __future__ import annotations
+
+import json
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from macroeconomics.logging_config import logger
+from macroeconomics.features.build_features import add_2019_norm_long, parse_baselines
+
+_COLUMNS = ("country", "indicator", "year", "value")
+
+
+def plan_shards(time_series: pd.DataFrame, n_shards: int) -> list[np.ndarray]:
+    """Row positions of each shard: whole groups, in (country, indicator, year) order, balanced by rows."""
+    country = pd.factorize(time_series["country"], sort=True)[0]
+    indicator = pd.factorize(time_series["indicator"], sort=True)[0]
+    order = np.lexsort((time_series["year"].to_numpy(), indicator, country))
+    country, indicator = country[order], indicator[order]
+    # first row of every group; shards may only be cut there
+    starts = np.flatnonzero(np.r_[True, (country[1:] != country[:-1]) | (indicator[1:] != indicator[:-1])])
+    targets = np.linspace(0, len(order), n_shards + 1)[1:-1]
+    cuts = np.unique(starts[np.searchsorted(starts, targets).clip(max=len(starts) - 1)])
+    return [s for s in np.split(order, cuts) if len(s)]
+
+
+def _write_chunk(folder: Path, df: pd.DataFrame) -> Path:
+    """Columns of a tidy frame as .npy files: categorical codes + labels for the key columns."""
+    folder.mkdir(parents=True)
+    labels = {}
+    for col in ("country", "indicator"):
+        codes, uniques = pd.factorize(df[col].astype(str))
+        np.save(folder / f"{col}.npy", codes.astype(np.int32))
+        labels[col] = uniques.tolist()
+    np.save(folder / "year.npy", df["year"].to_numpy(dtype=np.int16))
+    np.save(folder / "value.npy", df["value"].to_numpy(dtype=np.float64))
+    (folder / "labels.json").write_text(json.dumps(labels))
+    return folder
+
+
+def _read_chunk(folder: Path, mmap: bool = True) -> pd.DataFrame:
+    labels = json.loads((folder / "labels.json").read_text())
+    mode = "r" if mmap else None
+    data = {col: pd.Categorical.from_codes(np.load(folder / f"{col}.npy", mmap_mode=mode), labels[col])
+            for col in ("country", "indicator")}
+    data["year"] = np.load(folder / "year.npy", mmap_mode=mode)
+    data["value"] = np.load(folder / "value.npy", mmap_mode=mode)
+    return pd.DataFrame(data, columns=list(_COLUMNS))
+
+
+def _run_shard(shard_dir: str, baselines: list[int]) -> str:
+    shard_dir = Path(shard_dir)
+    df = _read_chunk(shard_dir / "in")
+    out = add_2019_norm_long(df, baseline_year=baselines)
+    return str(_write_chunk(shard_dir / "out", out[list(_COLUMNS)]))
+
+
+def sharded_norm_long(time_series: pd.DataFrame, baselines, workers: int) -> pd.DataFrame:
+    """`add_2019_norm_long(time_series, baselines)` computed on `workers` processes."""
+    baselines = parse_baselines(baselines)
+    df = time_series[list(_COLUMNS)]
+    shards = plan_shards(df, workers)
+    if len(shards) < 2:
+        return add_2019_norm_long(df, baseline_year=baselines)
+    logger.info(f"Computing features in {len(shards)} shards on {workers} processes")
+    with tempfile.TemporaryDirectory(prefix="macro-features-") as tmp:
+        dirs = [str(_write_chunk(Path(tmp) / f"shard{i:04d}" / "in", df.iloc[rows]).parent)
+                for i, rows in enumerate(shards)]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            outputs = list(pool.map(_run_shard, dirs, [baselines] * len(dirs)))
+        # read back in shard order, into memory: the scratch folder goes away with the block
+        parts = [_read_chunk(Path(p), mmap=False) for p in outputs]
+    # one set of lexically sorted categories, so the sort below orders like plain strings
+    merged = pd.DataFrame({
+        col: union_categoricals([p[col] for p in parts], sort_categories=True) for col in ("country", "indicator")
+    } | {col: np.concatenate([p[col].to_numpy() for p in parts]) for col in ("year", "value")})
+    merged["year"] = merged["year"].astype(df["year"].dtype)
+    return merged.sort_values(["country", "indicator", "year"])
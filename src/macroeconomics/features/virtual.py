@@ -0,0 +1,104 @@
+"""
+Virtual derived indicators, computed from the base series when first asked for.
+
+Any `{indicator}_{index|pct_cum|delta}{year}` code (the names features_main materializes into
+the `_with_features` files) can be requested from the plain release: the first request
+computes it from the base indicator's series with the same functions as features_main, later
+ones are served from a bounded LRU memo cache. Any baseline year is available without
+precomputing every combination or holding a doubled dataset in memory.
+"""
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from macroeconomics.logging_config import logger
+from macroeconomics.core.constants import VIRTUAL_CACHE_SIZE
+from macroeconomics.core.functions import get_suffix
+from macroeconomics.datasets.schema import enforce_schema
+from macroeconomics.features.build_features import DERIVED_RE, compute_additional_variables_df, derived_metadata
+
+
+class VirtualIndicators:
+    def __init__(self, time_series: pd.DataFrame, df_indicators: pd.DataFrame, maxsize: int = VIRTUAL_CACHE_SIZE):
+        self.time_series = time_series
+        self.df_indicators = df_indicators
+        self.maxsize = maxsize
+        self.bases = set(time_series["indicator"].astype(str).unique())
+        self._memo: OrderedDict[str, pd.DataFrame] = OrderedDict()
+        self._lock = threading.Lock()  # Dash serves callbacks from several threads
+        self.hits = 0
+        self.misses = 0
+
+    def parse(self, code):
+        """(base, kind, year) for a virtual code whose base indicator is loaded, else None."""
+        m = DERIVED_RE.fullmatch(str(code))
+        if m is None or m["base"] not in self.bases:
+            return None
+        return m["base"], m["kind"], int(m["year"])
+
+    def __contains__(self, code) -> bool:
+        return self.parse(code) is not None
+
+    def codes(self, baselines, kinds=("index", "pct_cum")) -> list[str]:
+        return [f"{b}_{k}{y}" for b in sorted(self.bases) for y in baselines for k in kinds]
+
+    def metadata(self, codes) -> pd.DataFrame:
+        """Indicator metadata rows (id, label, unit, ...) for virtual codes, like the _with_features file."""
+        rows = []
+        for code in codes:
+            base, kind, year = self.parse(code)
+            rows.append(derived_metadata(self.df_indicators[self.df_indicators["id"] == base], kind, year))
+        return pd.concat(rows, ignore_index=True) if rows else self.df_indicators.iloc[:0]
+
+    def extend(self, codes, df_indicators, indicators_dict, unit_suffix_dict):
+        """Add the metadata of `codes` to the loaded indicator table, label and unit-suffix dicts."""
+        meta = self.metadata(codes)
+        indicators_dict = indicators_dict | dict(zip(meta["id"], meta["label"]))
+        unit_suffix_dict = unit_suffix_dict | get_suffix(dict(zip(meta["id"], meta["unit"])))
+        return pd.concat([df_indicators, meta], ignore_index=True), indicators_dict, unit_suffix_dict
+
+    def _compute(self, code) -> pd.DataFrame:
+        base, kind, year = self.parse(code)
+        ts = self.time_series
+        g = ts[ts["indicator"] == base]
+        wide = compute_additional_variables_df(g, baseline_year=year, do_cum=kind == "pct_cum",
+                                               keep_rate_pp_delta=kind == "delta")
+        col = f"{kind}{year}"
+        out = wide.dropna(subset=[col]).assign(indicator=code, value=lambda d: d[col])
+        out = out[[c for c in ts.columns if c in out.columns]].reset_index(drop=True)
+        return enforce_schema(out, float32=ts["value"].dtype == "float32")
+
+    def get(self, code) -> pd.DataFrame:
+        """Long frame (same columns as the timeseries) of a virtual indicator, for every loaded country."""
+        with self._lock:
+            if code in self._memo:
+                self.hits += 1
+                self._memo.move_to_end(code)
+                return self._memo[code]
+            self.misses += 1
+        # Computed outside the lock; if another thread stored the code meanwhile, its frame is kept
+        df = self._compute(code)
+        with self._lock:
+            df = self._memo.setdefault(code, df)
+            self._memo.move_to_end(code)
+            if len(self._memo) > self.maxsize:
+                evicted, _ = self._memo.popitem(last=False)
+                logger.debug(f"Virtual indicator cache full; evicted {evicted}")
+        return df
+
+    def frame(self, code, countries=None, years=None) -> pd.DataFrame:
+        """`get(code)` restricted to `countries` and an inclusive (start, end) year range."""
+        df = self.get(code)
+        mask = pd.Series(True, index=df.index)
+        if countries is not None:
+            mask &= df["country"].isin(countries)
+        if years is not None:
+            mask &= df["year"].between(*years)
+        return df[mask].copy()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"cached": len(self._memo), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}
@@ -1,21 +1,34 @@
 import argparse
 from types import SimpleNamespace
 from macroeconomics.logging_config import logger
+from macroeconomics.core.constants import FETCH_MAX_PER_HOST, FETCH_RATE_LIMIT
 from macroeconomics.datasets.data import data_main
 from macroeconomics.viz.charts.timeseries import plot_main 
 from macroeconomics.viz.maps.europe_interactive_map import make_europe_map
 from macroeconomics.features.build_features import features_main
+from macroeconomics.datasets.vintages import vintages_main
+from macroeconomics.datasets.schema import inspect_main
 def cmd_fetch(ns):    
     # Build the args object expected by data_main
     args = SimpleNamespace(
         indicators=ns.indicators,   # comma-separated string or None
         countries=ns.countries,     # comma-separated string or None
         debug=ns.debug,             # bool
+        workers=ns.workers,         # int, 1 = serial
+        max_per_host=ns.max_per_host,
+        backend=ns.backend,         # "sync" (requests) or "async" (aiohttp)
+        rate=ns.rate,
+        no_cache=ns.no_cache,       # bypass the on-disk response cache
+        offline=ns.offline,         # replay only from the response cache
     )
     data_main(args)
 def cmd_features(ns):
     logger.info(f"Add extra features {ns}")
     features_main(ns)
+def cmd_vintages(ns):
+    vintages_main(ns)
+def cmd_inspect(ns):
+    inspect_main(ns)
 def cmd_plot(ns):
     logger.info(f"Do plots {ns}")
     plot_main(ns)
@@ -28,32 +41,66 @@ def cmd_dash(ns):
     app = create_app(args=ns)
     app.run(debug=ns.debug, host=ns.host, port=ns.port)
 
-def main():
+BASELINE_HELP = "Baseline year(s), comma-separated (e.g. 2008,2019,2020). Default, 2019"
+
+def build_parser():
     parser = argparse.ArgumentParser(prog="macroeconomics")
     parser.add_argument( "--do_features", action="store_true",help="Use feature-augmented files (adds *_with_features.csv patterns).")
-    parser.add_argument( "--baseline",help="Chose baseline year. Default, 2019", default=2019)
+    parser.add_argument( "--baseline",help=BASELINE_HELP, default=2019)
+    # Also accepted after the subcommand; SUPPRESS keeps a value given before it
+    baseline = argparse.ArgumentParser(add_help=False)
+    baseline.add_argument("--baseline", help=BASELINE_HELP, default=argparse.SUPPRESS)
     sub = parser.add_subparsers(dest="cmd", required=True)
 
     p_fetch = sub.add_parser("data", help="Fetch IMF WEO data and write CSVs")
     p_fetch.add_argument("--indicators", help="Comma-separated indicator IDs (e.g., NGDPD,PCPIEPCH)")
     p_fetch.add_argument("--countries", help="Comma-separated ISO3 codes (e.g., ESP,FRA,DEU)")
     p_fetch.add_argument("--debug", action="store_true", help="Suffix output filenames with _debug")
+    p_fetch.add_argument("--workers", type=int, default=1, help="Parallel fetch threads (1 = serial)")
+    p_fetch.add_argument("--max-per-host", type=int, default=FETCH_MAX_PER_HOST, help="Cap on concurrent requests per host")
+    p_fetch.add_argument("--backend", choices=("sync", "async"), default="sync", help="HTTP backend; async needs aiohttp")
+    p_fetch.add_argument("--rate", type=float, default=FETCH_RATE_LIMIT, help="Async backend: max requests per second")
+    p_fetch.add_argument("--no-cache", action="store_true", help="Bypass the on-disk response cache")
+    p_fetch.add_argument("--offline", action="store_true", help="Replay responses from the cache only, no network")
     p_fetch.set_defaults(func=cmd_fetch)
 
-    p_features = sub.add_parser("features", help="Add additional features") #For now, only calculate ratios vs 2019
+    p_features = sub.add_parser("features", parents=[baseline], help="Add additional features") #For now, only calculate ratios vs 2019
+    p_features.add_argument("--full", action="store_true", help="Recompute every group instead of reusing unchanged ones")
+    p_features.add_argument("--workers", type=int, default=1, help="Processes computing the features in parallel shards (1 = serial)")
+    p_features.add_argument("--derived", help="Comma-separated registry features to build (default: all, 'none' to skip)")
     p_features.set_defaults(func=cmd_features)
 
+    p_vint = sub.add_parser("vintages", help="Multi-release store: ingest releases, query as-of and revision history")
+    p_vint.add_argument("--ingest", action="store_true", help="Add every release CSV in DATA_DIR that is not stored yet")
+    p_vint.add_argument("--history", metavar="IND,COUNTRY,YEAR", help="Print the value of one cell in every release")
+    p_vint.add_argument("--as-of", metavar="RELEASE", help="Write the data as published in RELEASE (e.g. 2025_april)")
+    p_vint.add_argument("--indicators", help="Comma-separated indicator IDs for --as-of")
+    p_vint.add_argument("--countries", help="Comma-separated ISO3 codes for --as-of")
+    p_vint.add_argument("--out", help="Output CSV for --as-of (default: DATA_DIR/vintage_as_of_{RELEASE}.csv)")
+    p_vint.set_defaults(func=cmd_vintages)
+
+    p_inspect = sub.add_parser("inspect", help="Report on the loaded data")
+    p_inspect.add_argument("--memory", action="store_true", help="Per-column memory footprint before/after the compact schema")
+    p_inspect.add_argument("--float32", action="store_true", help="Report with float32 values (as MACRO_FLOAT32=1 does for the app)")
+    p_inspect.set_defaults(func=cmd_inspect)
+
     p_plot = sub.add_parser("plot", help="Plot indicators from latest CSVs")
     p_plot.add_argument("--countries", help="Comma-separated ISO3 codes (e.g., ESP,FRA,DEU)")
+    p_plot.add_argument("--indicators", help="Comma-separated indicator IDs to plot (default: all)")
     p_plot.set_defaults(func=cmd_plot)
 
     p_map = sub.add_parser("map", help="Draw interactive maps of Europe")
     p_map.set_defaults(func=cmd_map)
 
-    p_dash = sub.add_parser("dash", help="Run the Dash app")
+    p_dash = sub.add_parser("dash", parents=[baseline], help="Run the Dash app")
     p_dash.add_argument("--host", default="127.0.0.1")
     p_dash.add_argument("--port", type=int, default=8050)
     p_dash.add_argument("--debug", action="store_true")
+    p_dash.add_argument("--clientside", action="store_true",
+                        help="Send each indicator's series to the browser once and filter countries/years there (or MACRO_CLIENTSIDE=1).")
     p_dash.set_defaults(func=cmd_dash)
-    args = parser.parse_args()
+    return parser
+
+def main():
+    args = build_parser().parse_args()
     args.func(args)
@@ -1,9 +1,10 @@
 import pandas as pd
 import plotly.express as px
-from macroeconomics.core.constants import FIGURE_DIR, COUNTRIES_ISO3, INDICATORS, DATA_DIR
+from macroeconomics.core.constants import FIGURE_DIR, COUNTRIES_ISO3, INDICATORS, DATA_DIR, AGGREGATE_GROUPS
 from macroeconomics.logging_config import logger
 from macroeconomics.viz.theme import shared_title_style
 from macroeconomics.core.functions import get_shared_data_components
+from macroeconomics.features.build_features import DERIVED_RE
 
 
 
@@ -71,12 +72,44 @@ def makePlotly(df_input, indicator, indicators_dict, unit_suffix_dict, df_indica
     return fig
 
 
+def timeseries_store(df_input, indicator, indicators_dict, unit_suffix_dict, df_indicators, latest_year):
+    '''Compact payload for client-side filtering (assets/clientside.js): the makePlotly layout, hover
+    template and colorway, plus the years and values of every country, in legend (country_name) order'''
+    df = df_input[df_input["indicator"] == indicator].dropna(subset=["value"])
+    df = df.sort_values(["country_name", "year"])
+    # the layout does not depend on the rows, so it is built from an empty frame
+    fig = makePlotly(df.iloc[:0], indicator, indicators_dict, unit_suffix_dict, df_indicators, latest_year, save_html=False)
+    series = {
+        str(code): {"name": str(name), "x": g["year"].tolist(), "y": g["value"].tolist()}
+        for (code, name), g in df.groupby(["country", "country_name"], observed=True, sort=False)
+    }
+    unit_label = unit_suffix_dict[indicator]
+    return {
+        "indicator": indicator,
+        "latest_year": int(latest_year),
+        "layout": fig.layout.to_plotly_json(),
+        "colors": list(fig.layout.template.layout.colorway),
+        "hovertemplate": "%{customdata[0]}<br>" f"%{{customdata[1]:.2f}}{unit_label}<extra></extra>",
+        "series": series,
+    }
+
+
 def plot_main(args):
 
     country_codes = args.countries.split(",") if args.countries else COUNTRIES_ISO3
+    indicator_codes = args.indicators.split(",") if getattr(args, "indicators", None) else None
     logger.info(country_codes)
+    # Derived codes such as NGDPD_index2008 are computed on demand from their base indicator
+    virtual_codes = [c for c in indicator_codes or [] if DERIVED_RE.fullmatch(c)]
+    if virtual_codes:
+        base_codes = [DERIVED_RE.fullmatch(c)["base"] for c in virtual_codes]
+        indicator_codes = list(dict.fromkeys([c for c in indicator_codes if c not in virtual_codes] + base_codes))
 
-    shared_data = get_shared_data_components()
+    # Regional aggregates (EU27, EA20, G7) are plotted when listed in --countries, or all by default
+    aggregates = [c for c in country_codes if c in AGGREGATE_GROUPS] if args.countries else True
+    country_codes = [c for c in country_codes if c not in AGGREGATE_GROUPS] if args.countries else country_codes
+    shared_data = get_shared_data_components(country_codes=country_codes, indicator_codes=indicator_codes,
+                                             aggregates=aggregates)
     df_timeseries = shared_data["time_series"]
     latest_year = shared_data["latest_year"]
     
@@ -85,6 +118,16 @@ def plot_main(args):
     df_indicators_fil = shared_data["df_indicators"]
     indicators_dict = shared_data["indicators_dict"]
     unit_suffix_dict = shared_data["suffix"]
+    if virtual_codes:
+        from macroeconomics.features.virtual import VirtualIndicators
+
+        virtual = VirtualIndicators(df_timeseries, df_indicators_fil)
+        virtual_codes = [c for c in virtual_codes if c in virtual]
+        df_timeseries = pd.concat([df_timeseries] + [virtual.get(c) for c in virtual_codes], ignore_index=True)
+        df_indicators_fil, indicators_dict, unit_suffix_dict = virtual.extend(
+            virtual_codes, df_indicators_fil, indicators_dict, unit_suffix_dict)
+        # only plot what was asked for, not the base series loaded to derive it
+        indicators_dict = {k: v for k, v in indicators_dict.items() if k in args.indicators.split(",")}
     country_suffix='_all' if country_codes is COUNTRIES_ISO3 else f"_{'_'.join(country_dict.keys())}"
 
     for indicator in indicators_dict.keys():
@@ -0,0 +1,200 @@
+"""
+Cache of rendered dashboard figures (plotly JSON), keyed on the normalized callback inputs
+plus the active release ID.
+
+Two backends share one interface (get / put / purge / stats): `MemoryFigureCache`, an LRU
+inside the process, and `SQLiteFigureCache`, a SQLite file every gunicorn worker opens, so a
+figure built by one worker is served by all of them. Both evict the least recently used figures
+once their total size exceeds `max_bytes`. The release ID (timeseries file, mtime and size) is
+part of every key, and entries of any other release are purged when the cache is opened, so a
+new release never serves stale figures; app settings that change figures (feature files,
+baselines, ...) go in a key namespace instead, so dashboards configured differently can share one
+store without purging each other. Hit/miss/eviction counters are kept by the backend (in the
+database for SQLite, i.e. across workers). A SQLite hit is a plain read: access times and
+counters are buffered and written in one transaction with the next store, or every few seconds,
+so workers do not queue on the database write lock for every hit.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from macroeconomics.logging_config import logger
+from macroeconomics.core.constants import FIGURE_CACHE_BACKEND, FIGURE_CACHE_DB, FIGURE_CACHE_MAX_BYTES
+
+
+class MemoryFigureCache:
+    name = "memory"
+
+    def __init__(self, max_bytes: int = FIGURE_CACHE_MAX_BYTES):
+        self.max_bytes = int(max_bytes)
+        self._items: OrderedDict[str, tuple[str, str]] = OrderedDict()  # key -> (release, body)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0, "evicted": 0}
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                self.counters["misses"] += 1
+                return None
+            self._items.move_to_end(key)
+            self.counters["hits"] += 1
+            return item[1]
+
+    def put(self, key: str, body: str, release: str) -> None:
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old[1])
+            self._items[key] = (release, body)
+            self._bytes += len(body)
+            while self._bytes > self.max_bytes and len(self._items) > 1:
+                _, (_, dropped) = self._items.popitem(last=False)
+                self._bytes -= len(dropped)
+                self.counters["evicted"] += 1
+
+    def purge(self, release: str) -> int:
+        with self._lock:
+            stale = [k for k, (r, _) in self._items.items() if r != release]
+            for k in stale:
+                self._bytes -= len(self._items.pop(k)[1])
+        return len(stale)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return self.counters | {"entries": len(self._items), "bytes": self._bytes, "max_bytes": self.max_bytes}
+
+
+class SQLiteFigureCache:
+    name = "sqlite"
+    FLUSH_SECONDS = 5.0   # buffered access times / counters are written at least this often ...
+    FLUSH_HITS = 256      # ... or after this many buffered hits
+
+    def __init__(self, path: Path = FIGURE_CACHE_DB, max_bytes: int = FIGURE_CACHE_MAX_BYTES, clock=time.time):
+        self.path = Path(path)
+        self.max_bytes = int(max_bytes)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._touched: dict[str, float] = {}  # key -> last access not yet written
+        self._pending = {"hits": 0, "misses": 0}
+        self._flushed_at = clock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")  # readers in other workers are not blocked by a writer
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS figures ("
+            " key TEXT PRIMARY KEY, release TEXT NOT NULL, body TEXT NOT NULL,"
+            " size INTEGER NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS figures_accessed ON figures(accessed_at)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        self._db.executemany("INSERT OR IGNORE INTO counters VALUES (?, 0)", [("hits",), ("misses",), ("evicted",)])
+
+    def _flush(self) -> None:
+        """Write buffered access times and counters in one transaction (caller holds the lock)."""
+        if self._touched or any(self._pending.values()):
+            with self._db:  # sqlite3 turns this into BEGIN ... COMMIT
+                self._db.execute("BEGIN")
+                self._db.executemany("UPDATE figures SET accessed_at = MAX(accessed_at, ?) WHERE key = ?",
+                                     [(t, k) for k, t in self._touched.items()])
+                self._db.executemany("UPDATE counters SET value = value + ? WHERE name = ?",
+                                     [(n, name) for name, n in self._pending.items() if n])
+            self._touched.clear()
+            self._pending = dict.fromkeys(self._pending, 0)
+        self._flushed_at = self._clock()
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            row = self._db.execute("SELECT body FROM figures WHERE key = ?", (key,)).fetchone()
+            now = self._clock()
+            if row is None:
+                self._pending["misses"] += 1
+            else:
+                self._pending["hits"] += 1
+                self._touched[key] = now
+            if len(self._touched) >= self.FLUSH_HITS or now - self._flushed_at >= self.FLUSH_SECONDS:
+                self._flush()
+            return row[0] if row is not None else None
+
+    def put(self, key: str, body: str, release: str) -> None:
+        with self._lock:
+            self._flush()  # a write anyway: recent accesses count for the eviction below
+            self._db.execute("INSERT OR REPLACE INTO figures VALUES (?, ?, ?, ?, ?)",
+                             (key, release, body, len(body), self._clock()))
+            # keep the most recently used figures that fit in max_bytes (always at least the newest)
+            evicted = self._db.execute(
+                "DELETE FROM figures WHERE key IN (SELECT key FROM ("
+                " SELECT key, SUM(size) OVER (ORDER BY accessed_at DESC, key) AS kept,"
+                " ROW_NUMBER() OVER (ORDER BY accessed_at DESC, key) AS n FROM figures)"
+                " WHERE kept > ? AND n > 1)", (self.max_bytes,)).rowcount
+            if evicted:
+                self._db.execute("UPDATE counters SET value = value + ? WHERE name = 'evicted'", (evicted,))
+
+    def purge(self, release: str) -> int:
+        with self._lock:
+            return self._db.execute("DELETE FROM figures WHERE release != ?", (release,)).rowcount
+
+    def stats(self) -> dict:
+        """Counters of every worker, up to what they have flushed (this one's buffer included)."""
+        with self._lock:
+            self._flush()
+            counters = dict(self._db.execute("SELECT name, value FROM counters").fetchall())
+            entries, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM figures").fetchone()
+        return counters | {"entries": entries, "bytes": size, "max_bytes": self.max_bytes}
+
+    def close(self) -> None:
+        with self._lock:
+            self._flush()
+            self._db.close()
+
+
+def release_id(timeseries_path: Path) -> str:
+    """Identifies the loaded release: file name, mtime and size of its timeseries file."""
+    st = Path(timeseries_path).stat()
+    return f"{Path(timeseries_path).name}:{st.st_mtime_ns}:{st.st_size}"
+
+
+class FigureCache:
+    def __init__(self, backend, release: str, namespace: str = ""):
+        self.backend = backend
+        self.release = release
+        self.namespace = namespace  # app settings the figures depend on; part of the key, never purged
+        purged = backend.purge(release)
+        if purged:
+            logger.info(f"Figure cache: dropped {purged} figures of previous releases")
+
+    def key(self, kind: str, inputs: dict) -> str:
+        spec = json.dumps([self.release, self.namespace, kind, inputs], sort_keys=True, default=str)
+        return hashlib.sha256(spec.encode()).hexdigest()
+
+    def get_or_build(self, kind: str, inputs: dict, build):
+        """The cached figure (as a plotly JSON dict) for these inputs, else `build()`, which is stored."""
+        key = self.key(kind, inputs)
+        body = self.backend.get(key)
+        if body is not None:
+            return json.loads(body)
+        fig = build()
+        self.backend.put(key, fig.to_json() if hasattr(fig, "to_json") else json.dumps(fig), self.release)
+        return fig
+
+    def stats(self) -> dict:
+        return {"backend": self.backend.name, "release": self.release, "namespace": self.namespace} | self.backend.stats()
+
+
+def make_figure_cache(release: str, namespace: str = "", backend: str | None = None) -> FigureCache | None:
+    """FigureCache with the configured backend (MACRO_FIGURE_CACHE), or None when it is 'off'."""
+    backend = backend or FIGURE_CACHE_BACKEND
+    if backend == "off":
+        return None
+    if backend == "sqlite":
+        return FigureCache(SQLiteFigureCache(), release, namespace)
+    if backend == "memory":
+        return FigureCache(MemoryFigureCache(), release, namespace)
+    raise ValueError(f"Unknown figure cache backend {backend!r} (memory, sqlite or off)")
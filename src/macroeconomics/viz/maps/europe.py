@@ -23,7 +23,7 @@ def clip_to_mainland_europe(geojson):
             geom = shape(feat["geometry"])
             clipped_geom = geom.intersection(CONTINENTAL_EUROPE_BOUNDS)
             if not clipped_geom.is_empty:
-                feat["geometry"] = mapping(clipped_geom)
-                clipped_features.append(feat)
+                # new feature dict: the input (often a cached GeoJSON) is left untouched
+                clipped_features.append({**feat, "geometry": mapping(clipped_geom)})
         # Optionally skip non-mainland countries
     return {"type": "FeatureCollection", "features": clipped_features}
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from dataclasses import dataclass, field
 from pathlib import Path
 import pandas as pd
 import plotly.express as px
@@ -9,8 +10,7 @@ from datetime import datetime
 from macroeconomics.core.constants import EUROPE_ISO3, FIGURE_DIR, DATA_DIR
 from macroeconomics.core.functions import get_shared_data_components
 from macroeconomics.logging_config import logger
-from macroeconomics.viz.maps.geo import get_geojson, DEFAULT_FEATUREIDKEY
-from macroeconomics.viz.maps.europe import clip_to_mainland_europe
+from macroeconomics.viz.maps.geo import DEFAULT_FEATUREIDKEY, mainland_europe_geometry
 from macroeconomics.viz.theme import shared_title_style, wrap_title
 
 def load_tidy(path: Path) -> pd.DataFrame:
@@ -31,45 +31,80 @@ def get_colorscale_limits(data_series, percentile=95):
     upper = data_series.quantile(percentile / 100)
     return lower, upper
 
+@dataclass
+class MapContext:
+    """Everything a map render needs, loaded once: European rows, labels/units and the clipped geometry."""
+    df: pd.DataFrame                     # European rows of the release (country_name included)
+    years: list
+    units_dict: dict
+    unit_suffix_dict: dict
+    indicators_dict: dict
+    indicator_options: list
+    default_indicator: str
+    geometry: dict                       # mainland-clipped GeoJSON (see mainland_europe_geometry)
+    cells: dict = field(default_factory=dict)  # (indicator, year) -> row positions in df
+
+    def rows(self, indicator, year) -> pd.DataFrame:
+        return self.df.iloc[self.cells.get((indicator, year), [])]
+
+
+def map_context(shared_data, geometry=None) -> MapContext:
+    """Build the map context from an already loaded get_shared_data_components() result."""
+    df = shared_data["time_series"]
+    # Filter to Europe to match the GeoJSON subset
+    df = df[df["country"].isin(EUROPE_ISO3)].reset_index(drop=True)
+    if df.empty:
+        raise ValueError("No European rows found in CSV")
+    cells = {(str(ind), int(yr)): pos for (ind, yr), pos in
+             df.groupby(["indicator", "year"], observed=True, sort=False).indices.items()}
+    return MapContext(
+        df=df,
+        years=sorted(df["year"].dropna().unique()),
+        units_dict=shared_data["units_dict"],
+        unit_suffix_dict=shared_data["suffix"],
+        indicators_dict=shared_data["indicators_dict"],
+        indicator_options=shared_data["indicator_options"],
+        default_indicator=shared_data["default_indicator"],
+        geometry=geometry if geometry is not None else mainland_europe_geometry(),
+        cells=cells,
+    )
+
+
 def make_europe_map(do_features, save_html=True, do_buttons=True, custom_indicator=None, custom_year=None):
     """
     Build a single choropleth figure with dropdowns for indicator and year.
-    Expects a tidy CSV with columns: ISO3, indicator, year, value.
+    Loads the latest release and the geometry itself; callers that already hold the data (the
+    Dash app) build a MapContext once and call render_europe_map instead.
     """
-    geojson = get_geojson()
-    fkey = "id"
-    continental_geo =  clip_to_mainland_europe(geojson)
+    ctx = map_context(get_shared_data_components(do_features=do_features))
+    return render_europe_map(ctx, custom_indicator, custom_year, save_html=save_html, do_buttons=do_buttons)
 
-    shared_data = get_shared_data_components(do_features=do_features)
-    df = shared_data["time_series"]
-    # Filter to Europe to match the GeoJSON subset
-    df = df[df["country"].isin(EUROPE_ISO3)].copy()
-    if df.empty:
-        raise ValueError("No European rows found in CSV")
-    #assert {"FRA","NOR"} <= set(df["country"])  # confirm present
 
-    country_dict = shared_data["country_dict"]
-    units_dict = shared_data['units_dict']
-    years = sorted(df["year"].dropna().unique())
+def render_europe_map(ctx: MapContext, custom_indicator=None, custom_year=None, save_html=False, do_buttons=False):
+    """Choropleth for one indicator and year from a prepared MapContext (no file or geometry work)."""
+    fkey = "id"
+    continental_geo = ctx.geometry
+    units_dict = ctx.units_dict
+    years = ctx.years
 
-    unit_suffix_dict = shared_data['suffix'] 
+    unit_suffix_dict = ctx.unit_suffix_dict
     # Use custom values if provided (for Dash integration)
     if custom_indicator is not None and custom_year is not None:
         init_indicator = custom_indicator
         init_year = custom_year
     else:
         # Use defaults for standalone version
-        init_indicator = shared_data['default_indicator']
+        init_indicator = ctx.default_indicator
         init_year = datetime.now().year
 
     init_unit = units_dict[init_indicator]
     initial_idx = years.index(init_year)
     init_unit_suffix = unit_suffix_dict[init_indicator]
-    current_data = df.query("indicator == @init_indicator and year == @init_year")
+    current_data = ctx.rows(init_indicator, init_year)
     zmin, zmax = get_colorscale_limits(current_data["value"], percentile=95)
 
     fig = px.choropleth(
-        df.query("indicator == @init_indicator and year == @init_year"),
+        current_data,
         geojson=continental_geo,
         featureidkey=fkey,
         locations="country",
@@ -83,7 +118,7 @@ def make_europe_map(do_features, save_html=True, do_buttons=True, custom_indicat
     fig.update_traces(
         hovertemplate=f"<b>%{{customdata[0]}}</b><br>Value: %{{customdata[1]:.2f}}{init_unit_suffix}<extra></extra>"
     )
-    shared_title_style(fig, init_indicator, shared_data['indicators_dict'])
+    shared_title_style(fig, init_indicator, ctx.indicators_dict)
 
     fig.update_layout(
         margin=dict(l=20, r=100, t=80, b=20), 
@@ -101,7 +136,7 @@ def make_europe_map(do_features, save_html=True, do_buttons=True, custom_indicat
         button_year_x = 0.0
         button_indicator_x = 0.15
         for yr in years:
-            year_data = df.loc[(df.indicator==init_indicator)&(df.year==yr)]
+            year_data = ctx.rows(init_indicator, yr)
             buttons_year.append(dict(
                 label=str(yr),
                 method="update",
@@ -112,7 +147,7 @@ def make_europe_map(do_features, save_html=True, do_buttons=True, custom_indicat
                         "customdata": [year_data[["country_name", "value"]].values.tolist()]  # UPDATE THIS TOO
                     },
                     {"annotations": [dict(
-                        text=f"{shared_data['indicators_dict'][init_indicator]} ({yr})",
+                        text=f"{ctx.indicators_dict[init_indicator]} ({yr})",
                         x=button_year_x, y=1.01, xref="paper", yref="paper",
                         showarrow=False, font=dict(size=26),
                         xanchor="center", yanchor="bottom"
@@ -121,10 +156,10 @@ def make_europe_map(do_features, save_html=True, do_buttons=True, custom_indicat
             ))
         # Create indicators button:
         buttons_indicator = []
-        for option in shared_data["indicator_options"]:
+        for option in ctx.indicator_options:
             iid = option["value"]
             # Get the filtered data for this indicator
-            indicator_data = df.loc[(df["indicator"] == iid) & (df["year"] == init_year)]
+            indicator_data = ctx.rows(iid, init_year)
             label = option["label"] 
             unit = units_dict.get(iid, "")
             unit_suffix = unit_suffix_dict.get(iid, "")  
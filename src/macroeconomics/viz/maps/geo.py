@@ -103,6 +103,10 @@ def get_geojson(onlyEurope: bool = True, source: Optional[PathLike] = None) -> J
 
     return data
 
+@lru_cache(maxsize=4)
+def mainland_europe_geometry(source: Optional[PathLike] = None) -> Json:
+    """European countries clipped to the mainland bounding box: clipped once per process and source, then reused."""
+    return clip_to_mainland_europe(get_geojson(True, source))
 
 
 if __name__ == "__main__":
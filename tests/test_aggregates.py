@@ -0,0 +1,59 @@
+import pandas as pd
+
+from macroeconomics.core.constants import AGGREGATE_GROUPS, COUNTRIES_ISO3
+from macroeconomics.features.aggregates import (
+    aggregate_members, aggregates_cache_path, compute_aggregates, load_aggregates,
+)
+
+GROUPS = {"AB": ("A and B", ("AAA", "BBB")), "BC": ("B and C", ("BBB", "CCC"))}
+METHODS = {"NGDPD": "sum", "LP": "sum", "NGDPDPC": "LP", "PCPIEPCH": "NGDPD", "NGDP_RPCH": "PPP"}
+
+
+def release():
+    rows = []
+    for country, gdp, pop, ppppc, infl in (("AAA", 100.0, 10.0, 5.0, 2.0), ("BBB", 300.0, 30.0, 20.0, 6.0),
+                                           ("CCC", 50.0, 5.0, 10.0, 1.0)):
+        for year in (2020, 2021):
+            rows += [(country, "NGDPD", year, gdp), (country, "LP", year, pop), (country, "PPPPC", year, ppppc),
+                     (country, "NGDPDPC", year, gdp / pop), (country, "PCPIEPCH", year, infl),
+                     (country, "NGDP_RPCH", year, infl - 1)]
+    df = pd.DataFrame(rows, columns=["country", "indicator", "year", "value"])
+    # CCC does not report GDP in 2021: no sum for BC that year
+    return df.drop(df.index[(df["country"] == "CCC") & (df["indicator"] == "NGDPD") & (df["year"] == 2021)])
+
+
+def test_weighted_and_summed_aggregates():
+    out = compute_aggregates(release(), GROUPS, METHODS)
+    got = out.astype({"country": str, "indicator": str}).set_index(["country", "indicator", "year"])["value"]
+    assert got[("AB", "NGDPD", 2020)] == 400.0 and got[("AB", "LP", 2021)] == 40.0
+    assert got[("AB", "NGDPDPC", 2020)] == 400.0 / 40.0                       # population-weighted
+    assert got[("AB", "PCPIEPCH", 2020)] == (2.0 * 100 + 6.0 * 300) / 400      # GDP-weighted
+    assert got[("AB", "NGDP_RPCH", 2020)] == (1.0 * 50 + 5.0 * 600) / 650      # PPPPC x LP weights
+    assert got[("BC", "NGDPD", 2020)] == 350.0 and ("BC", "NGDPD", 2021) not in got
+    assert ("BC", "PCPIEPCH", 2021) not in got                                 # only BBB has a weight
+    assert "PPPPC" not in set(got.index.get_level_values("indicator"))           # no method: not aggregated
+
+
+def test_aggregates_cached_next_to_release(tmp_path):
+    path = tmp_path / "imf_weo_timeseries_2025_april.csv"
+    release().to_csv(path, index=False)
+    first = load_aggregates(path, GROUPS, METHODS)
+    cache = aggregates_cache_path(path, GROUPS, METHODS)
+    assert cache.exists() and cache != aggregates_cache_path(path, GROUPS, METHODS | {"LP": "NGDPD"})
+    cache.write_text("country,indicator,year,value\nAB,LP,2020,1.0\n")  # served from the cache
+    assert load_aggregates(path, GROUPS, METHODS)["value"].tolist() == [1.0]
+    assert len(first) > 1
+
+
+def test_missing_members_are_not_aggregated():
+    df = release()
+    partial = compute_aggregates(df[df["country"] != "CCC"], GROUPS, METHODS)
+    assert set(partial["country"].astype(str)) == {"AB"}  # BC without CCC: neither sums nor means
+    # a mean tolerates a small gap when the threshold allows it
+    loose = compute_aggregates(df[df["country"] != "CCC"], GROUPS, METHODS, min_coverage=0.5)
+    got = loose.astype({"country": str, "indicator": str}).set_index(["country", "indicator", "year"])["value"]
+    assert got[("BC", "PCPIEPCH", 2020)] == 6.0 and ("BC", "NGDPD", 2020) not in got
+
+
+def test_aggregate_members_are_fetched():
+    assert aggregate_members(groups=AGGREGATE_GROUPS) <= set(COUNTRIES_ISO3)
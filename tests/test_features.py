@@ -0,0 +1,65 @@
+import math
+
+import pandas as pd
+
+from macroeconomics.features.build_features import compute_additional_variables_df
+
+
+def test_level_baselines_vectorized():
+    df = pd.DataFrame({
+        "country": ["ESP"] * 3 + ["FRA"] * 3 + ["ITA"] * 2,
+        "indicator": "NGDPD",
+        "year": [2018, 2019, 2020] * 2 + [2018, 2020],
+        "value": [90.0, 100.0, 110.123, 5.0, 0.0, 7.0, 1.0, 2.0],  # FRA: zero baseline, ITA: none
+    })
+    wide = compute_additional_variables_df(df, 2019, do_cum=True).set_index(["country", "year"])
+    assert wide.loc[("ESP", 2020), ["baseline2019", "index2019", "rel2019", "delta2019", "pct_cum2019"]].tolist() \
+        == [100.0, 110.12, 0.1, 10.12, 10.12]
+    assert wide.loc[("ESP", 2018), "index2019"] == 90.0
+    assert math.isnan(wide.loc[("FRA", 2020), "index2019"]) and wide.loc[("FRA", 2020), "delta2019"] == 7.0
+    assert wide.loc[["ITA"], ["baseline2019", "index2019", "delta2019"]].isna().all().all()
+    assert list(wide.index.get_level_values("country")) == ["ESP"] * 3 + ["FRA"] * 3 + ["ITA"] * 2
+
+
+def test_chain_link_yoy_matches_sequential_definition():
+    from macroeconomics.features.build_features import chain_link_yoy
+
+    df = pd.DataFrame({
+        "country": ["ESP"] * 5 + ["FRA"] * 4 + ["ITA"] * 2,
+        "indicator": "PCPIEPCH",
+        "year": [2017, 2018, 2019, 2020, 2021] + [2016, 2017, 2018, 2019] + [2020, 2021],
+        "value": [1.0, 10.0, 3.0, float("nan"), 25.0] + [2.0, 5.0, -100.0, 4.0] + [1.0, 2.0],
+    }).sample(frac=1, random_state=0)  # input order must not matter
+    idx = chain_link_yoy(df, 2019)
+    got = dict(zip(zip(df["country"], df["year"]), idx))
+
+    assert got[("ESP", 2019)] == 100.0
+    assert got[("ESP", 2020)] == 100.0                      # missing rate counts as 0%
+    assert got[("ESP", 2021)] == 125.0
+    assert got[("ESP", 2018)] == round(100 / 1.03, 2)
+    assert got[("ESP", 2017)] == round(100 / 1.03 / 1.10, 2)
+    assert got[("FRA", 2018)] == round(100 / 1.04, 2)
+    assert math.isnan(got[("FRA", 2017)]) and math.isnan(got[("FRA", 2016)])  # -100% in 2018
+    assert math.isnan(got[("ITA", 2020)])                   # no baseline year
+
+
+def test_multiple_baselines_in_one_pass():
+    from macroeconomics.features.build_features import add_2019_norm_long, parse_baselines
+
+    assert parse_baselines("2008, 2019,2020") == [2008, 2019, 2020] and parse_baselines(2019) == [2019]
+    df = pd.DataFrame({
+        "country": ["ESP"] * 4 + ["FRA"] * 4,
+        "indicator": ["NGDPD"] * 4 + ["PCPIEPCH"] * 4,
+        "year": [2018, 2019, 2020, 2021] * 2,
+        "value": [90.0, 100.0, 0.0, 121.0, 1.0, 10.0, 3.0, -100.0],  # zero 2020 level baseline
+    })
+    both = compute_additional_variables_df(df, [2019, 2020], do_cum=True, keep_rate_pp_delta=True)
+    for year in (2019, 2020):
+        single = compute_additional_variables_df(df, year, do_cum=True, keep_rate_pp_delta=True)
+        cols = [c for c in single.columns if c.endswith(str(year))]
+        pd.testing.assert_frame_equal(both[cols].reset_index(drop=True), single[cols].reset_index(drop=True))
+
+    long = add_2019_norm_long(df, baseline_year="2019,2020")
+    assert {"NGDPD_index2019", "NGDPD_pct_cum2019", "PCPIEPCH_index2020"} <= set(long["indicator"])
+    assert "NGDPD_index2020" not in set(long["indicator"])  # zero baseline: no rows
+    assert "PCPIEPCH_index2020" not in set(add_2019_norm_long(df, baseline_year=2019)["indicator"])
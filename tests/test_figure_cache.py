@@ -0,0 +1,64 @@
+import itertools
+import json
+
+import plotly.graph_objects as go
+
+from macroeconomics.viz.figure_cache import FigureCache, MemoryFigureCache, SQLiteFigureCache
+
+
+def _fig(n):
+    return go.Figure(go.Scatter(x=[1, 2], y=[n, n]))
+
+
+def test_cache_is_shared_between_workers_and_invalidated_by_release(tmp_path):
+    db = tmp_path / "figures.sqlite"
+    builds = []
+
+    def build(n):
+        builds.append(n)
+        return _fig(n)
+
+    worker_a = FigureCache(SQLiteFigureCache(db), "release-1")
+    worker_b = FigureCache(SQLiteFigureCache(db), "release-1")
+    first = worker_a.get_or_build("timeseries", {"countries": ["ESP", "FRA"]}, lambda: build(1))
+    cached = worker_b.get_or_build("timeseries", {"countries": ["ESP", "FRA"]}, lambda: build(2))
+    assert builds == [1] and cached == json.loads(first.to_json())
+    assert worker_a.stats()["hits"] == 0  # worker_b's hit is still buffered ...
+    assert worker_b.stats()["hits"] == 1 and worker_a.stats()["misses"] == 1  # ... until it flushes
+
+    # a dashboard with other settings shares the store without purging it
+    other_settings = FigureCache(SQLiteFigureCache(db), "release-1", namespace="baseline=2008")
+    other_settings.get_or_build("timeseries", {"countries": ["ESP", "FRA"]}, lambda: build(4))
+    assert builds == [1, 4] and other_settings.stats()["entries"] == 2
+
+    # a new release drops the old figures and never serves them
+    worker_c = FigureCache(SQLiteFigureCache(db), "release-2")
+    assert worker_c.stats()["entries"] == 0
+    worker_c.get_or_build("timeseries", {"countries": ["ESP", "FRA"]}, lambda: build(3))
+    assert builds == [1, 4, 3]
+
+
+def test_sqlite_hits_do_not_write(tmp_path):
+    backend = SQLiteFigureCache(tmp_path / "figures.sqlite")
+    cache = FigureCache(backend, "r")
+    cache.get_or_build("map", {"n": 1}, lambda: _fig(1))
+    writes = backend._db.total_changes
+    for _ in range(10):
+        cache.get_or_build("map", {"n": 1}, lambda: _fig(-1))
+    assert backend._db.total_changes == writes
+    assert cache.stats()["hits"] == 10 and backend._db.total_changes > writes  # flushed in one go
+
+
+def test_eviction_is_least_recently_used():
+    clock = itertools.count()
+    size = len(_fig(0).to_json())
+    for backend in (MemoryFigureCache(max_bytes=2 * size), SQLiteFigureCache(":memory:", 2 * size, clock=lambda: next(clock))):
+        cache = FigureCache(backend, "r")
+        for n in (1, 2):
+            cache.get_or_build("map", {"n": n}, lambda: _fig(n))
+        cache.get_or_build("map", {"n": 1}, lambda: _fig(-1))  # touch 1, so 2 is the oldest
+        cache.get_or_build("map", {"n": 3}, lambda: _fig(3))
+        stats = cache.stats()
+        assert stats["entries"] == 2 and stats["evicted"] == 1 and stats["bytes"] <= 2 * size
+        assert backend.get(cache.key("map", {"n": 2})) is None
+        assert backend.get(cache.key("map", {"n": 1})) is not None
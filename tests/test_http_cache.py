@@ -0,0 +1,91 @@
+import json
+
+import pytest
+
+from macroeconomics.datasets.http_cache import OfflineCacheMiss, ResponseCache, endpoint_of
+
+BASE = "https://www.imf.org/external/datamapper/api/v1/"
+
+
+class FakeResponse:
+    def __init__(self, status_code, payload=None, headers=None):
+        self.status_code = status_code
+        self.content = json.dumps(payload).encode() if payload is not None else b""
+        self.headers = headers or {}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(self.status_code)
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class Server:
+    """Serves one payload with an ETag and answers 304 to a matching If-None-Match."""
+    def __init__(self, payload):
+        self.payload = payload
+        self.calls = []
+
+    def fetch(self, headers=None):
+        headers = headers or {}
+        self.calls.append(headers)
+        if headers.get("If-None-Match") == '"v1"':
+            return FakeResponse(304, headers={"ETag": '"v1"'})
+        return FakeResponse(200, self.payload, {"ETag": '"v1"'})
+
+
+@pytest.fixture
+def clock():
+    now = [1000.0]
+    tick = lambda: now[0]
+    tick.now = now
+    return tick
+
+
+def test_endpoint_of():
+    assert endpoint_of(BASE + "countries") == "countries"
+    assert endpoint_of(BASE + "timeseries/NGDPD/ESP,FRA?periods=2019") == "timeseries"
+
+
+def test_fresh_hit_then_revalidation(tmp_path, clock):
+    cache = ResponseCache(tmp_path, ttl={"countries": 60}, clock=clock)
+    server = Server({"countries": {"ESP": {"label": "Spain"}}})
+    url = BASE + "countries"
+
+    assert cache.get_json(url, server.fetch) == server.payload
+    assert cache.get_json(url, server.fetch) == server.payload
+    assert len(server.calls) == 1  # second call served from disk
+
+    clock.now[0] += 120  # past the TTL: conditional request, answered 304
+    assert cache.get_json(url, server.fetch) == server.payload
+    assert server.calls[-1] == {"If-None-Match": '"v1"'}
+    assert cache.stats == {"hits": 1, "revalidated": 1, "misses": 1, "evicted": 0}
+
+
+def test_lru_eviction_and_offline(tmp_path, clock):
+    cache = ResponseCache(tmp_path, max_bytes=250, clock=clock)
+    urls = [BASE + f"timeseries/NGDPD/C{i}" for i in range(3)]
+    for i, url in enumerate(urls):
+        clock.now[0] += 1
+        cache.get_json(url, Server({"values": {"NGDPD": {f"C{i}": {"2019": i}}}, "pad": "x" * 60}).fetch)
+    assert cache.total_bytes() <= 250
+    assert cache.lookup(urls[0]) is None  # oldest access evicted first
+    assert cache.lookup(urls[2]) is not None
+
+    offline = ResponseCache(tmp_path, offline=True, clock=clock)
+    assert offline.get_json(urls[2], None)["values"]["NGDPD"] == {"C2": {"2019": 2}}
+    with pytest.raises(OfflineCacheMiss):
+        offline.get_json(urls[0], None)
+
+
+def test_concurrent_stores_of_the_same_body(tmp_path, clock):
+    from concurrent.futures import ThreadPoolExecutor
+
+    cache = ResponseCache(tmp_path, clock=clock)
+    body = json.dumps({"values": {}}).encode()  # the common empty reply of a bad batch
+    urls = [BASE + f"timeseries/NGDPD/C{i}" for i in range(64)]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda url: cache.store(url, body, {}), urls))
+    assert all(cache.load(cache.lookup(url)) == {"values": {}} for url in urls)
+    assert not list((tmp_path / "objects").rglob("*.tmp"))
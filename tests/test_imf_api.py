@@ -0,0 +1,203 @@
+import pandas as pd
+from urllib.parse import urlsplit
+
+from macroeconomics.datasets import imf_api
+from macroeconomics.datasets.batching import BatchSizeMemory
+from macroeconomics.datasets.storage import PartitionedWriter, combine_partitions
+
+
+class FakeResponse:
+    def __init__(self, payload, error=None):
+        self._payload = payload
+        self._error = error
+
+    def raise_for_status(self):
+        if self._error is not None:
+            raise self._error
+
+    def json(self):
+        return self._payload
+
+
+class FakeSession:
+    """Answers timeseries requests with value = year + position of the country code."""
+    def get(self, url, timeout=None, headers=None):
+        parts = urlsplit(url)
+        _, _, indicator, countries = parts.path.rsplit("/", 3)
+        years = parts.query.split("=", 1)[1].split(",")
+        data = {c: {y: int(y) + i for y in years} for i, c in enumerate(countries.split(","))}
+        return FakeResponse({"values": {indicator: data}})
+
+    def close(self):
+        pass
+
+
+def test_parallel_matches_serial(monkeypatch):
+    monkeypatch.setattr(imf_api, "get_session", lambda: FakeSession())
+    monkeypatch.setattr(imf_api, "make_session", lambda pool_size=None: FakeSession())
+    countries = [f"C{i:02d}" for i in range(23)]
+    indicators = ["NGDPD", "LP", "PCPIEPCH"]
+    years = [2019, 2020, 2021]
+
+    serial = [(ind, imf_api.fetch_timeseries_chunked(ind, countries, years=years, chunk_size=5))
+              for ind in indicators]
+    parallel = list(imf_api.iter_timeseries_parallel(indicators, countries, years=years, chunk_size=5,
+                                                     workers=4, max_per_host=2))
+
+    assert [ind for ind, _ in parallel] == indicators
+    for (_, expected), (_, got) in zip(serial, parallel):
+        pd.testing.assert_frame_equal(expected, got)
+        assert len(got) == len(countries) * len(years)
+
+
+def test_parallel_fetches_a_bounded_window_of_indicators(monkeypatch):
+    requested = []
+
+    class RecordingSession(FakeSession):
+        def get(self, url, timeout=None, headers=None):
+            requested.append(urlsplit(url).path.rsplit("/", 2)[1])
+            return super().get(url, timeout=timeout, headers=headers)
+
+    monkeypatch.setattr(imf_api, "make_session", lambda pool_size=None: RecordingSession())
+    indicators = [f"I{i}" for i in range(6)]
+    stream = imf_api.iter_timeseries_parallel(indicators, ["ESP", "FRA", "DEU"], years=[2019], chunk_size=1,
+                                              workers=2, window=2)
+    assert next(stream)[0] == "I0"
+    assert set(requested) <= {"I0", "I1", "I2"}  # the window, plus the indicator queued before yielding
+    assert [ind for ind, _ in stream] == indicators[1:]
+
+
+def test_parallel_closes_its_session_when_stopped_early(monkeypatch):
+    sessions = []
+
+    class ClosingSession(FakeSession):
+        closed = False
+
+        def close(self):
+            self.closed = True
+
+    monkeypatch.setattr(imf_api, "make_session", lambda pool_size=None: sessions.append(ClosingSession()) or sessions[-1])
+    stream = imf_api.iter_timeseries_parallel(["NGDPD", "LP", "LUR"], ["ESP", "FRA"], years=[2019], chunk_size=1,
+                                              workers=2)
+    next(stream)
+    stream.close()
+    assert sessions and sessions[0].closed
+
+
+class RejectingSession(FakeSession):
+    """Fails every request whose country list contains BAD."""
+    def get(self, url, timeout=None, headers=None):
+        if "BAD" in url:
+            return FakeResponse(None, error=imf_api.requests.HTTPError("500 Server Error"))
+        return super().get(url, timeout=timeout, headers=headers)
+
+
+def test_plan_batches_respects_url_length():
+    codes = [f"C{i:02d}" for i in range(30)]
+    prefix = "https://x/timeseries/NGDPD/"
+    batches = imf_api.plan_batches(codes, prefix, "?periods=2019", max_batch=25, max_url_length=60)
+    assert [c for b in batches for c in b] == codes
+    assert all(len(prefix + ",".join(b) + "?periods=2019") <= 60 for b in batches)
+    assert max(len(b) for b in batches) == 5
+
+
+class LongBatchSession(FakeSession):
+    """Fails every request with more than four country codes."""
+    def get(self, url, timeout=None, headers=None):
+        if urlsplit(url).path.rsplit("/", 1)[1].count(",") >= 4:
+            return FakeResponse(None, error=imf_api.requests.HTTPError("414 URI Too Long"))
+        return super().get(url, timeout=timeout, headers=headers)
+
+
+def test_bad_code_is_isolated_without_shrinking_the_batch_size(monkeypatch, tmp_path):
+    monkeypatch.setattr(imf_api, "get_session", lambda: RejectingSession())
+    countries = ["ESP", "FRA", "DEU", "BAD", "ITA", "PRT", "GRC", "AUT"]
+    memory = BatchSizeMemory(tmp_path / "sizes.json")
+
+    df = imf_api.fetch_timeseries_chunked("NGDPD", countries, years=[2019], chunk_size=8, memory=memory)
+    assert list(df["country"]) == [c for c in countries if c != "BAD"]
+    # 8 -> 4 -> 2 -> 1 around BAD: a bad code, not a size failure, so the size is kept
+    remembered = BatchSizeMemory(tmp_path / "sizes.json")
+    assert remembered.size_for("NGDPD", 8) == 8 and remembered.bad_codes("NGDPD") == ["BAD"]
+    # next run: BAD is requested alone and the rest goes in one batch
+    batches = imf_api.plan_indicator_batches("NGDPD", countries, "", 8, remembered)
+    assert batches == [[c for c in countries if c != "BAD"], ["BAD"]]
+
+
+def test_size_failure_is_remembered(monkeypatch, tmp_path):
+    monkeypatch.setattr(imf_api, "get_session", lambda: LongBatchSession())
+    countries = [f"C{i:02d}" for i in range(8)]
+    memory = BatchSizeMemory(tmp_path / "sizes.json")
+
+    df = imf_api.fetch_timeseries_chunked("NGDPD", countries, years=[2019], chunk_size=8, memory=memory)
+    assert list(df["country"]) == countries
+    assert BatchSizeMemory(tmp_path / "sizes.json").size_for("NGDPD", 8) == 4
+
+
+def test_columnar_dtypes_and_streaming(monkeypatch):
+    monkeypatch.setattr(imf_api, "get_session", lambda: FakeSession())
+    countries = ["FRA", "ESP", "DEU", "ITA", "PRT"]
+
+    df = imf_api.fetch_timeseries_chunked("NGDPD", countries, years=[2019, 2020], chunk_size=2)
+    assert isinstance(df["country"].dtype, pd.CategoricalDtype)
+    assert list(df["country"].cat.categories) == sorted(countries)
+    assert df["year"].dtype == "int16" and df["value"].dtype == "float64"
+
+    parts = list(imf_api.iter_timeseries_batches("NGDPD", countries, years=[2019, 2020], chunk_size=2))
+    assert [len(p) for p in parts] == [4, 4, 2]
+    streamed = pd.concat(parts, ignore_index=True)
+    assert streamed["country"].astype(str).tolist() == df["country"].astype(str).tolist()
+    assert streamed["value"].tolist() == df["value"].tolist()
+
+
+def test_columnar_csv_matches_the_row_dict_path(tmp_path):
+    """Same rows and numbers as the old row-dict CSV; only the value formatting changed."""
+    fixture = {
+        "NGDPD": {"values": {"NGDPD": {"FRA": {"2019": 2715.5, "2020": None}, "ESP": {"2019": 1394.3, "2020": 1276.9}}}},
+        "LP": {"values": {"LP": {"FRA": {"2019": 67, "2020": 68}, "ESP": {"2019": 47, "2020": "n/a"}}}},
+    }
+    batch = ["ESP", "FRA"]
+
+    # Baseline: one dict per observation carrying the raw value, one frame per indicator
+    frames = [pd.DataFrame([{"country": c, "indicator": ind, "year": int(y), "value": v}
+                            for c, series in js["values"][ind].items() for y, v in series.items()])
+              for ind, js in fixture.items()]
+    old = tmp_path / "old.csv"
+    pd.concat(frames, ignore_index=True).sort_values(["indicator", "country", "year"]).to_csv(old, index=False)
+
+    writer = PartitionedWriter(tmp_path / "parts")
+    for ind, js in fixture.items():
+        writer.write(ind, imf_api.parse_timeseries_batch(js, ind, batch).to_frame())
+    writer.finish()
+    new = combine_partitions(tmp_path / "parts", tmp_path / "new.csv")
+
+    a, b = pd.read_csv(old), pd.read_csv(new)
+    a["value"] = pd.to_numeric(a["value"], errors="coerce")
+    pd.testing.assert_frame_equal(a, b)
+
+    # Documented format change: integers gain a ".0", non-numeric placeholders are written empty
+    changed = [(x, y) for x, y in zip(old.read_text().splitlines(), new.read_text().splitlines()) if x != y]
+    assert changed == [
+        ("ESP,LP,2019,47", "ESP,LP,2019,47.0"),
+        ("ESP,LP,2020,n/a", "ESP,LP,2020,"),
+        ("FRA,LP,2019,67", "FRA,LP,2019,67.0"),
+        ("FRA,LP,2020,68", "FRA,LP,2020,68.0"),
+    ]
+
+
+def test_offline_cache_misses_are_reported(monkeypatch):
+    from macroeconomics.datasets.http_cache import OfflineCacheMiss
+
+    def dm_get_json(path, **kwargs):
+        if "FRA" in path:
+            raise OfflineCacheMiss(f"Offline and not cached: {path}")
+        return FakeSession().get(imf_api.BASE + path).json()
+
+    monkeypatch.setattr(imf_api, "dm_get_json", dm_get_json)
+    monkeypatch.setattr(imf_api, "make_session", lambda pool_size=None: FakeSession())
+    serial, threaded = [], []
+    df = imf_api.fetch_timeseries_chunked("NGDPD", ["ESP", "FRA", "DEU"], years=[2019], chunk_size=1, missing=serial)
+    assert list(df["country"].astype(str)) == ["ESP", "DEU"]
+    list(imf_api.iter_timeseries_parallel(["NGDPD"], ["ESP", "FRA", "DEU"], years=[2019], chunk_size=1,
+                                          workers=2, missing=threaded))
+    assert serial == threaded == [("NGDPD", ["FRA"])]
@@ -0,0 +1,38 @@
+import pandas as pd
+
+from macroeconomics.datasets.releases import register_release_files
+from macroeconomics.features.build_features import add_2019_norm_long
+from macroeconomics.features.incremental import incremental_features, save_group_hashes
+
+
+def release(bump=0.0):
+    df = pd.DataFrame({
+        "country": ["ESP"] * 6 + ["FRA"] * 6,
+        "indicator": (["NGDPD"] * 3 + ["NGDP_RPCH"] * 3) * 2,
+        "year": [2018, 2019, 2020] * 4,
+        "value": [90.0, 100.0, 110.0, 1.5, 2.0, -3.0, 50.0, 60.0, 70.0, 1.0, 1.0, 1.0],
+    })
+    df.loc[(df["country"] == "FRA") & (df["indicator"] == "NGDPD") & (df["year"] == 2020), "value"] += bump
+    return df
+
+
+def write_features(tmp_path, tag, df, hashes, baselines):
+    path = tmp_path / f"imf_weo_timeseries_{tag}_with_features.csv"
+    df.to_csv(path, index=False)
+    save_group_hashes(path, hashes, baselines)
+    register_release_files(tmp_path, tag, {"time_series": path}, features=True)
+
+
+def test_only_changed_groups_are_recomputed(tmp_path):
+    first, hashes, stats = incremental_features(release(), [2019], tmp_path)
+    assert stats == {"recomputed": 4, "reused": 0}
+    write_features(tmp_path, "2025_april", first, hashes, [2019])
+
+    revised = release(bump=5.0)
+    df_long, _, stats = incremental_features(revised, [2019], tmp_path)
+    assert stats == {"recomputed": 1, "reused": 3}
+    expected = add_2019_norm_long(revised, baseline_year=[2019])
+    assert df_long.to_csv(index=False) == expected.to_csv(index=False)  # what features_main writes
+
+    # different baseline years: nothing can be reused
+    assert incremental_features(revised, [2019, 2020], tmp_path)[2] == {"recomputed": 4, "reused": 0}
@@ -0,0 +1,9 @@
+from macroeconomics.main import build_parser
+
+
+def test_baseline_after_the_subcommand():
+    parser = build_parser()
+    assert parser.parse_args(["features", "--baseline", "2008,2019,2020"]).baseline == "2008,2019,2020"
+    assert parser.parse_args(["--baseline", "2008", "features"]).baseline == "2008"
+    assert parser.parse_args(["features"]).baseline == 2019
+    assert parser.parse_args(["dash", "--baseline", "2008,2019"]).baseline == "2008,2019"
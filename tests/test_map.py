@@ -0,0 +1,43 @@
+import json
+from pathlib import Path
+
+import pandas as pd
+
+from macroeconomics.datasets.schema import enforce_schema
+from macroeconomics.viz.maps.geo import get_geojson, mainland_europe_geometry
+from macroeconomics.viz.maps.europe_interactive_map import map_context, render_europe_map
+
+FIXTURE = Path(__file__).parent / "data" / "world_countries.geojson"
+
+
+def shared_data():
+    df = pd.DataFrame([(c, i, y, v) for c, v in (("ESP", 1.0), ("FRA", 2.0), ("USA", 9.0))
+                       for i in ("LUR", "NGDPD") for y in (2020, 2021)], columns=["country", "indicator", "year", "value"])
+    df["country_name"] = df["country"].map({"ESP": "Spain", "FRA": "France", "USA": "United States"})
+    return {
+        "time_series": enforce_schema(df),
+        "units_dict": {"LUR": "Percent", "NGDPD": "Billions of U.S. dollars"},
+        "suffix": {"LUR": "%", "NGDPD": " USD billions"},
+        "indicators_dict": {"LUR": "Unemployment", "NGDPD": "GDP"},
+        "indicator_options": [{"label": "GDP", "value": "NGDPD"}, {"label": "Unemployment", "value": "LUR"}],
+        "default_indicator": "NGDPD",
+    }
+
+
+def test_geometry_clipped_once_without_touching_source():
+    source = json.dumps(get_geojson(True, FIXTURE), sort_keys=True)
+    clipped = mainland_europe_geometry(FIXTURE)
+    assert mainland_europe_geometry(FIXTURE) is clipped
+    assert json.dumps(get_geojson(True, FIXTURE), sort_keys=True) == source
+    assert {"ESP", "FRA"} <= {f["id"] for f in clipped["features"]}
+
+
+def test_render_from_prepared_context():
+    ctx = map_context(shared_data(), geometry=mainland_europe_geometry(FIXTURE))
+    assert set(ctx.df["country"]) == {"ESP", "FRA"}  # Europe only
+    fig = render_europe_map(ctx, "LUR", 2021)
+    assert list(fig.data[0].locations) == ["ESP", "FRA"] and list(fig.data[0].z) == [1.0, 2.0]
+    assert fig.data[0].geojson["features"][0]["id"] == mainland_europe_geometry(FIXTURE)["features"][0]["id"]
+    assert ctx.rows("LUR", 1999).empty
+    with_buttons = render_europe_map(ctx, "NGDPD", 2020, do_buttons=True)
+    assert [b.label for b in with_buttons.layout.updatemenus[1].buttons] == ["2020", "2021"]
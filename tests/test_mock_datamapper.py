@@ -0,0 +1,41 @@
+import os
+import subprocess
+import sys
+
+import pandas as pd
+import requests
+
+from macroeconomics.datasets.mock_datamapper import MockConfig, running_mock
+
+
+def test_mock_endpoints():
+    config = MockConfig(n_countries=5, n_indicators=2, first_year=2000, last_year=2005)
+    with running_mock(config) as (base, mock):
+        countries = requests.get(base + "countries", timeout=5).json()["countries"]
+        assert list(countries) == config.countries
+        js = requests.get(base + f"timeseries/NGDPD/{config.countries[0]},ZZZ?periods=2004,2005,2006", timeout=5).json()
+        assert list(js["values"]["NGDPD"]) == [config.countries[0]]
+        assert list(js["values"]["NGDPD"][config.countries[0]]) == ["2004", "2005"]
+        assert mock.requests == 2
+
+
+def test_data_main_against_mock(tmp_path):
+    config = MockConfig(n_countries=12, n_indicators=3)
+    with running_mock(config) as (base, mock):
+        env = dict(os.environ, MACRO_IMF_BASE=base, MACRO_DATA_DIR=str(tmp_path))
+        cmd = [sys.executable, "-m", "macroeconomics", "data", "--no-cache", "--workers", "4",
+               "--indicators", ",".join(config.indicators), "--countries", ",".join(config.countries)]
+        subprocess.run(cmd, env=env, check=True, capture_output=True)
+    (written,) = tmp_path.glob("imf_weo_timeseries_*.csv")
+    df = pd.read_csv(written)
+    assert set(df["indicator"]) == set(config.indicators)
+    assert set(df["country"]) == set(config.countries)
+
+
+def test_offline_with_empty_cache_fails_cleanly(tmp_path):
+    env = dict(os.environ, MACRO_DATA_DIR=str(tmp_path))
+    cmd = [sys.executable, "-m", "macroeconomics", "data", "--offline"]
+    proc = subprocess.run(cmd, env=env, capture_output=True, text=True)
+    assert "Traceback" not in proc.stderr
+    assert "metadata is not in the response cache" in proc.stdout + proc.stderr
+    assert not list(tmp_path.glob("imf_weo_*.csv"))
@@ -0,0 +1,25 @@
+import pandas as pd
+
+from macroeconomics.datasets.query import SeriesIndex
+from macroeconomics.datasets.schema import enforce_schema
+
+
+def test_series_index_matches_masks():
+    df = enforce_schema(pd.DataFrame({
+        "country": ["FRA", "ESP", "ESP", "FRA", "ESP", "ITA", "ESP"],
+        "indicator": ["LUR", "LUR", "LUR", "LUR", "NGDPD", "LUR", "LUR"],
+        "year": [2021, 2022, 2020, 2020, 2020, 2020, 2021],
+        "value": [7.0, 3.0, 1.0, 6.0, 9.0, 5.0, 2.0],
+        "country_name": ["France", "Spain", "Spain", "France", "Spain", "Italy", "Spain"],
+    })).sample(frac=1, random_state=0)
+    index = SeriesIndex(df)
+    assert len(index) == 7 and ("LUR", "ESP") in index and ("NGDPD", "FRA") not in index
+
+    got = index.frame("LUR", ["FRA", "ESP", "DEU"], years=(2021, 2022))
+    assert got["country"].astype(str).tolist() == ["ESP", "ESP", "FRA"]
+    assert got["year"].tolist() == [2021, 2022, 2021] and got["value"].tolist() == [2.0, 3.0, 7.0]
+    assert got["country_name"].astype(str).tolist() == ["Spain", "Spain", "France"]
+    assert got["year"].dtype == "int16" and got["value"].dtype == "float64"
+    assert index.frame("LUR", ["ESP"], years=(None, 2020))["value"].tolist() == [1.0]
+    assert index.frame("LUR", ["ESP"], years=(2030, 2040)).empty
+    assert index.frame("PCPIEPCH", ["ESP"]).empty
@@ -0,0 +1,45 @@
+import math
+
+import pandas as pd
+import pytest
+
+from macroeconomics.features.registry import REGISTRY, feature, run_features
+
+
+def release():
+    years = list(range(2015, 2022))
+    rows = []
+    for country, gdp0, pop in (("ESP", 1000.0, 50.0), ("FRA", 2000.0, 0.0)):
+        for k, y in enumerate(years):
+            rows += [(country, "NGDPD", y, gdp0 * 1.1 ** k), (country, "LP", y, pop), (country, "NGDP_RPCH", y, 2.0 + k)]
+    df = pd.DataFrame(rows, columns=["country", "indicator", "year", "value"])
+    return df.drop(df.index[(df["country"] == "ESP") & (df["indicator"] == "NGDPD") & (df["year"] == 2018)])
+
+
+def test_builtin_features_and_metadata():
+    meta = pd.DataFrame({"id": ["NGDPD", "LP", "NGDP_RPCH"], "label": "x", "description": "x",
+                         "source": "IMF", "unit": "u", "dataset": "WEO"})
+    long, rows = run_features(release(), meta)
+    got = long.set_index(["indicator", "country", "year"])["value"]
+    assert got[("NGDPD_PER_CAPITA", "ESP", 2015)] == 20000.0
+    assert ("NGDPD_PER_CAPITA", "FRA", 2015) not in got            # zero population
+    assert got[("NGDPD_GROWTH", "FRA", 2016)] == 10.0
+    assert ("NGDPD_GROWTH", "ESP", 2019) not in got                # 2018 is missing, not skipped over
+    assert got[("NGDPD_REAL_GAP", "FRA", 2017)] == 10.0 - 4.0       # depends on NGDPD_GROWTH
+    assert got[("NGDP_RPCH_MA5", "ESP", 2019)] == 4.0 and ("NGDP_RPCH_MA5", "ESP", 2018) not in got
+    assert math.isclose(got[("NGDPD_CAGR5", "FRA", 2020)], 10.0)
+    assert rows["id"].tolist() == list(REGISTRY) and list(rows.columns) == list(meta.columns)
+    assert set(rows["dataset"]) == {"WEO recalculated"}
+
+
+def test_custom_registry_skips_missing_inputs_and_rejects_cycles():
+    registry = {}
+    feature("A", inputs=("NGDPD",), label="A", unit="u", registry=registry)(lambda w: w["NGDPD"] * 2)
+    feature("B", inputs=("A", "LUR"), label="B", unit="u", registry=registry)(lambda w: w["A"] + w["LUR"])
+    long, rows = run_features(release(), pd.DataFrame(columns=["id", "label", "unit"]), registry=registry)
+    assert set(long["indicator"]) == {"A"} and rows["id"].tolist() == ["A"]  # LUR is not loaded
+
+    feature("C", inputs=("D",), label="C", unit="u", registry=registry)(lambda w: w["D"])
+    feature("D", inputs=("C",), label="D", unit="u", registry=registry)(lambda w: w["C"])
+    with pytest.raises(ValueError, match="cycle"):
+        run_features(release(), pd.DataFrame(columns=["id"]), features=["C"], registry=registry)
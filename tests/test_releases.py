@@ -0,0 +1,46 @@
+import json
+import os
+
+from macroeconomics.core.functions import find_latest_files_and_year
+from macroeconomics.datasets.releases import manifest_path, register_release_files
+
+
+def write(path, rows=2):
+    path.write_text("country,indicator,year,value\n" + "ESP,NGDPD,2020,1.0\n" * rows)
+    return path
+
+
+def test_manifest_latest_by_tag_and_rebuild(tmp_path):
+    for tag in ("2024_october", "2025_april"):
+        for kind in ("timeseries", "countries", "indicators"):
+            write(tmp_path / f"imf_weo_{kind}_{tag}.csv")
+    # the older release was touched last: mtime must not decide
+    old = tmp_path / "imf_weo_timeseries_2024_october.csv"
+    os.utime(old, (old.stat().st_atime, old.stat().st_mtime + 100))
+
+    files, year = find_latest_files_and_year(tmp_path)  # no manifest yet: rebuilt by scanning
+    assert year == 2025
+    assert files["time_series"].name == "imf_weo_timeseries_2025_april.csv"
+    manifest = json.loads(manifest_path(tmp_path).read_text())
+    assert manifest["latest"] == "2025_april"
+    assert manifest["releases"]["2024_october"]["files"]["time_series"]["rows"] == 2
+
+    # A registered release becomes the latest one without rescanning
+    new = {"time_series": write(tmp_path / "imf_weo_timeseries_2025_october.csv", rows=5),
+           "countries": write(tmp_path / "imf_weo_countries_2025_october.csv"),
+           "indicators": write(tmp_path / "imf_weo_indicators_2025_october.csv")}
+    register_release_files(tmp_path, "2025_october", new, rows={"time_series": 5})
+    files, _ = find_latest_files_and_year(tmp_path)
+    assert files == new
+
+    features = {"time_series": write(tmp_path / "imf_weo_timeseries_2025_october_with_features.csv"),
+                "indicators": write(tmp_path / "imf_weo_indicators_2025_october_with_features.csv")}
+    register_release_files(tmp_path, "2025_october", features, features=True)
+    files, _ = find_latest_files_and_year(tmp_path, do_features=True)
+    assert files == features | {"countries": new["countries"]}
+
+    # A file listed in the manifest disappeared: rescan and fall back to the previous release
+    new["time_series"].unlink()
+    files, year = find_latest_files_and_year(tmp_path)
+    assert files["time_series"].name == "imf_weo_timeseries_2025_april.csv"
+    assert json.loads(manifest_path(tmp_path).read_text())["latest"] == "2025_april"
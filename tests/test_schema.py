@@ -0,0 +1,24 @@
+import pandas as pd
+
+from macroeconomics.datasets.schema import enforce_schema, legacy_dtypes, memory_report
+
+
+def test_enforce_schema_and_memory_report():
+    df = pd.DataFrame({
+        "country": ["FRA", "ESP"] * 500,
+        "indicator": "NGDPD",
+        "year": list(range(2000, 2500)) * 2,
+        "value": 1.5,
+    })
+    df["country_name"] = df["country"].map({"FRA": "France", "ESP": "Spain"})
+
+    compact = enforce_schema(df)
+    assert {c: str(t) for c, t in compact.dtypes.items()} == {
+        "country": "category", "indicator": "category", "year": "int16", "value": "float64", "country_name": "category"}
+    assert list(compact["country"].cat.categories) == ["ESP", "FRA"]
+    assert enforce_schema(df, float32=True)["value"].dtype == "float32"
+    pd.testing.assert_frame_equal(legacy_dtypes(compact), df)
+
+    report = memory_report(df, compact)
+    assert report.loc["total", "MB_after"] < report.loc["total", "MB_before"] / 3
+    assert report.loc["year", "MB_after"] == report.loc["year", "MB_before"] / 4
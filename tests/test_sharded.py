@@ -0,0 +1,29 @@
+import numpy as np
+import pandas as pd
+
+from macroeconomics.features.build_features import add_2019_norm_long
+from macroeconomics.features.sharded import plan_shards, sharded_norm_long
+
+
+def release():
+    rng = np.random.default_rng(1)
+    keys = [(c, i) for c in ("ESP", "FRA", "ITA", "DEU", "PRT") for i in ("NGDPD", "PCPIEPCH", "LUR")]
+    df = pd.DataFrame([(c, i, y) for c, i in keys for y in range(2015, 2023)], columns=["country", "indicator", "year"])
+    df["value"] = rng.normal(5, 2, len(df)).round(3)
+    return df.sample(frac=1, random_state=0).astype({"country": "category", "year": "int16"})
+
+
+def test_shards_keep_groups_whole():
+    df = release()
+    shards = plan_shards(df, 4)
+    assert len(shards) == 4 and sorted(np.concatenate(shards)) == list(range(len(df)))
+    owner = {}
+    for k, rows in enumerate(shards):
+        for key in zip(df["country"].iloc[rows], df["indicator"].iloc[rows]):
+            assert owner.setdefault(key, k) == k
+
+
+def test_sharded_matches_serial():
+    df = release()
+    serial = add_2019_norm_long(df, baseline_year=[2019, 2020])
+    assert sharded_norm_long(df, "2019,2020", workers=3).to_csv(index=False) == serial.to_csv(index=False)
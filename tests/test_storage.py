@@ -0,0 +1,87 @@
+import pytest
+import pandas as pd
+
+from macroeconomics.datasets.storage import PartitionedWriter, combine_partitions, read_manifest, read_partitioned
+
+
+def frame(indicator, countries, years, offset=0.0):
+    return pd.DataFrame([
+        {"country": c, "indicator": indicator, "year": y, "value": y + offset + i / 10}
+        for i, c in enumerate(countries) for y in years
+    ])
+
+
+def test_partitions_combine_to_sorted_table(tmp_path):
+    root = tmp_path / "imf_weo_timeseries_2025_april"
+    root.mkdir()
+    (root / "indicator=STALE.csv").write_text("country,indicator,year,value\n")
+
+    writer = PartitionedWriter(root)
+    lp = frame("LP", ["FRA", "ESP"], [2021, 2020])
+    writer.write("NGDPD", pd.concat([frame("NGDPD", ["FRA", "ESP"], [2020, 2019])] * 2))  # duplicated rows
+    writer.write("LP", lp)
+    manifest = writer.finish()
+
+    assert [p["indicator"] for p in manifest["partitions"]] == ["LP", "NGDPD"]
+    assert manifest["rows"] == 8
+    assert not (root / "indicator=STALE.csv").exists()
+    assert read_manifest(root) == manifest
+
+    out = combine_partitions(root, tmp_path / "imf_weo_timeseries_2025_april.csv")
+    expected = pd.concat([frame("NGDPD", ["FRA", "ESP"], [2020, 2019]), lp], ignore_index=True)
+    expected = expected.sort_values(["indicator", "country", "year"])
+    assert out.read_text() == expected.to_csv(index=False)
+
+    assert set(read_partitioned(root, indicators=["LP"])["indicator"]) == {"LP"}
+
+
+def test_parquet_roundtrip_and_preference(tmp_path):
+    pytest.importorskip("pyarrow")
+    from macroeconomics.core.functions import find_latest_files_and_year, preferred_timeseries_file
+    from macroeconomics.datasets.storage import read_timeseries, write_timeseries_parquet
+
+    df = pd.concat([frame("NGDPD", ["FRA", "ESP", "DEU"], [2019, 2020]), frame("LP", ["ESP"], [2020])])
+    csv_path = tmp_path / "imf_weo_timeseries_2025_april.csv"
+    df.to_csv(csv_path, index=False)
+    parquet_path = write_timeseries_parquet(df, tmp_path / "imf_weo_timeseries_2025_april.parquet")
+
+    latest_files, year = find_latest_files_and_year(tmp_path)
+    assert year == 2025
+    assert preferred_timeseries_file(latest_files) == parquet_path
+
+    got = read_timeseries(parquet_path, countries=["ESP", "FRA"])
+    assert isinstance(got["country"].dtype, pd.CategoricalDtype)
+    assert list(got["country"].cat.categories) == ["ESP", "FRA"]
+    assert got["year"].dtype == "int16"
+    # Both formats load into the same compact schema
+    expected = read_timeseries(csv_path, countries=["ESP", "FRA"]).sort_values(["indicator", "country", "year"])
+    pd.testing.assert_frame_equal(got.reset_index(drop=True), expected.reset_index(drop=True))
+
+
+def test_predicates_pushed_down(tmp_path):
+    pytest.importorskip("pyarrow")
+    import pyarrow.parquet as pq
+    from macroeconomics.datasets.storage import matching_row_groups, read_timeseries, write_timeseries_parquet
+
+    indicators = ["LP", "NGDPD", "PCPIPCH"]
+    df = pd.concat([frame(ind, ["DEU", "ESP", "FRA", "ITA"], range(2000, 2010)) for ind in indicators])
+    parquet_path = write_timeseries_parquet(df, tmp_path / "ts.parquet", row_group_size=10)
+    csv_path = tmp_path / "ts.csv"
+    df.to_csv(csv_path, index=False)
+    writer = PartitionedWriter(tmp_path / "ts")
+    for ind in indicators:
+        writer.write(ind, df[df["indicator"] == ind])
+    writer.finish()
+
+    pf = pq.ParquetFile(parquet_path)
+    assert pf.metadata.num_row_groups == 12
+    # one indicator, two countries, 2008 onwards: a single row group per country
+    groups = matching_row_groups(pf, countries=["ESP", "FRA"], indicators=["NGDPD"], years=(2008, None))
+    assert groups == [5, 6]
+
+    predicates = dict(countries=["ESP", "FRA"], indicators=["NGDPD"], years=(2008, None))
+    got = read_timeseries(parquet_path, **predicates)
+    assert len(got) == 4
+    from_csv = read_timeseries(csv_path, **predicates).sort_values(["indicator", "country", "year"])
+    pd.testing.assert_frame_equal(got.reset_index(drop=True), from_csv.reset_index(drop=True))
+    assert read_timeseries(parquet_path, indicators=["XXX"]).empty
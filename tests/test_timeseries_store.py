@@ -0,0 +1,24 @@
+import json
+
+import pandas as pd
+
+from macroeconomics.viz.charts.timeseries import makePlotly, timeseries_store
+
+
+def test_store_carries_makeplotly_layout_and_series_in_legend_order():
+    df = pd.DataFrame({
+        "country": ["FRA", "FRA", "ESP", "ESP", "ESP"],
+        "indicator": ["LUR"] * 5,
+        "year": [2024, 2025, 2023, 2024, 2025],
+        "value": [7.0, 7.5, 12.0, float("nan"), 11.0],
+        "country_name": ["France", "France", "Spain", "Spain", "Spain"],
+    })
+    args = ({"LUR": "Unemployment rate"}, {"LUR": "%"}, pd.DataFrame({"id": ["LUR"], "unit": ["Percent"]}), 2024)
+    store = json.loads(json.dumps(timeseries_store(df, "LUR", *args)))  # what the dcc.Store holds
+
+    assert list(store["series"]) == ["FRA", "ESP"]
+    assert store["series"]["ESP"] == {"name": "Spain", "x": [2023, 2025], "y": [12.0, 11.0]}
+    fig = json.loads(makePlotly(df, "LUR", *args, save_html=False).to_json())
+    assert store["layout"] == fig["layout"]
+    assert store["hovertemplate"] == fig["data"][0]["hovertemplate"]
+    assert store["colors"][0] == fig["data"][0]["line"]["color"]
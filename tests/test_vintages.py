@@ -0,0 +1,69 @@
+import math
+from argparse import Namespace
+
+import pandas as pd
+import pytest
+
+from macroeconomics.datasets.releases import release_order
+from macroeconomics.datasets import vintages
+from macroeconomics.datasets.vintages import VintageStore
+
+
+def tidy(values):
+    return pd.DataFrame([{"country": c, "indicator": i, "year": y, "value": v} for (i, c, y), v in values.items()])
+
+
+def snapshot(df):
+    return {(r.indicator, r.country, int(r.year)): r.value for r in df.itertuples()}
+
+
+def test_vintages_store_changes_only(tmp_path):
+    base = {("NGDPD", c, y): 100.0 + y for c in ("ESP", "FRA") for y in range(2020, 2026)}
+    oct24 = dict(base)
+    apr25 = base | {("NGDPD", "ESP", 2025): 999.0, ("NGDPD", "ESP", 2026): 1.0}  # revision + new year
+    del apr25[("NGDPD", "FRA", 2020)]  # dropped
+    oct25 = apr25 | {("NGDPD", "FRA", 2020): 2120.0}  # back again
+
+    store = VintageStore(tmp_path / "v.sqlite")
+    assert store.add_release("2024_october", tidy(oct24)) == len(oct24)
+    assert store.add_release("2025_april", tidy(apr25)) == 3
+    assert store.add_release("2025_october", tidy(oct25)) == 1
+    assert store.releases() == ["2024_october", "2025_april", "2025_october"]
+    assert store.stats()["stored"] == len(oct24) + 4
+
+    for release, expected in [("2024_october", oct24), ("2025_april", apr25), ("2025_october", oct25)]:
+        assert snapshot(store.as_of(release)) == expected
+    assert snapshot(store.as_of("2025_april", countries=["ESP"], years=(2025, None))) == {
+        ("NGDPD", "ESP", 2025): 999.0, ("NGDPD", "ESP", 2026): 1.0}
+
+    hist = store.history("NGDPD", "FRA", 2020)
+    assert hist["release"].tolist() == ["2024_october", "2025_april", "2025_october"]
+    assert hist["value"].iloc[0] == 2120.0 and math.isnan(hist["value"].iloc[1]) and hist["value"].iloc[2] == 2120.0
+    assert store.history("NGDPD", "ESP", 2026)["release"].tolist() == ["2025_april", "2025_october"]
+
+    # Re-adding the latest release replaces it; older releases are refused
+    store.add_release("2025_october", tidy(apr25))
+    assert snapshot(store.as_of()) == apr25
+    with pytest.raises(ValueError):
+        store.add_release("2025_april", tidy(apr25))
+    assert release_order("2025_april") < release_order("2025_october") < release_order("2026_april")
+    with pytest.raises(ValueError):
+        release_order("2025_may")
+
+
+def test_vintages_main_ingests_release_files(tmp_path, monkeypatch):
+    base = {("NGDPD", c, y): 100.0 + y for c in ("ESP", "FRA") for y in range(2020, 2023)}
+    apr25 = base | {("NGDPD", "ESP", 2022): 1.0}
+    tidy(apr25).to_csv(tmp_path / "imf_weo_timeseries_2025_april.csv", index=False)
+    tidy(base).to_csv(tmp_path / "imf_weo_timeseries_2024_october.csv", index=False)
+    # Not full releases: features output and other tables are left alone
+    tidy(base).to_csv(tmp_path / "imf_weo_timeseries_2025_october_with_features.csv", index=False)
+    (tmp_path / "imf_weo_countries_2025_october.csv").write_text("country\n")
+    monkeypatch.setattr(vintages, "DATA_DIR", tmp_path)
+    monkeypatch.setattr(vintages, "VINTAGE_DB", tmp_path / "v.sqlite")
+
+    vintages.vintages_main(Namespace(ingest=True, history=None, as_of=None))
+    store = VintageStore(tmp_path / "v.sqlite")
+    assert store.releases() == ["2024_october", "2025_april"]
+    assert snapshot(store.as_of()) == apr25
+    store.close()
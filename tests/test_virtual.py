@@ -0,0 +1,51 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from macroeconomics.features.build_features import add_2019_norm_long
+from macroeconomics.features.virtual import VirtualIndicators
+
+
+def sample():
+    df = pd.DataFrame({
+        "country": ["ESP"] * 6 + ["FRA"] * 6,
+        "indicator": (["NGDPD"] * 3 + ["PCPIEPCH"] * 3) * 2,
+        "year": [2008, 2019, 2020] * 4,
+        "value": [80.0, 100.0, 110.0, 4.0, 1.0, -0.5, 50.0, 60.0, 70.0, 2.0, 1.0, 3.0],
+    })
+    meta = pd.DataFrame({"id": ["NGDPD", "PCPIEPCH"], "label": ["GDP", "Inflation"],
+                         "unit": ["Billions of U.S. dollars", "Annual percent change"], "dataset": "WEO"})
+    return df, meta
+
+
+def test_virtual_indicators_match_materialized_and_are_memoized():
+    df, meta = sample()
+    virtual = VirtualIndicators(df, meta, maxsize=2)
+    assert "NGDPD_index2008" in virtual and "NGDPD_index19" not in virtual and "LUR_index2019" not in virtual
+
+    materialized = add_2019_norm_long(df, baseline_year=2008)
+    for code in ("NGDPD_index2008", "PCPIEPCH_pct_cum2008"):
+        expected = materialized[materialized["indicator"] == code].reset_index(drop=True)
+        got = virtual.get(code).astype({"indicator": str, "country": str, "year": "int64"})
+        pd.testing.assert_frame_equal(got, expected)
+    assert virtual.frame("NGDPD_index2008", countries=["FRA"], years=(2019, 2020))["value"].tolist() == [120.0, 140.0]
+    assert virtual.stats() == {"cached": 2, "maxsize": 2, "hits": 1, "misses": 2}
+
+    virtual.get("NGDPD_delta2019")  # evicts the least recently used entry
+    assert virtual.stats()["cached"] == 2 and virtual.get("PCPIEPCH_pct_cum2008") is not None
+    assert virtual.stats()["misses"] == 4
+
+    table, labels, suffixes = virtual.extend(["NGDPD_index2008"], meta, {}, {})
+    assert labels == {"NGDPD_index2008": "GDP (2008=100)"} and table["unit"].iloc[-1] == "2008=100"
+
+
+def test_virtual_memo_shared_between_threads():
+    virtual = VirtualIndicators(*sample(), maxsize=2)
+    codes = ["NGDPD_index2008", "NGDPD_index2019", "PCPIEPCH_pct_cum2019"] * 40
+    with ThreadPoolExecutor(8) as pool:
+        frames = list(pool.map(virtual.get, codes))
+    serial = {code: VirtualIndicators(*sample()).get(code) for code in set(codes)}
+    for code, got in zip(codes, frames):
+        pd.testing.assert_frame_equal(got, serial[code])
+    stats = virtual.stats()
+    assert stats["cached"] == 2 and stats["hits"] + stats["misses"] == len(codes)